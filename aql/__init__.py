@@ -9,9 +9,25 @@ __author__ = "Amethyst Reese"
 
 from .__version__ import __version__
 from .column import Column
-from .connector import connect
-from .engines.base import Connection, Cursor, Engine, Result
+from .connector import connect, pool, replicated, sharded
+from .engines.base import Connection, Cursor, Engine, Result, Statement
+from .engines.pool import Pool, PoolStats
+from .engines.replica import Balance, ReplicaStats, ReplicatedConnection
+from .engines.shard import hash_shard, RangeShards, ShardedConnection
+from .engines.stream import StreamStats
 from .errors import AqlError, BuildError, QueryError
 from .query import Query
 from .table import Table, table
-from .types import And, Boolean, Comparison, Join, Location, Operator, Or, Select
+from .types import (
+    And,
+    Boolean,
+    Comparison,
+    InStrategy,
+    Join,
+    Location,
+    Operator,
+    Or,
+    Param,
+    RowComparison,
+    Select,
+)
@@ -0,0 +1,276 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from attr import dataclass
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheInfo:
+    """
+    Point-in-time statistics for a cache.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class LRUCache(Generic[V]):
+    """
+    Bounded mapping that evicts the least recently used entry when full.
+
+    A maxsize of zero disables the cache entirely: lookups always miss, and
+    nothing is stored.
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self._data: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._maxsize = max(0, maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value: int) -> None:
+        self._maxsize = max(0, value)
+        self._trim()
+
+    def _trim(self) -> None:
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return the cached value for key, or None, and mark it recently used."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        """Store value for key, evicting older entries as needed."""
+        if not self._maxsize:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._trim()
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove and return the value for key, if present."""
+        return self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries, without resetting statistics."""
+        self._data.clear()
+
+    def info(self) -> CacheInfo:
+        """Return current hit, miss, and eviction counts."""
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self._data),
+            maxsize=self._maxsize,
+        )
+
+
+Rows = Tuple[Tuple[Any, ...], ...]
+
+
+def freeze(rows: Iterable[Sequence[Any]]) -> Rows:
+    """Copy rows to tuples, so they can be shared between callers."""
+    return tuple(tuple(row) for row in rows)
+
+
+@dataclass
+class ResultCacheInfo:
+    """
+    Point-in-time statistics for a result cache.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups served from the cache, or zero before any lookups."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    rows: Rows
+    tables: Tuple[str, ...]
+    expires: Optional[float]
+
+
+class ResultCache:
+    """
+    Rows of recent selects, keyed by their SQL and parameters.
+
+    Entries are evicted least recently used beyond ``maxsize``, and expire after
+    ``ttl`` seconds, if set. Every entry records the tables it read from, and
+    :meth:`invalidate` drops all entries for a table. Rows are stored as tuples,
+    so cached results can't be changed by callers.
+
+    Take a :meth:`generation` for the tables before running a query, and pass it
+    to :meth:`put`, so rows aren't stored if a table was invalidated while the
+    query was running.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60.0) -> None:
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tables: Dict[str, Set[Hashable]] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @staticmethod
+    def key(sql: str, parameters: Sequence[Any]) -> Optional[Hashable]:
+        """Cache key for a statement, or None if its parameters aren't hashable."""
+        key = (sql, tuple(parameters))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key)
+        for table in entry.tables:
+            keys = self._tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tables[table]
+
+    def get(self, key: Hashable) -> Optional[Rows]:
+        """Return unexpired rows for key, or None, and mark them recently used."""
+        entry = self._data.get(key)
+        if entry is not None and entry.expires is not None:
+            if time.monotonic() >= entry.expires:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry.rows
+
+    def generation(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """Snapshot of how often the given tables, or the cache, were invalidated."""
+        names = sorted(set(tables))
+        return (self._epoch, *(self._generations.get(name, 0) for name in names))
+
+    def put(
+        self,
+        key: Hashable,
+        rows: Iterable[Sequence[Any]],
+        tables: Iterable[str],
+        generation: Optional[Tuple[int, ...]] = None,
+    ) -> Rows:
+        """
+        Store rows read from the given tables, and return them as tuples.
+
+        Given the tables' :meth:`generation` from before the rows were read, rows
+        are not stored if any of the tables has been invalidated since.
+        """
+        frozen = freeze(rows)
+        tables = list(tables)
+        if not self._maxsize:
+            return frozen
+        if generation is not None and generation != self.generation(tables):
+            return frozen
+        if key in self._data:
+            self._remove(key)
+
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        names = tuple(set(tables))
+        self._data[key] = _Entry(frozen, names, expires)
+        for table in names:
+            self._tables.setdefault(table, set()).add(key)
+        while len(self._data) > self._maxsize:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+        return frozen
+
+    def invalidate(self, *tables: str) -> None:
+        """Drop every entry that read from any of the given tables."""
+        for table in tables:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in self._tables.pop(table, ()):
+                if key in self._data:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """Remove all entries, without resetting statistics."""
+        self._epoch += 1
+        self._data.clear()
+        self._tables.clear()
+
+    def info(self) -> ResultCacheInfo:
+        """Return current hit, miss, eviction, and invalidation counts."""
+        return ResultCacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            invalidations=self.invalidations,
+            size=len(self._data),
+            maxsize=self._maxsize,
+        )
@@ -1,12 +1,15 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+from datetime import datetime
+from enum import Enum
 from typing import Any, Generic, Optional, Sequence, Type, TypeVar, Union
+from uuid import UUID
 
 from attr import dataclass
 
 from .errors import InvalidColumnType
-from .types import Comparison, Operator
+from .types import Comparison, Operator, Param
 
 NO_DEFAULT = object()
 T = TypeVar("T")
@@ -16,6 +19,18 @@ class AutoIncrement(Generic[T]):
     pass
 
 
+class Compact(Generic[T]):
+    """
+    Store values in a compact binary or integer form, rather than as text.
+
+    Supported for ``datetime`` (microseconds since the epoch), ``UUID`` (16 bytes),
+    ``bool`` (small integer), and ``Enum`` subclasses with integer values.
+    """
+
+
+COMPACT_TYPES = (datetime, UUID, bool)
+
+
 class Index(Generic[T]):
     _AUTO_PREFIX = "idx"
 
@@ -45,6 +60,7 @@ class ColumnType:
     nullable: bool = False
     autoincrement: bool = False
     constraint: Optional[Type[Index]] = None
+    compact: bool = False
 
     @staticmethod
     def parse(t: Type) -> "ColumnType":
@@ -60,6 +76,8 @@ class ColumnType:
                     args.remove(type(None))
             elif origin is AutoIncrement:
                 ctype.autoincrement = True
+            elif origin is Compact:
+                ctype.compact = True
             elif issubclass(origin, Index):
                 if ctype.constraint:
                     raise InvalidColumnType(f"Unsupported double constraint: {t}")
@@ -77,8 +95,19 @@ class ColumnType:
         if ctype.autoincrement and ctype.root != int:
             raise InvalidColumnType(f"Autoincrement not supported with {ctype.root}")
 
+        if ctype.compact and not ColumnType.compactable(t):
+            raise InvalidColumnType(f"Compact not supported with {ctype.root}")
+
         return ctype
 
+    @staticmethod
+    def compactable(t: Type) -> bool:
+        if t in COMPACT_TYPES:
+            return True
+        if isinstance(t, type) and issubclass(t, Enum):
+            return all(isinstance(member.value, int) for member in t)
+        return False
+
 
 class Column:
     def __init__(
@@ -103,7 +132,9 @@ class Column:
     def full_name(self) -> str:
         return f"{self.table_name}.{self.name}" if self.table_name else self.name
 
-    def in_(self, values: Sequence[Any]) -> Comparison:
+    def in_(self, values: Union[Sequence[Any], Param]) -> Comparison:
+        if isinstance(values, Param):
+            return Comparison(self, Operator.in_, Param(values.name, expand=True))
         return Comparison(self, Operator.in_, list(values))
 
     def like(self, value: str) -> Comparison:
@@ -2,17 +2,21 @@
 # Licensed under the MIT license
 
 import re
-from typing import Any, Pattern, Union
+from typing import Any, Optional, Pattern, Sequence, Union
 
+from .column import Column
 from .engines.base import Connection
+from .engines.pool import Pool
+from .engines.replica import Balance, ReplicatedConnection
+from .engines.shard import hash_shard, ShardedConnection, ShardFunction
 from .errors import InvalidURI
 from .types import Location
 
 _uri_regex: Pattern = re.compile(r"(?P<engine>\w+)://(?P<location>.+)")
 
 
-def connect(location: Union[str, Location], *args: Any, **kwargs: Any) -> Connection:
-    """Connect to the specified database."""
+def parse_location(location: Union[str, Location]) -> Location:
+    """Convert a connection URI to a Location object."""
     if isinstance(location, str):
         match = _uri_regex.match(location)
         if match:
@@ -20,6 +24,72 @@ def connect(location: Union[str, Location], *args: Any, **kwargs: Any) -> Connec
             location = Location(engine, database=database)
         else:
             raise InvalidURI(f"Invalid database connection URI {location}")
+    return location
 
+
+def connect(location: Union[str, Location], *args: Any, **kwargs: Any) -> Connection:
+    """Connect to the specified database."""
+    location = parse_location(location)
     connector, engine_kls = Connection.get_connector(location.engine)
     return connector(engine_kls(), location, *args, **kwargs)
+
+
+def pool(
+    location: Union[str, Location], min_size: int = 1, max_size: int = 10, **kwargs: Any
+) -> Pool:
+    """
+    Create a pool of connections to the specified database.
+
+    Pool options like ``idle_timeout`` are accepted as keyword arguments, and any
+    others are passed through to each connection.
+    """
+    location = parse_location(location)
+    return Pool(location, min_size=min_size, max_size=max_size, **kwargs)
+
+
+def sharded(
+    locations: Sequence[Union[str, Location]],
+    key: Union[Column, str],
+    shard: ShardFunction = hash_shard,
+    *args: Any,
+    **kwargs: Any,
+) -> ShardedConnection:
+    """
+    Connect to several databases, routing queries by the value of the key column.
+
+    See :class:`aql.engines.shard.ShardedConnection` for details.
+    """
+    return ShardedConnection(
+        [parse_location(location) for location in locations],
+        key,
+        shard,
+        *args,
+        **kwargs,
+    )
+
+
+def replicated(
+    primary: Union[str, Location],
+    replicas: Sequence[Union[str, Location]],
+    *args: Any,
+    balance: Balance = Balance.round_robin,
+    read_your_writes: float = 0.0,
+    max_lag: Optional[float] = None,
+    check_interval: Optional[float] = 5.0,
+    **kwargs: Any,
+) -> ReplicatedConnection:
+    """
+    Connect to a primary database and its read replicas.
+
+    See :class:`aql.engines.replica.ReplicatedConnection` for details.
+    """
+    return ReplicatedConnection(
+        parse_location(primary),
+        [parse_location(location) for location in replicas],
+        *args,
+        balance=balance,
+        read_your_writes=read_your_writes,
+        max_lag=max_lag,
+        check_interval=check_interval,
+        **kwargs,
+    )
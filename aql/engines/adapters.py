@@ -0,0 +1,221 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import time
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+from uuid import UUID
+
+from attr import dataclass
+
+from ..column import Column, ColumnType
+
+Decoder = Callable[[Any], Any]
+Encoder = Callable[[Any], Any]
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+@dataclass(frozen=True)
+class Adapter:
+    """
+    Conversion between a Python type and the value stored by the database.
+
+    ``encode`` is applied to parameters of that type on the way in, and ``decode``
+    to non-null values fetched from columns of that type on the way out.
+    """
+
+    encode: Optional[Encoder] = None
+    decode: Optional[Decoder] = None
+
+
+@dataclass
+class AdapterStats:
+    """
+    Number of values converted by an adapter registry, and time spent doing so.
+    """
+
+    encoded: int = 0
+    decoded: int = 0
+    encode_time: float = 0.0
+    decode_time: float = 0.0
+
+
+def encode_timestamp(value: datetime) -> int:
+    """Microseconds since the epoch; aware datetimes are converted to UTC first."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // MICROSECOND
+
+
+def decode_timestamp(value: int) -> datetime:
+    """Naive UTC datetime from microseconds since the epoch."""
+    return EPOCH + timedelta(microseconds=value)
+
+
+def encode_uuid(value: UUID) -> bytes:
+    return value.bytes
+
+
+def decode_uuid(value: bytes) -> UUID:
+    return UUID(bytes=bytes(value))
+
+
+COMPACT_ADAPTERS: Dict[Type, Adapter] = {
+    bool: Adapter(int, bool),
+    datetime: Adapter(encode_timestamp, decode_timestamp),
+    UUID: Adapter(encode_uuid, decode_uuid),
+}
+
+
+def compact_adapter(root: Any) -> Adapter:
+    """Adapter for a column type annotated with :class:`aql.column.Compact`."""
+    if isinstance(root, type) and issubclass(root, Enum):
+        return Adapter(attrgetter("value"), root)
+    return COMPACT_ADAPTERS[root]
+
+
+class AdapterRegistry:
+    """
+    Per-engine adapters, keyed by the root type of each column.
+
+    Columns annotated with :class:`aql.column.Compact` always use the compact
+    encoding for their type, regardless of registered adapters.
+    Parameters are encoded by their exact type. Fetched rows are decoded one column
+    at a time, using a list of decoders computed once for each distinct set of
+    selected column types.
+    """
+
+    def __init__(self, adapters: Optional[Mapping[Type, Adapter]] = None) -> None:
+        self._adapters: Dict[Type, Adapter] = dict(adapters or {})
+        self._encoders: Dict[Type, Encoder] = {}
+        self._decoders: Dict[Hashable, Optional[List[Optional[Decoder]]]] = {}
+        self._rebuild()
+        self.stats = AdapterStats()
+
+    def __contains__(self, root: Type) -> bool:
+        return self.lookup(root) is not None
+
+    def _rebuild(self) -> None:
+        self._encoders = {
+            root: adapter.encode
+            for root, adapter in self._adapters.items()
+            if adapter.encode is not None
+        }
+        self._decoders.clear()
+
+    def register(
+        self,
+        root: Type,
+        encode: Optional[Encoder] = None,
+        decode: Optional[Decoder] = None,
+    ) -> None:
+        """Add or replace the adapter for values and columns of the given type."""
+        self._adapters[root] = Adapter(encode, decode)
+        self._rebuild()
+
+    def unregister(self, root: Type) -> None:
+        """Remove the adapter for the given type, if any."""
+        self._adapters.pop(root, None)
+        self._rebuild()
+
+    def lookup(self, root: Optional[Type]) -> Optional[Adapter]:
+        """Find the adapter for a column type, including adapters of base classes."""
+        if root is None:
+            return None
+        for kls in getattr(root, "__mro__", (root,)):
+            if kls in self._adapters:
+                return self._adapters[kls]
+        return None
+
+    def encode(self, parameters: Sequence[Any]) -> Sequence[Any]:
+        """Return the parameters, with any values of registered types encoded."""
+        encoders = self._encoders
+        if not encoders or encoders.keys().isdisjoint(map(type, parameters)):
+            return parameters
+
+        before = time.perf_counter()
+        result: List[Any] = []
+        count = 0
+        for value in parameters:
+            fn = encoders.get(type(value))
+            if fn is not None:
+                value = fn(value)
+                count += 1
+            result.append(value)
+
+        if count:
+            self.stats.encoded += count
+            self.stats.encode_time += time.perf_counter() - before
+            return result
+        return parameters
+
+    def encode_many(self, rows: Sequence[Sequence[Any]]) -> Sequence[Sequence[Any]]:
+        """Encode each set of parameters for an executemany statement."""
+        if not self._encoders:
+            return rows
+        return [self.encode(row) for row in rows]
+
+    def decoders(self, columns: Sequence[Column]) -> Optional[List[Optional[Decoder]]]:
+        """
+        Decoder for each of the given columns, or None if no column needs decoding.
+
+        Results are cached by the columns' types, so queries selecting the same
+        types share one list of decoders.
+        """
+        key = tuple([column.ctype for column in columns])
+        try:
+            return self._decoders[key]
+        except KeyError:
+            pass
+
+        decoders: List[Optional[Decoder]] = []
+        for column in columns:
+            adapter = None
+            if column.ctype is not None:
+                ctype = ColumnType.parse(column.ctype)
+                if ctype.compact:
+                    adapter = compact_adapter(ctype.root)
+                else:
+                    adapter = self.lookup(ctype.root)
+            decoders.append(adapter.decode if adapter else None)
+
+        result = decoders if any(decoders) else None
+        self._decoders[key] = result
+        return result
+
+    def decode(
+        self, rows: Sequence[Sequence[Any]], decoders: List[Optional[Decoder]]
+    ) -> List[Tuple[Any, ...]]:
+        """Decode a batch of rows column by column, returning rows as tuples."""
+        if not rows:
+            return []
+
+        before = time.perf_counter()
+        columns: List[Sequence[Any]] = list(zip(*rows))
+        count = 0
+        for idx, fn in enumerate(decoders):
+            if fn is None:
+                continue
+            columns[idx] = [
+                None if value is None else fn(value) for value in columns[idx]
+            ]
+            count += len(rows)
+
+        self.stats.decoded += count
+        self.stats.decode_time += time.perf_counter() - before
+        return list(zip(*columns))
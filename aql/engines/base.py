@@ -1,30 +1,52 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+import asyncio
 import logging
+from collections import deque
+from contextlib import asynccontextmanager
 from typing import (
     Any,
+    AsyncIterable,
     AsyncIterator,
+    Deque,
     Dict,
     Generator,
     Generic,
+    Iterable,
+    List,
     Optional,
     Sequence,
+    Set,
     Tuple,
     Type,
     TypeVar,
     Union,
 )
 
+from ..cache import freeze, LRUCache, ResultCache, Rows
 from ..column import Column
-from ..errors import BuildError, NoConnection, UnknownConnector
+from ..errors import (
+    BuildError,
+    ConnectionBusy,
+    NoConnection,
+    QueryError,
+    UnknownConnector,
+)
 from ..query import PreparedQuery, Query
 from ..table import Table
-from ..types import Location
+from ..types import Location, Param, QueryAction
+from .adapters import Adapter, AdapterRegistry, Decoder
+from .columns import ColumnBuilder, ColumnData, numpy_available
+from .flight import SingleFlight
+from .gather import gather, GatherResults
+from .stream import insert_stream, StreamStats
 
 LOG = logging.getLogger(__name__)
 T = TypeVar("T")
 
+WRITES = (QueryAction.insert, QueryAction.update, QueryAction.delete)
+
 
 def q(t: Union[Table, Column, str]) -> str:
     """Return the backtick quoted table name, column name, or raw string"""
@@ -49,8 +71,12 @@ class MissingConnector:
 class Engine:
     _engines: Dict[str, Type["Engine"]] = {}
 
+    PLACEHOLDER = "?"
+    ADAPTERS: Dict[Type, Adapter] = {}
+
     def __init__(self):
         self.name = self.__class__.__name__
+        self.adapters = AdapterRegistry(self.ADAPTERS)
 
     def __init_subclass__(cls, name: str) -> None:
         super().__init_subclass__()
@@ -75,6 +101,14 @@ class Engine:
         else:
             return fn(query)
 
+    def plan(self, query: Query[T]) -> List[PreparedQuery[T]]:
+        """
+        Given a query, generate one or more statements that together execute it.
+
+        Default behavior is a single prepared statement.
+        """
+        return [self.prepare(query)]
+
 
 class Connection:
     _connectors: Dict[str, Tuple[Type["Connection"], Type[Engine]]] = {}
@@ -82,13 +116,25 @@ class Connection:
     def __init__(self, engine: Engine, location: Location, *args: Any, **kwargs: Any):
         self._conn: Any = None
         self._autocommit = False
+        self._stream: Optional["Cursor"] = None
+        self._transaction = False
+        self._written: Set[str] = set()
+        self.result_cache: Optional[ResultCache] = None
+        self.single_flight: Optional[SingleFlight] = None
         self._args = args
         self._kwargs = kwargs
         self.engine = engine
         self.location = location
 
-    def __init_subclass__(cls, name: str, engine: Type[Engine], **kwargs):
+    def __init_subclass__(
+        cls,
+        name: Optional[str] = None,
+        engine: Optional[Type[Engine]] = None,
+        **kwargs,
+    ):
         super().__init_subclass__()
+        if name is None or engine is None:
+            return
         name = name.lower()
         if name not in Connection._connectors:
             Connection._connectors[name] = (cls, engine)
@@ -123,6 +169,51 @@ class Connection:
         else:
             raise NoConnection
 
+    def route(self, query: Query[T]) -> "Connection":
+        """Choose the underlying connection that should run the given query."""
+        return self
+
+    async def ping(self) -> bool:
+        """Check whether the connection is still usable."""
+        try:
+            cursor = await self.cursor()
+            await cursor.execute("SELECT 1")
+            await cursor.fetchall()
+            await cursor.close()
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return True
+
+    async def discover_limits(self) -> None:
+        """Update the engine's statement size limits from the live connection."""
+
+    async def replica_lag(self) -> Optional[float]:
+        """Seconds this replica is behind its primary, or None if not a replica."""
+        return None
+
+    async def interrupted(self) -> bool:
+        """
+        Recover after a query was cancelled before completing.
+
+        Returns whether the connection is still usable.
+        """
+        return True
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether the connection currently has an open transaction."""
+        return False
+
+    @property
+    def _isolated(self) -> bool:
+        """
+        Whether reads need to see this connection's uncommitted changes, after
+        :meth:`begin` or uncommitted writes, so can't share results with others.
+        Implicit transactions opened by reads alone, like on MySQL with autocommit
+        off, don't count.
+        """
+        return bool(self._transaction or self._written) and self.in_transaction
+
     @property
     def autocommit(self) -> bool:
         return self._autocommit
@@ -134,23 +225,167 @@ class Connection:
     async def begin(self) -> None:
         """Begin a new transaction."""
         await self._conn.begin()
+        self._transaction = True
 
     async def commit(self) -> None:
         """Commit the current transaction."""
         await self._conn.commit()
+        self._transaction = False
+        self._committed()
 
     async def rollback(self) -> None:
         """Rollback/cancel the current transaction."""
         await self._conn.rollback()
+        self._transaction = False
+        self._written.clear()
+
+    def _invalidate(self, tables: Iterable[str]) -> None:
+        """Drop cached and in-flight results for tables just written."""
+        if self.result_cache is None and self.single_flight is None:
+            return
+        tables = set(tables)
+        self._drop(tables)
+        if self.in_transaction:
+            self._written.update(tables)
+
+    def _drop(self, tables: Iterable[str]) -> None:
+        if self.result_cache is not None:
+            self.result_cache.invalidate(*tables)
+        if self.single_flight is not None:
+            self.single_flight.invalidate(*tables)
+
+    async def validate_cache(self) -> None:
+        """
+        Make sure cached results are still current, before serving any of them.
+
+        Connections that can detect changes made by other processes override this
+        to drop stale entries from :attr:`result_cache`.
+        """
+
+    def _committed(self) -> None:
+        """
+        Drop cached results again for tables written during the transaction, in
+        case other connections cached rows before the changes were committed.
+        """
+        if self._written:
+            self._drop(self._written)
+        self._written.clear()
+
+    def _check_busy(self) -> None:
+        if self._stream is not None:
+            raise ConnectionBusy(
+                "connection is streaming results; drain or close the result first"
+            )
 
-    async def cursor(self) -> "Cursor":
-        """Return a new cursor object."""
+    async def cursor(self, stream: bool = False) -> "Cursor":
+        """
+        Return a new cursor object.
+
+        If ``stream`` is set, connectors that buffer results by default may return
+        an unbuffered cursor instead, which keeps the connection busy until the
+        cursor is exhausted or closed.
+        """
+        self._check_busy()
         cur = await self._conn.cursor()
         return Cursor(self, cur)
 
-    def execute(self, query: Query[T]) -> "Result[T]":
+    def execute(self, query: Query[T], batch_size: Optional[int] = None) -> "Result[T]":
         """Execute the given query on a new cursor and return the cursor."""
-        return Result(query, self)
+        return Result(query, self, batch_size=batch_size)
+
+    def prepare(self, query: Query[T]) -> "Statement[T]":
+        """Render the given query once, for repeated execution with bound params."""
+        return Statement(query, self)
+
+    @property
+    def concurrency(self) -> int:
+        """Number of queries this connection can run at the same time."""
+        return 1
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator["Connection"]:
+        yield self
+
+    async def gather(
+        self,
+        *queries: Query,
+        concurrency: Optional[int] = None,
+        cancel_on_error: bool = False,
+        return_exceptions: bool = False,
+    ) -> GatherResults:
+        """
+        Execute independent queries concurrently, returning rows in input order.
+
+        Concurrency defaults to :attr:`concurrency`, which is more than one only
+        for connections that route reads across several underlying connections.
+        See :func:`aql.engines.gather.gather` for details.
+        """
+        return await gather(
+            self._acquire,
+            queries,
+            concurrency or self.concurrency,
+            cancel_on_error,
+            return_exceptions,
+        )
+
+    async def paginate(
+        self, query: Query[T], page_size: int = 1000
+    ) -> AsyncIterator[Sequence[T]]:
+        """
+        Iterate over every row of a select, one page at a time.
+
+        Each page starts after the last row of the previous page, using
+        :meth:`aql.Query.paginate`, so later pages are as cheap as the first.
+        """
+        base = query._copy().freeze()
+        after: Optional[T] = None
+        while True:
+            page = await self.execute(base.paginate(page_size, after=after))
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after = page[-1]
+
+    async def insert_stream(
+        self,
+        table: Table[T],
+        source: Union[AsyncIterable[T], Iterable[T]],
+        batch_size: int = 1000,
+        max_inflight: int = 2,
+        commit_every: Optional[int] = None,
+        many: bool = False,
+    ) -> StreamStats:
+        """
+        Insert rows from an iterable or async iterable in bounded-size batches.
+
+        See :func:`aql.engines.stream.insert_stream` for details.
+        """
+        return await insert_stream(
+            self, table, source, batch_size, max_inflight, commit_every, many
+        )
+
+    def execute_many(self, query: Query[T], rows: Iterable[Any]) -> "Result[T]":
+        """
+        Execute a single-row statement for every row, using the driver's executemany.
+
+        For insert queries, rows are table objects, like ``insert().values()``.
+        For update and delete queries, rows are mappings of :class:`aql.Param` names
+        to values.
+        """
+        if query._action == QueryAction.insert:
+            query = query._copy()
+            query._rows = list(rows)
+            query._many = True
+            return self.execute(query)
+
+        stmt = Statement(query, self)
+        if stmt._fragments is not None:
+            raise BuildError("execute_many does not support expanding parameters")
+        parameters = [stmt.bind(**row).parameters for row in rows]
+        return Result(
+            query, self, PreparedQuery(query.table, stmt.sql, parameters, True)
+        )
 
     # synonyms
     query = execute
@@ -209,16 +444,28 @@ class Cursor:
 
     async def close(self) -> None:
         """Close the cursor."""
-        await self._cursor.close()
+        try:
+            await self._cursor.close()
+        finally:
+            if self._conn._stream is self:
+                self._conn._stream = None
 
     async def execute(self, query: str, parameters: Any = None) -> None:
         """Execute the given query with this cursor."""
         await self._cursor.execute(query, parameters)
 
+    async def executemany(self, query: str, parameters: Sequence[Any]) -> None:
+        """Execute the given query once for each set of parameters."""
+        await self._cursor.executemany(query, parameters)
+
     async def fetchone(self) -> Optional[Any]:
         """Return the next row from the previous query, or None when exhausted."""
         return await self._cursor.fetchone()
 
+    async def fetchmany(self, size: int) -> Sequence[Any]:
+        """Return up to size rows from the previous query, or none when exhausted."""
+        return await self._cursor.fetchmany(size)
+
     async def fetchall(self) -> Sequence[Any]:
         """Return all rows from the previous query."""
         return await self._cursor.fetchall()
@@ -232,7 +479,8 @@ class Result(Generic[T]):
     Lazy awaitable or async-iterable object that runs the query once awaited.
 
     Awaiting the result object will fetch and convert all rows to appropriate objects.
-    Iterating the result will fetch and convert individual rows at a time.
+    Iterating the result will fetch and convert rows in batches of ``batch_size``,
+    yielding individual rows from the current batch.
 
     Examples::
 
@@ -245,15 +493,57 @@ class Result(Generic[T]):
         async for row in db.execute(Foo.select()):
             ...
 
+        async for batch in db.execute(Foo.select()).batches(1000):
+            ...
+
         rows = await db.execute(Foo.select())
 
+    Rows are built as objects of the table's source type, or a generated row class
+    for partial selects. Use :meth:`tuples`, :meth:`dicts`, or :meth:`scalars`
+    before fetching to skip building objects entirely::
+
+        names = await db.execute(Foo.select(Foo.name)).scalars()
+
+    Iterating a select will stream rows from the server where the connector
+    supports it, and the connection can't run other queries until the result is
+    exhausted, or until :meth:`close` is called. Using the result as an async
+    context manager closes it on exit, even when iteration stops early::
+
+        async with db.execute(Foo.select()) as result:
+            async for row in result:
+                if row.done:
+                    break
+
+    When the connection has a :attr:`~Connection.result_cache`, awaiting a select
+    returns cached rows for the same SQL and parameters, unless a transaction was
+    started with :meth:`~Connection.begin` or has uncommitted writes. Inserts,
+    updates, and deletes invalidate cached rows for their table.
+    With a :attr:`~Connection.single_flight`, awaiting a select while an identical
+    select is already running waits for and shares its rows, instead of running the
+    query again, under the same transaction rules as the result cache.
     """
 
-    def __init__(self, query: Query[T], connection: Connection):
+    BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        query: Query[T],
+        connection: Connection,
+        prepared: Optional[PreparedQuery[T]] = None,
+        batch_size: Optional[int] = None,
+    ):
         self.query = query
         self.connection = connection
+        self.prepared = prepared
+        self.batch_size = batch_size or self.BATCH_SIZE
         self._cursor: Optional[Cursor] = None
+        self._pending: List[PreparedQuery[T]] = []
+        self._buffer: Deque[T] = deque()
+        self._row_count = 0
         self._started = False
+        self._closed = False
+        self._format = "object"
+        self._decoders: Optional[List[Optional[Decoder]]] = None
         self.factory: Optional[Type[T]] = None
 
     def __await__(self) -> Generator[Any, None, Sequence[T]]:
@@ -262,18 +552,25 @@ class Result(Generic[T]):
     def __aiter__(self) -> AsyncIterator[T]:
         return self
 
+    async def __aenter__(self) -> "Result[T]":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
     async def __anext__(self) -> T:
-        row = await self.row()
-        if row is None:
-            raise StopAsyncIteration
-        return row
+        if not self._buffer:
+            self._buffer.extend(await self.fetch(self.batch_size))
+            if not self._buffer:
+                raise StopAsyncIteration
+        return self._buffer.popleft()
 
     @property
     def row_count(self) -> int:
         """Number of rows affected by previous query."""
         if self._cursor is None:
             return 0
-        return self._cursor.row_count
+        return self._row_count + self._cursor.row_count
 
     @property
     def last_id(self) -> Optional[int]:
@@ -282,31 +579,444 @@ class Result(Generic[T]):
             return None
         return self._cursor.last_id
 
-    async def run(self) -> Cursor:
+    async def run(self, stream: bool = False) -> Cursor:
         if self._cursor:
             return self._cursor
 
+        prepared = self._prepare()
+        stream = stream and self.query._action == QueryAction.select
+        connection = self.connection.route(self.query)
+        self._cursor = await connection.cursor(stream=stream)
+        if self._pending and self.query._action != QueryAction.select:
+            await self._execute_atomic()
+        else:
+            await self._execute(prepared)
+        if self.query._action in WRITES:
+            self.connection._invalidate(self._tables())
+        return self._cursor
+
+    def _tables(self) -> List[str]:
+        """Names of every table read or written by the query."""
+        return [
+            self.query.table._name,
+            *(join.table._name for join in self.query._joins),
+        ]
+
+    def _prepare(self) -> PreparedQuery[T]:
+        """Plan the query's statements, and find row factory and decoders."""
         try:
             self.factory = self.query.factory()
         except BuildError:
             pass
 
-        self._cursor = await self.connection.cursor()
-        prepared = self.connection.engine.prepare(self.query)
-        await self._cursor.execute(prepared.sql, prepared.parameters)
-        return self._cursor
+        if self.prepared is None:
+            self.prepared, *self._pending = self.connection.engine.plan(self.query)
+            for prepared in (self.prepared, *self._pending):
+                if not prepared.many:
+                    self._check_bound(prepared)
+        if self.query._action == QueryAction.select:
+            adapters = self.connection.engine.adapters
+            self._decoders = adapters.decoders(self.query._columns)
+        return self.prepared
+
+    @staticmethod
+    def _check_bound(prepared: PreparedQuery[T]) -> None:
+        """Refuse to send :class:`aql.Param` placeholders to the driver unbound."""
+        names = {p.name for p in prepared.parameters if isinstance(p, Param)}
+        if names:
+            raise QueryError(
+                f"unbound parameters {sorted(names)}, "
+                "use Connection.prepare() to bind values"
+            )
+
+    async def _execute(
+        self, prepared: PreparedQuery[T], cursor: Optional[Cursor] = None
+    ) -> None:
+        cursor = cursor or self._cursor
+        assert cursor is not None
+        adapters = self.connection.engine.adapters
+        if prepared.many:
+            parameters = adapters.encode_many(prepared.parameters)
+            await cursor.executemany(prepared.sql, parameters)
+        else:
+            parameters = adapters.encode(prepared.parameters)
+            await cursor.execute(prepared.sql, parameters)
+
+    def _decode(self, rows: Sequence[Any]) -> Sequence[Any]:
+        if self._decoders is None or not rows:
+            return rows
+        return self.connection.engine.adapters.decode(rows, self._decoders)
+
+    async def _execute_atomic(self) -> None:
+        """
+        Execute every statement of a write plan in order, within a single
+        transaction, rolling back all of them if any fails. If a transaction is
+        already open, the statements join it, and the caller decides whether to
+        commit or roll back.
+        """
+        assert self._cursor is not None and self.prepared is not None
+        began = not self.connection.in_transaction
+        if began:
+            await self.connection.begin()
+        try:
+            await self._execute(self.prepared)
+            while await self._advance():
+                pass
+        except BaseException:
+            if began:
+                await self.connection.rollback()
+            raise
+        if began and self.connection.autocommit:
+            await self.connection.commit()
+
+    async def _advance(self) -> bool:
+        """Execute the next pending statement from the plan, if any."""
+        if not self._pending or self._cursor is None:
+            return False
+
+        if self.query._action != QueryAction.select:
+            self._row_count += self._cursor.row_count
+        self.prepared = self._pending.pop(0)
+        await self._execute(self.prepared)
+        return True
+
+    def tuples(self) -> "Result[Any]":
+        """Return rows as plain tuples of values, without building row objects."""
+        self._format = "tuple"
+        return self
+
+    def dicts(self) -> "Result[Any]":
+        """Return rows as dictionaries of column names to values."""
+        self._format = "dict"
+        return self
+
+    def scalars(self) -> "Result[Any]":
+        """Return only the value of the first column from each row."""
+        self._format = "scalar"
+        return self
+
+    def convert(self, rows: Sequence[Any]) -> List[Any]:
+        """Convert a batch of rows from the cursor to the query's row type."""
+        if self._format == "tuple":
+            return [tuple(row) for row in rows]
+        if self._format == "dict":
+            names = [col.name for col in self.query._columns]
+            return [dict(zip(names, row)) for row in rows]
+        if self._format == "scalar":
+            return [row[0] for row in rows]
+        if self.factory:
+            factory = self.factory
+            return [factory(*row) for row in rows if row]
+        return list(rows)
+
+    async def _fetch_rows(self, size: int) -> Sequence[Any]:
+        cursor = await self.run(stream=True)
+        if self._closed:
+            return []
+        rows = await cursor.fetchmany(size)
+        while not rows and await self._advance():
+            rows = await cursor.fetchmany(size)
+        if not rows:
+            await self.close()
+        return self._decode(rows)
+
+    async def fetch(self, size: int) -> List[T]:
+        """Fetch and convert up to size rows, or none when exhausted."""
+        return self.convert(await self._fetch_rows(size))
+
+    async def columns(
+        self, size: Optional[int] = None, use_numpy: Optional[bool] = None
+    ) -> Dict[str, ColumnData]:
+        """
+        Fetch all remaining rows of a select as a mapping of column name to values.
+
+        Rows are read ``size`` at a time and appended to each column directly,
+        without building row objects. Int, float, and bool columns use compact
+        arrays; when NumPy is installed, or ``use_numpy`` is set, these are
+        returned as NumPy arrays instead.
+        """
+        if self.query._action != QueryAction.select:
+            raise QueryError("columns() requires a select query")
+        if self._buffer:
+            raise QueryError("columns() can't be used after iteration has started")
+        if use_numpy is None:
+            use_numpy = numpy_available()
+        elif use_numpy and not numpy_available():
+            raise ModuleNotFoundError("use_numpy requires numpy to be installed")
+
+        builders = [ColumnBuilder(column) for column in self.query._columns]
+        while True:
+            rows = await self._fetch_rows(size or self.batch_size)
+            if not rows:
+                break
+            for builder, values in zip(builders, zip(*rows)):
+                builder.extend(values)
+
+        return {
+            column.name: builder.finish(use_numpy)
+            for column, builder in zip(self.query._columns, builders)
+        }
+
+    async def close(self) -> None:
+        """Close the underlying cursor, discarding any rows not yet fetched."""
+        if self._cursor is not None and not self._closed:
+            self._closed = True
+            self._pending.clear()
+            await self._cursor.close()
+
+    async def batches(self, size: Optional[int] = None) -> AsyncIterator[List[T]]:
+        """Iterate over lists of up to size converted rows at a time."""
+        size = size or self.batch_size
+        if self._buffer:
+            yield list(self._buffer)
+            self._buffer.clear()
+        while True:
+            batch = await self.fetch(size)
+            if not batch:
+                return
+            yield batch
+
+    async def prefetch(
+        self, batches: int = 2, size: Optional[int] = None
+    ) -> AsyncIterator[T]:
+        """
+        Iterate over rows while a background task reads ahead of the consumer.
+
+        Up to ``batches`` converted batches of ``size`` rows are fetched while
+        the caller is still working on earlier rows, overlapping round trips to
+        the database with row processing. Errors from the reader are raised to
+        the caller. If iteration stops early, the reader stops after the batch
+        it's reading, so the connection is never left mid-result; only when the
+        caller is cancelled while waiting for it is the read itself cancelled,
+        and the connection recovered with :meth:`Connection.interrupted`.
+        """
+        if batches < 1:
+            raise ValueError("batches must be positive")
+
+        queue: "asyncio.Queue[Any]" = asyncio.Queue(batches)
+        stop = asyncio.Event()
+        done = object()
+        reading = False
+
+        async def produce() -> None:
+            nonlocal reading
+            try:
+                reading = True
+                async for batch in self.batches(size):
+                    reading = False
+                    if stop.is_set():
+                        return
+                    await queue.put(batch)
+                    if stop.is_set():
+                        return
+                    reading = True
+                reading = False
+                await queue.put(done)
+            except Exception as e:
+                reading = False
+                await queue.put(e)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is done:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                for row in batch:
+                    yield row
+        finally:
+            stop.set()
+            while not queue.empty():
+                queue.get_nowait()
+            try:
+                await producer
+            finally:
+                if producer.cancelled() and reading:
+                    await self._interrupted()
+                await self.close()
+
+    async def _interrupted(self) -> None:
+        """Recover the connection after a fetch was cancelled part way through."""
+        if self._cursor is not None and not self._closed:
+            if not await self._cursor.connection.interrupted():
+                # the cursor went with its connection, and can't be closed
+                self._closed = True
+                self._pending.clear()
 
     async def row(self) -> Optional[T]:
-        cursor = await self.run()
-        row = await cursor.fetchone()
-        if row and self.factory:
-            return self.factory(*row)
+        if self._cursor is None:
+            await self.run()  # buffered, so the connection isn't left streaming
+        if not self._buffer:
+            self._buffer.extend(await self.fetch(1))
+        if self._buffer and self.factory:
+            return self._buffer.popleft()
         return None
 
-    async def rows(self) -> Sequence[T]:
+    async def _fetch_all(self) -> Sequence[Any]:
         cursor = await self.run()
-        rows = await cursor.fetchall()
+        rows = await cursor.fetchall() if not self._closed else []
+        if self._pending:
+            rows = list(rows)
+            while await self._advance():
+                rows.extend(await cursor.fetchall())
+        if cursor.connection._stream is cursor:
+            await self.close()
+        return self._decode(rows)
+
+    async def _shared_rows(self) -> Optional[List[Any]]:
+        """
+        Rows from the connection's result cache, or from an identical select
+        already in flight, fetching them otherwise, or None if the query can't be
+        shared.
+        """
+        cache = self.connection.result_cache
+        flight = self.connection.single_flight
+        prepared = self._prepare()
+        if self._pending:
+            return None
+        key = ResultCache.key(prepared.sql, prepared.parameters)
+        if key is None:
+            return None
+
+        if cache is not None:
+            await self.connection.validate_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                return self.convert(cached)
+
+        async def fetch() -> Rows:
+            if cache is None:
+                return freeze(await self._fetch_all())
+            tables = self._tables()
+            generation = cache.generation(tables)
+            return cache.put(key, await self._fetch_all(), tables, generation)
+
+        if flight is not None:
+            rows = await flight.run(key, fetch, self._tables())
+        else:
+            rows = await fetch()
+        return self.convert(rows)
+
+    async def rows(self) -> Sequence[T]:
+        connection = self.connection
+        shared = connection.result_cache is not None
+        shared = shared or connection.single_flight is not None
+        select = self.query._action == QueryAction.select
+        if shared and select and self._cursor is None:
+            if not connection._isolated:
+                result = await self._shared_rows()
+                if result is not None:
+                    return result
+
+        rows = await self._fetch_all()
+        if self._buffer:
+            return [*self._buffer, *self.convert(rows)]
         if self.factory:
-            return [self.factory(*row) for row in rows if row]
+            return self.convert(rows)
         else:
             return rows
+
+
+class Statement(Generic[T]):
+    """
+    Query rendered once, and executed many times with different parameter values.
+
+    Use :class:`aql.Param` placeholders anywhere a value is accepted, and bind them
+    by name at execution time. Binding only copies values into a precomputed
+    parameter list; the query is never walked or rendered again.
+
+    Example::
+
+        stmt = db.prepare(Foo.select().where(Foo.id == Param("id")))
+        rows = await stmt.execute(id=5)
+
+        async for row in stmt.execute(id=6):
+            ...
+
+    """
+
+    EXPANDED_SIZE = 32
+
+    def __init__(self, query: Query[T], connection: Connection):
+        self.query = query
+        self.connection = connection
+
+        prepared = connection.engine.prepare(query)
+        self.sql = prepared.sql
+        self.parameters: List[Any] = list(prepared.parameters)
+        self.slots: Dict[str, List[int]] = {}
+        self._encoders: Dict[int, Param] = {}
+        self._fragments: Optional[List[str]] = None
+        self._expanded: LRUCache[str] = LRUCache(self.EXPANDED_SIZE)
+
+        for idx, value in enumerate(self.parameters):
+            if isinstance(value, Param):
+                self.slots.setdefault(value.name, []).append(idx)
+                if value.encode is not None:
+                    self._encoders[idx] = value
+                if value.expand and self._fragments is None:
+                    self._fragments = self.sql.split(connection.engine.PLACEHOLDER)
+
+        if self._fragments and len(self._fragments) != len(self.parameters) + 1:
+            raise BuildError(f"cannot expand parameters in {self.sql!r}")
+
+    def bind(self, **params: Any) -> PreparedQuery[T]:
+        """Return the SQL and parameter list with the given values bound."""
+        if params.keys() != self.slots.keys():
+            missing = sorted(self.slots.keys() - params.keys())
+            unknown = sorted(params.keys() - self.slots.keys())
+            raise QueryError(f"parameters missing {missing}, unknown {unknown}")
+
+        parameters = list(self.parameters)
+        for name, indexes in self.slots.items():
+            value = params[name]
+            for idx in indexes:
+                parameters[idx] = value
+
+        for idx, param in self._encoders.items():
+            assert param.encode is not None
+            value = parameters[idx]
+            if param.expand:
+                parameters[idx] = [param.encode(v) for v in value]
+            elif value is not None:
+                parameters[idx] = param.encode(value)
+
+        if self._fragments is None:
+            return PreparedQuery(self.query.table, self.sql, parameters)
+        return self._expand(parameters)
+
+    def _expand(self, parameters: List[Any]) -> PreparedQuery[T]:
+        """Flatten sequence values bound to expanding placeholders."""
+        assert self._fragments is not None
+        flat: List[Any] = []
+        arity: List[int] = []
+        for template, value in zip(self.parameters, parameters):
+            if isinstance(template, Param) and template.expand:
+                values = list(value)
+                flat.extend(values)
+                arity.append(len(values))
+            else:
+                flat.append(value)
+                arity.append(-1)
+
+        key = tuple(arity)
+        sql = self._expanded.get(key)
+        if sql is None:
+            placeholder = self.connection.engine.PLACEHOLDER
+            parts = [self._fragments[0]]
+            for n, fragment in zip(arity, self._fragments[1:]):
+                if n < 0:
+                    parts.append(placeholder)
+                else:
+                    parts.append(",".join(placeholder for _ in range(n)))
+                parts.append(fragment)
+            sql = "".join(parts)
+            self._expanded.put(key, sql)
+
+        return PreparedQuery(self.query.table, sql, flat)
+
+    def execute(self, **params: Any) -> Result[T]:
+        """Bind the given values and return a lazy result for this statement."""
+        return Result(self.query, self.connection, self.bind(**params))
@@ -0,0 +1,72 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+from array import array
+from typing import Any, Dict, Optional, Sequence
+
+from attr import dataclass
+
+from ..column import Column, ColumnType
+
+try:
+    import numpy
+except ModuleNotFoundError:  # pragma:nocover
+    numpy = None
+
+TYPECODES: Dict[Any, str] = {bool: "b", int: "q", float: "d"}
+DTYPES: Dict[str, str] = {"b": "bool", "q": "int64", "d": "float64"}
+
+
+@dataclass
+class ColumnData:
+    """
+    Values of a single result column.
+
+    Numeric columns are stored as :class:`array.array`, or as NumPy arrays when
+    requested, and other columns as lists. Nullable columns, and any column that
+    returned a NULL, such as from an outer join, include a validity mask, true
+    where the value is present; masked numeric values are zero.
+    """
+
+    values: Any
+    mask: Optional[Any] = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ColumnBuilder:
+    """Accumulate one column of values from successive batches of rows."""
+
+    def __init__(self, column: Column) -> None:
+        ctype = ColumnType.parse(column.ctype) if column.ctype else None
+        self.typecode = TYPECODES.get(ctype.root) if ctype else None
+        self.values: Any = array(self.typecode) if self.typecode else []
+        self.mask: Optional[array] = None
+        if ctype and ctype.nullable:
+            self.mask = array("b")
+
+    def extend(self, values: Sequence[Any]) -> None:
+        if self.mask is None and None in values:
+            self.mask = array("b", [1]) * len(self.values)
+        if self.mask is not None:
+            self.mask.extend(value is not None for value in values)
+            if self.typecode and None in values:
+                values = [0 if value is None else value for value in values]
+        self.values.extend(values)
+
+    def finish(self, use_numpy: bool) -> ColumnData:
+        if not use_numpy:
+            return ColumnData(self.values, self.mask)
+
+        values = self.values
+        if self.typecode:
+            values = numpy.frombuffer(values, dtype=DTYPES[self.typecode])
+        mask = self.mask
+        if mask is not None:
+            mask = numpy.frombuffer(mask, dtype="bool")
+        return ColumnData(values, mask)
+
+
+def numpy_available() -> bool:
+    return numpy is not None
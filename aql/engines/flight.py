@@ -0,0 +1,112 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Set
+
+from attr import dataclass
+
+from ..cache import Rows
+
+
+@dataclass
+class SingleFlightInfo:
+    """
+    Point-in-time statistics for a :class:`SingleFlight`.
+    """
+
+    calls: int
+    coalesced: int
+    inflight: int
+
+
+class SingleFlight:
+    """
+    Coalesces identical reads that are running at the same time.
+
+    The first caller for a key runs the fetch, and every caller arriving with the
+    same key before it finishes waits for, and shares, the same rows. Rows are
+    shared as tuples, so waiters can't change each other's results. If the first
+    caller fails, waiters see the same error; if it's cancelled, the next waiter
+    runs the fetch instead.
+
+    Fetches record the tables they read, and :meth:`invalidate` stops new callers
+    from joining fetches of those tables already in flight, so callers after a
+    write never share rows read before it.
+
+    Share one instance only between connections to the same database.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Future[Rows]"] = {}
+        self._reads: Dict[Hashable, Set[str]] = {}
+        self._tables: Dict[str, Set[Hashable]] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Rows]],
+        tables: Iterable[str] = (),
+    ) -> Rows:
+        """Return rows for key, from a matching fetch in flight, or by fetching."""
+        self.calls += 1
+        while key in self._inflight:
+            future = self._inflight[key]
+            try:
+                rows = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                continue
+            except Exception:
+                self.coalesced += 1
+                raise
+            self.coalesced += 1
+            return rows
+
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[key] = future
+        self._reads[key] = set(tables)
+        for table in self._reads[key]:
+            self._tables.setdefault(table, set()).add(key)
+        try:
+            rows = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # raised by this caller, don't warn if unawaited
+            raise
+        else:
+            future.set_result(rows)
+            return rows
+        finally:
+            if self._inflight.get(key) is future:
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        del self._inflight[key]
+        for table in self._reads.pop(key):
+            keys = self._tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tables[table]
+
+    def invalidate(self, *tables: str) -> None:
+        """Stop new callers from joining fetches in flight for the given tables."""
+        for table in tables:
+            for key in list(self._tables.get(table, ())):
+                self._remove(key)
+
+    def info(self) -> SingleFlightInfo:
+        """Return current call and coalesced counts."""
+        return SingleFlightInfo(
+            calls=self.calls, coalesced=self.coalesced, inflight=len(self._inflight)
+        )
@@ -0,0 +1,125 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+import logging
+import time
+from typing import (
+    Any,
+    AsyncContextManager,
+    Callable,
+    List,
+    Optional,
+    Sequence,
+    TYPE_CHECKING,
+)
+
+from attr import dataclass
+
+from ..query import Query
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .base import Connection
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryTiming:
+    """
+    When a query from :func:`gather` started, relative to the start of the batch,
+    how long it waited for a free connection, and how long it ran.
+    """
+
+    started: float
+    wait: float
+    elapsed: float
+
+    @property
+    def finished(self) -> float:
+        return self.started + self.elapsed
+
+
+class GatherResults(List[Any]):
+    """
+    Results of :func:`gather`, in the same order as the queries.
+
+    ``timings`` holds a :class:`QueryTiming` for each query, or None if the query
+    never ran because it was cancelled.
+    """
+
+    def __init__(
+        self, results: Sequence[Any], timings: Sequence[Optional[QueryTiming]]
+    ) -> None:
+        super().__init__(results)
+        self.timings = list(timings)
+
+    @property
+    def critical_path(self) -> Optional[int]:
+        """Index of the query that finished last, and so bounded the batch."""
+        finished = [
+            (timing.finished, idx)
+            for idx, timing in enumerate(self.timings)
+            if timing is not None
+        ]
+        return max(finished)[1] if finished else None
+
+
+async def gather(
+    acquire: Callable[[], AsyncContextManager["Connection"]],
+    queries: Sequence[Query],
+    concurrency: int,
+    cancel_on_error: bool = False,
+    return_exceptions: bool = False,
+) -> GatherResults:
+    """
+    Execute independent queries concurrently, at most ``concurrency`` at a time.
+
+    Each query runs on a connection from ``acquire``, and its rows are returned in
+    the same position as the query. By default, the first failure is raised once
+    every other query has finished; with ``cancel_on_error``, queries still waiting
+    or running are cancelled first. With ``return_exceptions``, failures are
+    returned in place of rows instead.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be positive")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: List[Optional[QueryTiming]] = [None] * len(queries)
+    start = time.perf_counter()
+
+    async def run(idx: int, query: Query) -> Any:
+        queued = time.perf_counter()
+        async with semaphore:
+            async with acquire() as connection:
+                began = time.perf_counter()
+                try:
+                    return await connection.execute(query)
+                finally:
+                    now = time.perf_counter()
+                    timings[idx] = QueryTiming(
+                        began - start, began - queued, now - began
+                    )
+
+    tasks = [
+        asyncio.ensure_future(run(idx, query)) for idx, query in enumerate(queries)
+    ]
+    try:
+        if cancel_on_error and not return_exceptions:
+            results = await asyncio.gather(*tasks)
+        else:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if not return_exceptions:
+                for result in results:
+                    if isinstance(result, BaseException):
+                        raise result
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    gathered = GatherResults(results, timings)
+    LOG.debug("gathered %d queries in %.4fs", len(queries), time.perf_counter() - start)
+    return gathered
@@ -1,12 +1,14 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
-from typing import Any, List
+from typing import Any, List, Optional
 
-from ..column import NO_DEFAULT, Primary, Unique
+from ..column import ColumnType, NO_DEFAULT, Primary, Unique
 from ..errors import BuildError, NoConnection
 from ..query import PreparedQuery, Query
-from .base import Connection, MissingConnector
+from ..types import Comparison
+from .adapters import Adapter
+from .base import Connection, Cursor, MissingConnector
 from .sql import q, SqlEngine, T
 
 try:
@@ -18,6 +20,19 @@ except ModuleNotFoundError as e:  # pragma:nocover
 class MysqlEngine(SqlEngine, name="mysql"):
 
     PLACEHOLDER = "%s"
+    ADAPTERS = {bool: Adapter(decode=bool)}
+    MAX_PARAMETERS = 65535
+    MAX_PACKET = 4 * 1024 * 1024
+
+    def render_in_json(self, comp: Comparison) -> Optional[str]:
+        if comp.column.ctype is None:
+            return None
+        root = ColumnType.parse(comp.column.ctype).root
+        if root not in self.JSON_TYPES:
+            return None
+        columns = f"COLUMNS (`value` {self.TYPES[root]} PATH '$')"
+        table = f"JSON_TABLE({self.PLACEHOLDER}, '$[*]' {columns}) AS `_in`"
+        return f"(SELECT `value` FROM {table})"
 
     def create(  # pylint:disable=too-many-branches
         self, query: Query[T]
@@ -28,9 +43,7 @@ class MysqlEngine(SqlEngine, name="mysql"):
             ctype = column_types.get(column, None)
             if not ctype:
                 raise BuildError(f"No column type found for {column.name}")
-            if ctype.root not in self.TYPES:
-                raise BuildError(f"Unsupported column type {ctype.root}")
-            parts = [q(column.name), self.TYPES[ctype.root]]
+            parts = [q(column.name), self.column_type(ctype)]
 
             if not ctype.nullable:
                 parts.append("NOT")
@@ -68,6 +81,8 @@ class MysqlEngine(SqlEngine, name="mysql"):
 
 
 class MysqlConnection(Connection, name="mysql", engine=MysqlEngine):
+    _legacy_status = False
+
     async def connect(self) -> None:
         self._conn = await aiomysql.connect(
             *self._args,
@@ -79,6 +94,75 @@ class MysqlConnection(Connection, name="mysql", engine=MysqlEngine):
             db=self.location.database,
             **self._kwargs,
         )
+        await self.discover_limits()
+
+    async def discover_limits(self) -> None:
+        if not isinstance(self.engine, SqlEngine):
+            return  # pragma:nocover
+        async with self._conn.cursor() as cursor:
+            await cursor.execute("SELECT @@max_allowed_packet")
+            (packet,) = await cursor.fetchone()
+        self.engine.max_packet = int(packet)
+
+    async def replica_lag(self) -> Optional[float]:
+        """
+        Seconds behind the primary, or infinity if replication has stopped.
+
+        Uses ``SHOW REPLICA STATUS``, falling back to ``SHOW SLAVE STATUS`` on
+        servers that reject it (MySQL before 8.0.22, MariaDB before 10.5.1).
+        """
+        async with self._conn.cursor(aiomysql.DictCursor) as cursor:
+            status = None
+            field = "Seconds_Behind_Source"
+            if not self._legacy_status:
+                try:
+                    await cursor.execute("SHOW REPLICA STATUS")
+                    status = await cursor.fetchone()
+                except aiomysql.ProgrammingError:
+                    self._legacy_status = True
+            if self._legacy_status:
+                field = "Seconds_Behind_Master"
+                await cursor.execute("SHOW SLAVE STATUS")
+                status = await cursor.fetchone()
+        if not status:
+            return None
+        lag = status.get(field)
+        return float("inf") if lag is None else float(lag)
+
+    async def interrupted(self) -> bool:
+        """
+        The protocol is left mid-result after a cancelled query, so the connection
+        is closed, and must be reconnected before it can be used again.
+        """
+        self._stream = None
+        self._conn.close()
+        return False
+
+    async def ping(self) -> bool:
+        try:
+            await self._conn.ping(reconnect=False)
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return True
+
+    @property
+    def in_transaction(self) -> bool:
+        return bool(self._conn.get_transaction_status())
+
+    async def cursor(self, stream: bool = False) -> Cursor:
+        """
+        Return a new cursor object.
+
+        Streaming cursors use :class:`aiomysql.SSCursor`, reading rows from the
+        server as they are fetched rather than buffering the entire result set.
+        """
+        self._check_busy()
+        if stream:
+            cur = await self._conn.cursor(aiomysql.SSCursor)
+            self._stream = Cursor(self, cur)
+            return self._stream
+        cur = await self._conn.cursor()
+        return Cursor(self, cur)
 
     async def close(self) -> None:
         """Close the connection."""
@@ -0,0 +1,291 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from attr import dataclass
+
+from ..cache import ResultCache
+from ..errors import PoolClosed
+
+from ..query import Query
+from ..types import Location
+from .base import Connection
+from .flight import SingleFlight
+from .gather import gather, GatherResults
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    """
+    Running totals for a connection pool.
+    """
+
+    acquired: int = 0
+    created: int = 0
+    closed: int = 0
+    failed_checks: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+    max_wait: float = 0.0
+
+
+class Pool:
+    """
+    Pool of connections to a single database location.
+
+    Connections are created on demand, up to ``max_size``, and reused after
+    release. Idle connections beyond ``min_size`` are closed after
+    ``idle_timeout`` seconds, and any connection older than ``max_lifetime``
+    seconds is replaced. With ``check_on_acquire``, idle connections are pinged
+    before being handed out, and replaced if the check fails. All connections in
+    the pool share one engine, and therefore one compiled SQL cache. Given a
+    :class:`aql.cache.ResultCache`, every connection shares it, so writes through
+    any pooled connection invalidate results cached by the others. Likewise, a
+    shared :class:`aql.engines.flight.SingleFlight` coalesces identical selects
+    running on any of the pooled connections.
+
+    Example::
+
+        async with aql.pool("sqlite://foo.db", max_size=4) as pool:
+            async with pool.acquire() as db:
+                rows = await db.execute(Foo.select())
+
+    """
+
+    def __init__(
+        self,
+        location: Location,
+        *args: Any,
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: Optional[float] = 300.0,
+        max_lifetime: Optional[float] = 3600.0,
+        check_on_acquire: bool = True,
+        result_cache: Optional[ResultCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        **kwargs: Any,
+    ) -> None:
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"invalid pool size {min_size}..{max_size}")
+
+        self.location = location
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.check_on_acquire = check_on_acquire
+        self.result_cache = result_cache
+        self.single_flight = single_flight
+        self.stats = PoolStats()
+
+        self._args = args
+        self._kwargs = kwargs
+        self._connector, engine_kls = Connection.get_connector(location.engine)
+        self.engine = engine_kls()
+
+        self._size = 0
+        self._closed = False
+        self._idle: Deque[Tuple[Connection, float]] = deque()
+        self._born: Dict[Connection, float] = {}
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    async def __aenter__(self) -> "Pool":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    @property
+    def size(self) -> int:
+        """Number of open (or opening) connections, idle or in use."""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """Number of open connections waiting to be acquired."""
+        return len(self._idle)
+
+    async def open(self) -> None:
+        """Open the minimum number of connections."""
+        while self._size < self.min_size:
+            self._size += 1
+            try:
+                conn = await self._connect()
+            except BaseException:
+                self._size -= 1
+                raise
+            self._idle.append((conn, time.monotonic()))
+
+    async def close(self) -> None:
+        """Close idle connections now, and in-use connections once released."""
+        self._closed = True
+        while self._idle:
+            conn, _ = self._idle.popleft()
+            await self._discard(conn)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(PoolClosed("pool closed"))
+
+    async def gather(
+        self,
+        *queries: Query,
+        concurrency: Optional[int] = None,
+        cancel_on_error: bool = False,
+        return_exceptions: bool = False,
+    ) -> GatherResults:
+        """
+        Execute independent queries concurrently on separate pooled connections.
+
+        Concurrency defaults to ``max_size``. Rows are returned in input order.
+        See :func:`aql.engines.gather.gather` for details.
+        """
+        return await gather(
+            self.acquire,
+            queries,
+            concurrency or self.max_size,
+            cancel_on_error,
+            return_exceptions,
+        )
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Connection]:
+        """Check out a connection for the duration of the context."""
+        conn = await self.checkout()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    async def checkout(self) -> Connection:
+        """
+        Take a connection from the pool, waiting for one if the pool is exhausted.
+
+        Prefer :meth:`acquire`; connections taken here must be passed back to
+        :meth:`release`.
+        """
+        start = time.monotonic()
+        waited = False
+        while True:
+            if self._closed:
+                raise PoolClosed("pool closed")
+
+            conn = await self._take_idle()
+            if conn is None and self._size < self.max_size:
+                self._size += 1
+                try:
+                    conn = await self._connect()
+                except BaseException:
+                    self._size -= 1
+                    self._wake()
+                    raise
+
+            if conn is not None:
+                self.stats.acquired += 1
+                if waited:
+                    elapsed = time.monotonic() - start
+                    self.stats.waits += 1
+                    self.stats.wait_time += elapsed
+                    self.stats.max_wait = max(self.stats.max_wait, elapsed)
+                return conn
+
+            waited = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    self._wake()
+                raise
+
+    async def release(self, conn: Connection) -> None:
+        """Return a connection to the pool."""
+        if conn not in self._born or any(idle is conn for idle, _ in self._idle):
+            LOG.warning("ignoring release of connection not checked out: %s", conn)
+            return
+        if self._closed or self._expired(conn):
+            await self._discard(conn)
+        else:
+            if conn._stream is not None:
+                await conn._stream.close()
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.append((conn, time.monotonic()))
+            await self._prune()
+        self._wake()
+
+    async def _take_idle(self) -> Optional[Connection]:
+        """Most recently used idle connection that is still usable, if any."""
+        while self._idle:
+            conn, last_used = self._idle.pop()
+            # like _prune, keep connections idle too long if needed for min_size
+            idle_since = last_used if self._size > self.min_size else None
+            if self._expired(conn, idle_since):
+                await self._discard(conn)
+            elif self.check_on_acquire and not await conn.ping():
+                LOG.warning("discarding connection to %s after failed ping", conn)
+                self.stats.failed_checks += 1
+                await self._discard(conn)
+            else:
+                return conn
+        return None
+
+    async def _prune(self) -> None:
+        """Close connections idle beyond the timeout, down to the minimum size."""
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used <= self.idle_timeout:
+                break
+            self._idle.popleft()
+            await self._discard(conn)
+
+    def _expired(self, conn: Connection, last_used: Optional[float] = None) -> bool:
+        now = time.monotonic()
+        born = self._born.get(conn)
+        if self.max_lifetime is not None and born is not None:
+            if now - born > self.max_lifetime:
+                return True
+        if self.idle_timeout is not None and last_used is not None:
+            return now - last_used > self.idle_timeout
+        return False
+
+    def _wake(self) -> None:
+        """Wake the oldest waiter, if any, to retry checking out a connection."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _connect(self) -> Connection:
+        conn = self._connector(self.engine, self.location, *self._args, **self._kwargs)
+        await conn.connect()
+        conn.result_cache = self.result_cache
+        conn.single_flight = self.single_flight
+        self._born[conn] = time.monotonic()
+        self.stats.created += 1
+        return conn
+
+    async def _discard(self, conn: Connection) -> None:
+        self._size -= 1
+        self._born.pop(conn, None)
+        self.stats.closed += 1
+        try:
+            await conn.close()
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("error closing pooled connection")
@@ -0,0 +1,516 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import suppress
+from enum import Enum
+from typing import Any, Deque, List, Optional, Sequence, Set, TypeVar
+
+from attr import dataclass
+
+from ..query import PreparedQuery, Query
+from ..types import Location, QueryAction
+from .base import Connection, Cursor, Result
+
+LOG = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+class Balance(Enum):
+    """How a replicated connection chooses a replica for each read."""
+
+    round_robin = "round_robin"
+    least_outstanding = "least_outstanding"
+
+
+@dataclass
+class Replica:
+    """
+    Connection to a read replica, and its state from the latest health check.
+
+    While ``checking``, the connection is in use by a health check, and the
+    replica receives no reads.
+    """
+
+    connection: Connection
+    healthy: bool = True
+    lag: Optional[float] = None
+    outstanding: int = 0
+    checking: bool = False
+
+
+@dataclass
+class ReplicaStats:
+    """
+    Running totals for a replicated connection.
+
+    ``primary_reads`` includes reads pinned to the primary after a write, and
+    reads that fell back to the primary with no healthy replica. ``hedges`` counts
+    reads sent to a second replica after a delay, and ``hedges_won`` those where
+    the second replica answered first.
+    """
+
+    replica_reads: int = 0
+    primary_reads: int = 0
+    pinned_reads: int = 0
+    fallback_reads: int = 0
+    checks: int = 0
+    failed_checks: int = 0
+    hedges: int = 0
+    hedges_won: int = 0
+
+
+class ReplicaResult(Result[T]):
+    """
+    Result of a query on a replicated connection, tracking queries in progress
+    on each replica, and recent writes on the primary.
+
+    Selects sent to a replica can be hedged: if the replica hasn't answered after
+    a delay, the same statement is sent to another healthy replica, and whichever
+    answers first is used, cancelling the other. If cancelling leaves the losing
+    replica's connection unusable, it's reconnected in the background before it
+    receives more reads. Hedging applies to every select
+    when the connection sets ``hedge_after`` or ``hedge_percentile``, or to a
+    single result after calling :meth:`hedge`.
+    """
+
+    connection: "ReplicatedConnection"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._hedge = False
+        self._hedge_after: Optional[float] = None
+
+    def hedge(self, after: Optional[float] = None) -> "ReplicaResult[T]":
+        """
+        Hedge this select after ``after`` seconds, or the connection's delay.
+        """
+        if after is None and not self.connection.hedging:
+            raise ValueError("hedge() requires a delay when the connection has none")
+        self._hedge = True
+        self._hedge_after = after
+        return self
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.query._action != QueryAction.select:
+            return None
+        if self._hedge_after is not None:
+            return self._hedge_after
+        if self._hedge or self.connection.hedging:
+            return self.connection.hedge_delay()
+        return None
+
+    async def run(self, stream: bool = False) -> Cursor:
+        delay = self._hedge_delay()
+        if self._cursor is not None or delay is None:
+            return await super().run(stream)
+
+        prepared = self._prepare()
+        connection = self.connection.route(self.query)
+        backup = self.connection.backup_for(connection)
+        if backup is None:
+            self._cursor = await connection.cursor(stream=stream)
+            await self._execute(prepared)
+        else:
+            self._cursor = await self._race(prepared, connection, backup, delay, stream)
+        return self._cursor
+
+    async def _attempt(
+        self, prepared: PreparedQuery[T], connection: Connection, stream: bool
+    ) -> Cursor:
+        """Execute a statement on a new cursor from the given connection."""
+        cursor = await connection.cursor(stream=stream)
+        try:
+            await self._execute(prepared, cursor)
+        except asyncio.CancelledError:
+            await self.connection._recover(connection)
+            raise
+        except BaseException:
+            await cursor.close()
+            raise
+        return cursor
+
+    async def _race(
+        self,
+        prepared: PreparedQuery[T],
+        connection: Connection,
+        backup: Connection,
+        delay: float,
+        stream: bool,
+    ) -> Cursor:
+        """Run on both connections, starting the backup after the delay."""
+        first = asyncio.ensure_future(self._attempt(prepared, connection, stream))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        stats = self.connection.stats
+        stats.hedges += 1
+        LOG.debug("hedging select after %.4fs", delay)
+        second = asyncio.ensure_future(self._attempt(prepared, backup, stream))
+        pending = {first, second}
+        winner: Optional["asyncio.Future[Cursor]"] = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in (first, second):
+                    if task in done and task.exception() is None:
+                        winner = task
+                        break
+            if winner is None:
+                error = first.exception() or second.exception()
+                assert error is not None
+                raise error
+            if winner is second:
+                stats.hedges_won += 1
+            return winner.result()
+        finally:
+            for task in (first, second):
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await task
+                elif not task.cancelled() and task.exception() is None:
+                    await task.result().close()
+
+    async def _execute(
+        self, prepared: PreparedQuery[T], cursor: Optional[Cursor] = None
+    ) -> None:
+        cursor = cursor or self._cursor
+        assert cursor is not None
+        replica = self.connection.replica_for(cursor.connection)
+        if replica is None:
+            await super()._execute(prepared, cursor)
+            if self.query._action != QueryAction.select:
+                self.connection.wrote()
+            return
+
+        replica.outstanding += 1
+        before = time.monotonic()
+        try:
+            await super()._execute(prepared, cursor)
+            self.connection.latencies.append(time.monotonic() - before)
+        finally:
+            replica.outstanding -= 1
+
+
+class ReplicatedConnection(Connection):
+    """
+    Connection to a primary database and one or more read replicas.
+
+    Select queries are sent to a healthy replica, chosen round-robin or by the
+    fewest queries in progress. Everything else, and any query while a
+    transaction is open after :meth:`begin` or a write, goes to the primary.
+    Implicit transactions opened by reads on the primary don't pin later reads
+    there. With ``read_your_writes``, reads
+    also go to the primary for that many seconds after each write or commit, so
+    they see changes not yet replicated.
+
+    Every ``check_interval`` seconds, or when calling :meth:`check`, replicas are
+    pinged and asked for their replication lag. Replicas that fail, or that lag
+    more than ``max_lag`` seconds behind, stop receiving reads until a later check
+    succeeds, reconnecting if needed. When no replica is healthy, reads fall back
+    to the primary.
+
+    Example::
+
+        db = aql.replicated("mysql://primary", ["mysql://r1", "mysql://r2"])
+        async with db:
+            await db.execute(Users.update(name="x").where(Users.id == 1))
+            rows = await db.execute(Users.select())
+
+    """
+
+    LATENCY_SAMPLES = 1000
+    MIN_LATENCY_SAMPLES = 20
+
+    def __init__(
+        self,
+        primary: Location,
+        replicas: Sequence[Location],
+        *args: Any,
+        balance: Balance = Balance.round_robin,
+        read_your_writes: float = 0.0,
+        max_lag: Optional[float] = None,
+        check_interval: Optional[float] = 5.0,
+        hedge_after: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+            raise ValueError("hedge_percentile must be between 0 and 100")
+        engines = {location.engine for location in (primary, *replicas)}
+        if len(engines) > 1:
+            raise ValueError(
+                f"replicas must use the same engine, got {sorted(engines)}"
+            )
+
+        connector, engine_kls = Connection.get_connector(primary.engine)
+        super().__init__(engine_kls(), primary, *args, **kwargs)
+        self.balance = Balance(balance)
+        self.read_your_writes = read_your_writes
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.latencies: Deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+        self.stats = ReplicaStats()
+
+        self.primary = connector(self.engine, primary, *args, **kwargs)
+        self.replicas: List[Replica] = [
+            Replica(connector(self.engine, location, *args, **kwargs))
+            for location in replicas
+        ]
+        self._next = 0
+        self._pinned_until = 0.0
+        self._checker: Optional["asyncio.Task[None]"] = None
+        self._revivals: Set["asyncio.Task[None]"] = set()
+
+    async def connect(self) -> None:
+        await self.primary.connect()
+        await asyncio.gather(*(self._connect(replica) for replica in self.replicas))
+        if self.check_interval and self.replicas:
+            self._checker = asyncio.ensure_future(self._check_loop())
+
+    async def _connect(self, replica: Replica) -> None:
+        try:
+            await replica.connection.connect()
+            replica.healthy = True
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("failed to connect to replica %s", replica.connection)
+            replica.healthy = False
+
+    async def close(self) -> None:
+        if self._checker is not None:
+            self._checker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._checker
+            self._checker = None
+        for task in list(self._revivals):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        for replica in self.replicas:
+            with suppress(Exception):
+                await replica.connection.close()
+        await self.primary.close()
+
+    async def _check_loop(self) -> None:
+        assert self.check_interval
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception:  # pylint: disable=broad-except
+                LOG.exception("replica health check failed")
+
+    async def check(self) -> None:
+        """Update the health and lag of every replica not currently in use."""
+        for replica in self.replicas:
+            conn = replica.connection
+            if replica.outstanding or replica.checking or conn._stream is not None:
+                continue
+
+            replica.checking = True
+            try:
+                await self._check(replica)
+            finally:
+                replica.checking = False
+
+    async def _revive(self, replica: Replica) -> None:
+        """Check a replica straight away, reconnecting it if it's unusable."""
+        replica.checking = True
+        try:
+            await self._check(replica)
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("failed to recover replica %s", replica.connection)
+        finally:
+            replica.checking = False
+
+    async def _check(self, replica: Replica) -> None:
+        """Ping a replica, reconnecting if needed, and read its lag."""
+        conn = replica.connection
+        self.stats.checks += 1
+        was_healthy = replica.healthy
+        healthy = await conn.ping()
+        if not healthy:
+            with suppress(Exception):
+                await conn.close()
+            await self._connect(replica)
+            healthy = replica.healthy and await conn.ping()
+
+        lag = None
+        if healthy:
+            try:
+                lag = await conn.replica_lag()
+            except Exception:  # pylint: disable=broad-except
+                LOG.exception("failed to read replication lag from %s", conn)
+                healthy = False
+        if healthy and lag is not None and self.max_lag is not None:
+            healthy = lag <= self.max_lag
+
+        if not healthy:
+            self.stats.failed_checks += 1
+        if healthy != was_healthy:
+            LOG.warning(
+                "replica %s is now %s (lag %s)",
+                conn.location,
+                "healthy" if healthy else "unhealthy",
+                lag,
+            )
+        replica.healthy = healthy
+        replica.lag = lag
+
+    def replica_for(self, connection: Connection) -> Optional[Replica]:
+        """Replica using the given connection, or None for the primary."""
+        for replica in self.replicas:
+            if replica.connection is connection:
+                return replica
+        return None
+
+    def wrote(self) -> None:
+        """Send reads to the primary for the ``read_your_writes`` window."""
+        if self.read_your_writes:
+            self._pinned_until = time.monotonic() + self.read_your_writes
+
+    @property
+    def pinned(self) -> bool:
+        """Whether reads currently go to the primary after a recent write."""
+        return time.monotonic() < self._pinned_until
+
+    def choose(self, exclude: Optional[Connection] = None) -> Optional[Replica]:
+        """Healthy replica for the next read, or None if there are none."""
+        count = len(self.replicas)
+        candidates = [
+            self.replicas[(self._next + offset) % count] for offset in range(count)
+        ]
+        candidates = [
+            replica
+            for replica in candidates
+            if replica.healthy and not replica.checking
+            if replica.connection is not exclude
+        ]
+        if not candidates:
+            return None
+
+        if self.balance == Balance.least_outstanding:
+            choice = min(candidates, key=lambda replica: replica.outstanding)
+        else:
+            choice = candidates[0]
+        self._next = (self.replicas.index(choice) + 1) % count
+        return choice
+
+    def route(self, query: Query[T]) -> Connection:
+        if query._action != QueryAction.select:
+            if not self.autocommit:
+                self._transaction = True
+            self.wrote()
+            return self.primary
+
+        replica = None
+        if self.pinned:
+            self.stats.pinned_reads += 1
+        elif not (self._transaction and self.in_transaction):
+            replica = self.choose()
+            if replica is None and self.replicas:
+                self.stats.fallback_reads += 1
+
+        if replica is None:
+            self.stats.primary_reads += 1
+            return self.primary
+        self.stats.replica_reads += 1
+        return replica.connection
+
+    @property
+    def hedging(self) -> bool:
+        """Whether selects on replicas are hedged by default."""
+        return self.hedge_after is not None or self.hedge_percentile is not None
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Seconds to wait for a replica before hedging a read.
+
+        With ``hedge_percentile``, this is that percentile of recent replica query
+        times, once at least ``MIN_LATENCY_SAMPLES`` have been seen, and
+        ``hedge_after`` until then.
+        """
+        samples = self.latencies
+        if self.hedge_percentile is not None:
+            if len(samples) >= self.MIN_LATENCY_SAMPLES:
+                ordered = sorted(samples)
+                idx = int(len(ordered) * self.hedge_percentile / 100)
+                return ordered[min(idx, len(ordered) - 1)]
+        return self.hedge_after
+
+    def backup_for(self, connection: Connection) -> Optional[Connection]:
+        """Another healthy replica to hedge a read sent to the given replica."""
+        if self.replica_for(connection) is None:
+            return None
+        replica = self.choose(exclude=connection)
+        return replica.connection if replica else None
+
+    async def _recover(self, connection: Connection) -> None:
+        """
+        Reconnect a replica if a cancelled read left it unusable.
+
+        The replica receives no reads until a health check, started in the
+        background right away, has reconnected it, so losing a hedge never takes
+        a replica out of rotation for longer than a reconnect, even without
+        periodic checks.
+        """
+        replica = self.replica_for(connection)
+        if await connection.interrupted() or replica is None:
+            return
+
+        replica.healthy = False
+        task = asyncio.ensure_future(self._revive(replica))
+        self._revivals.add(task)
+        task.add_done_callback(self._revivals.discard)
+
+    def execute(self, query: Query[T], batch_size: Optional[int] = None) -> Result[T]:
+        return ReplicaResult(query, self, batch_size=batch_size)
+
+    async def cursor(self, stream: bool = False) -> Cursor:
+        return await self.primary.cursor(stream=stream)
+
+    async def ping(self) -> bool:
+        return await self.primary.ping()
+
+    async def discover_limits(self) -> None:
+        await self.primary.discover_limits()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.primary.in_transaction
+
+    @property
+    def autocommit(self) -> bool:
+        return self.primary.autocommit
+
+    @autocommit.setter
+    def autocommit(self, value: bool) -> None:
+        self.primary.autocommit = value
+
+    async def begin(self) -> None:
+        await self.primary.begin()
+        self._transaction = True
+
+    async def commit(self) -> None:
+        await self.primary.commit()
+        self._transaction = False
+        self._committed()
+        self.wrote()
+
+    async def rollback(self) -> None:
+        await self.primary.rollback()
+        self._transaction = False
+        self._written.clear()
+
+    query = execute
@@ -0,0 +1,507 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+import heapq
+import logging
+import zlib
+from bisect import bisect_right
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from uuid import UUID
+
+from ..column import Column
+from ..errors import BuildError, QueryError, UnroutableQuery
+from ..query import Query
+from ..types import (
+    And,
+    Clause,
+    Comparison,
+    Location,
+    Operator,
+    Or,
+    Order,
+    Param,
+    QueryAction,
+    Select,
+)
+from .base import Connection, Cursor, Result
+
+LOG = logging.getLogger(__name__)
+T = TypeVar("T")
+
+ShardFunction = Callable[[Any, int], int]
+
+
+def hash_shard(value: Any, count: int) -> int:
+    """
+    Shard index from the CRC32 of a value, stable across processes and restarts.
+    """
+    if isinstance(value, bytes):
+        data = value
+    elif isinstance(value, UUID):
+        data = value.bytes
+    else:
+        data = str(value).encode()
+    return zlib.crc32(data) % count
+
+
+class RangeShards:
+    """
+    Shard function assigning contiguous ranges of values to each shard.
+
+    ``bounds`` are the lowest values of every shard after the first, in order, so
+    ``RangeShards([100, 200])`` sends values below 100 to shard 0, values from 100
+    up to 200 to shard 1, and everything else to shard 2.
+    """
+
+    def __init__(self, bounds: Sequence[Any]) -> None:
+        if list(bounds) != sorted(bounds):
+            raise ValueError("range shard bounds must be sorted")
+        self.bounds = list(bounds)
+
+    def __call__(self, value: Any, count: int) -> int:
+        if len(self.bounds) + 1 != count:
+            raise ValueError(f"{len(self.bounds)} range bounds for {count} shards")
+        return bisect_right(self.bounds, value)
+
+
+class Descending:
+    """Sort key wrapper that reverses the order of the wrapped value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Descending) and self.value == other.value
+
+    def __lt__(self, other: "Descending") -> bool:
+        return other.value < self.value
+
+
+def merge_key(
+    query: Query[Any], collate: Optional[Callable[[str], Any]] = None
+) -> Optional[Callable[[Sequence[Any]], Tuple]]:
+    """
+    Sort key for raw rows of a select, matching the query's order by clause.
+
+    Nulls sort first in ascending order, and last in descending order, like both
+    SQLite and MySQL. Strings compare by code point, like SQLite's default binary
+    collation, unless ``collate`` is given to transform them first, such as
+    :meth:`str.casefold` for case-insensitive MySQL collations. Returns None for
+    queries without an order.
+    """
+    if not query._order:
+        return None
+
+    positions: List[Tuple[int, bool]] = []
+    for column, order in query._order:
+        for idx, selected in enumerate(query._columns):
+            if selected is column:
+                positions.append((idx, order == Order.desc))
+                break
+        else:
+            raise BuildError(f"merging results requires selecting {column.name}")
+
+    def key(row: Sequence[Any]) -> Tuple:
+        values: List[Any] = []
+        for idx, desc in positions:
+            value = row[idx]
+            if collate is not None and isinstance(value, str):
+                value = collate(value)
+            pair = (value is not None, value)
+            values.append(Descending(pair) if desc else pair)
+        return tuple(values)
+
+    return key
+
+
+class ShardedResult(Result[T]):
+    """
+    Result of a query split into parts for several shards.
+
+    Writes run concurrently on every shard when awaited. Selects are sent to every
+    shard at once, and rows are streamed back ``batch_size`` at a time from each
+    shard, merged in the query's order. Limits are applied to the merged rows, and
+    each shard is asked for at most ``limit + offset`` rows. At most one batch of
+    rows per shard is held in memory while iterating.
+
+    Merging compares rows in Python, so the order must match how each shard
+    sorted them. Pass ``collate`` when ordering by strings on a database whose
+    collation doesn't compare by code point; see :func:`merge_key`.
+    """
+
+    def __init__(
+        self,
+        query: Query[T],
+        connection: Connection,
+        parts: Sequence[Tuple[Connection, Query[T]]],
+        batch_size: Optional[int] = None,
+        collate: Optional[Callable[[str], Any]] = None,
+    ):
+        super().__init__(query, connection, batch_size=batch_size)
+        self._key: Optional[Callable[[Sequence[Any]], Tuple]] = None
+        self._merged: Optional[AsyncGenerator[Any, None]] = None
+        if query._action == QueryAction.select:
+            if query._groupby or query._selector == Select.distinct:
+                raise BuildError("can't merge grouped or distinct rows across shards")
+            self.factory = query.factory()
+            self._key = merge_key(query, collate)
+            parts = [(shard, self._pushdown(part)) for shard, part in parts]
+        self.results: List[Result[T]] = [
+            Result(part, shard, batch_size=batch_size) for shard, part in parts
+        ]
+
+    @staticmethod
+    def _pushdown(query: Query[T]) -> Query[T]:
+        """Per-shard query, returning every row the merged result might need."""
+        offset = query._offset
+        if not offset:
+            return query
+        query = query._copy()
+        if query._limit is not None:
+            query._limit += offset
+        query._offset = None
+        return query
+
+    @property
+    def row_count(self) -> int:
+        return sum(result.row_count for result in self.results)
+
+    @property
+    def last_id(self) -> Optional[int]:
+        return None
+
+    async def run(self, stream: bool = False) -> Cursor:
+        raise QueryError("sharded results have no single cursor")
+
+    async def _merge(self) -> AsyncGenerator[Any, None]:
+        """Rows from every shard in order, with the query's offset and limit."""
+        size = self.batch_size
+        results = self.results
+        skip = self.query._offset or 0
+        remaining = self.query._limit
+        key = self._key
+
+        try:
+            # wait for every shard before raising, so none is left mid-fetch
+            firsts = await asyncio.gather(
+                *(r._fetch_rows(size) for r in results), return_exceptions=True
+            )
+            buffers: List[Sequence[Any]] = []
+            for rows in firsts:
+                if isinstance(rows, BaseException):
+                    raise rows
+                buffers.append(rows)
+
+            if key is None:
+                heap = [((), idx, 0) for idx, rows in enumerate(buffers) if rows]
+            else:
+                heap = [
+                    (key(rows[0]), idx, 0) for idx, rows in enumerate(buffers) if rows
+                ]
+                heapq.heapify(heap)
+
+            while heap and remaining != 0:
+                _, idx, pos = heap[0]
+                rows = buffers[idx]
+                row = rows[pos]
+                pos += 1
+                if pos == len(rows):
+                    rows = buffers[idx] = await results[idx]._fetch_rows(size)
+                    pos = 0
+                if key is None:
+                    # without an order, read each shard to the end in turn
+                    if rows:
+                        heap[0] = ((), idx, pos)
+                    else:
+                        heap.pop(0)
+                elif rows:
+                    heapq.heapreplace(heap, (key(rows[pos]), idx, pos))
+                else:
+                    heapq.heappop(heap)
+
+                if skip:
+                    skip -= 1
+                    continue
+                if remaining is not None:
+                    remaining -= 1
+                yield row
+        finally:
+            for result in results:
+                await result.close()
+
+    async def _fetch_rows(self, size: int) -> Sequence[Any]:
+        if self.query._action != QueryAction.select:
+            for result in self.results:
+                batch = await result._fetch_rows(size)
+                if batch:
+                    return batch
+            return []
+
+        if self._closed:
+            return []
+        if self._merged is None:
+            self._merged = self._merge()
+        rows: List[Any] = []
+        while len(rows) < size:
+            try:
+                rows.append(await self._merged.__anext__())
+            except StopAsyncIteration:
+                self._closed = True
+                break
+        return rows
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._merged is not None:
+            await self._merged.aclose()
+        for result in self.results:
+            await result.close()
+
+    async def rows(self) -> Sequence[T]:
+        if self.query._action == QueryAction.select:
+            rows: List[T] = list(self._buffer)
+            self._buffer.clear()
+            while True:
+                batch = await self.fetch(self.batch_size)
+                if not batch:
+                    return rows
+                rows.extend(batch)
+
+        for result in self.results:
+            result._format = self._format
+        parts = await asyncio.gather(*(result.rows() for result in self.results))
+        return [row for part in parts for row in part]
+
+
+class ShardedConnection(Connection):
+    """
+    Connection to several databases, each holding a partition of the data.
+
+    Rows live on the shard chosen by calling ``shard(value, count)`` with the value
+    of the ``key`` column, using :func:`hash_shard` by default, or
+    :class:`RangeShards`. Every query is sent to the one shard matching the
+    key's value in its where clause, either equality or ``in_()`` with values
+    on a single shard. Inserts are split by row, and each shard's rows are
+    inserted concurrently. Any query that can't be matched to a single shard
+    raises :class:`aql.errors.UnroutableQuery`.
+
+    Transactions span every shard, but are committed on each shard separately,
+    so a failure partway through a commit is not rolled back elsewhere.
+
+    Example::
+
+        db = aql.sharded(["mysql://...", "mysql://..."], "tenant_id")
+        async with db:
+            await db.execute(Orders.insert().values(*orders))
+            rows = await db.execute(Orders.select().where(Orders.tenant_id == 7))
+
+    """
+
+    def __init__(
+        self,
+        locations: Sequence[Location],
+        key: Union[Column, str],
+        shard: ShardFunction = hash_shard,
+        *args: Any,
+        **kwargs: Any,
+    ):
+        if not locations:
+            raise ValueError("sharded connection requires at least one location")
+        engines = {location.engine for location in locations}
+        if len(engines) > 1:
+            raise ValueError(f"shards must use the same engine, got {sorted(engines)}")
+
+        connector, engine_kls = Connection.get_connector(locations[0].engine)
+        super().__init__(engine_kls(), locations[0], *args, **kwargs)
+        self.locations = list(locations)
+        self.key = key.name if isinstance(key, Column) else key
+        self.shard = shard
+        self.shards: List[Connection] = [
+            connector(self.engine, location, *args, **kwargs) for location in locations
+        ]
+
+    async def connect(self) -> None:
+        await asyncio.gather(*(shard.connect() for shard in self.shards))
+
+    async def close(self) -> None:
+        await asyncio.gather(*(shard.close() for shard in self.shards))
+
+    async def ping(self) -> bool:
+        results = await asyncio.gather(*(shard.ping() for shard in self.shards))
+        return all(results)
+
+    async def discover_limits(self) -> None:
+        await self.shards[0].discover_limits()
+
+    @property
+    def in_transaction(self) -> bool:
+        return any(shard.in_transaction for shard in self.shards)
+
+    @property
+    def autocommit(self) -> bool:
+        return self.shards[0].autocommit
+
+    @autocommit.setter
+    def autocommit(self, value: bool) -> None:
+        for shard in self.shards:
+            shard.autocommit = value
+
+    async def begin(self) -> None:
+        for shard in self.shards:
+            await shard.begin()
+        self._transaction = True
+
+    async def commit(self) -> None:
+        for shard in self.shards:
+            await shard.commit()
+        self._transaction = False
+
+    async def rollback(self) -> None:
+        for shard in self.shards:
+            await shard.rollback()
+        self._transaction = False
+
+    async def cursor(self, stream: bool = False) -> Cursor:
+        raise UnroutableQuery("choose a shard with shard_for() to use a raw cursor")
+
+    def shard_for(self, value: Any) -> Connection:
+        """Shard holding rows with the given value of the key column."""
+        return self.shards[self.shard(value, len(self.shards))]
+
+    def _clause_shards(self, clause: Clause) -> Optional[Set[int]]:
+        """Shards that may hold rows matching a clause, or None for any shard."""
+        if isinstance(clause, Comparison):
+            if clause.column.name != self.key or isinstance(clause.value, Param):
+                return None
+            if clause.operator == Operator.eq:
+                values = [clause.value]
+            elif clause.operator == Operator.in_:
+                values = clause.value
+            else:
+                return None
+            count = len(self.shards)
+            return {self.shard(value, count) for value in values}
+
+        if isinstance(clause, And):
+            shards: Optional[Set[int]] = None
+            for sub in clause.clauses:
+                found = self._clause_shards(sub)
+                if found is not None:
+                    shards = found if shards is None else shards & found
+            return shards
+
+        if isinstance(clause, Or):
+            shards = set()
+            for sub in clause.clauses:
+                found = self._clause_shards(sub)
+                if found is None:
+                    return None
+                shards |= found
+            return shards
+
+        return None
+
+    def _row_shards(self, query: Query[T]) -> Dict[int, List[Any]]:
+        """Rows of an insert, grouped by shard in their original order."""
+        if self.key not in {column.name for column in query._columns}:
+            raise UnroutableQuery(f"insert into {query.table._name} without {self.key}")
+        groups: Dict[int, List[Any]] = {}
+        count = len(self.shards)
+        for row in query._rows:
+            idx = self.shard(getattr(row, self.key), count)
+            groups.setdefault(idx, []).append(row)
+        return groups
+
+    def split(self, query: Query[T]) -> List[Tuple[Connection, Query[T]]]:
+        """
+        Divide a query into the parts to run on each shard.
+
+        Inserts produce one query per shard with rows to insert; any other query
+        must match exactly one shard.
+        """
+        if query._action == QueryAction.insert:
+            groups = self._row_shards(query)
+            if not groups:
+                return [(self.shards[0], query)]
+            parts = []
+            for idx, rows in sorted(groups.items()):
+                part = query._copy()
+                part._rows = rows
+                parts.append((self.shards[idx], part))
+            return parts
+
+        if query._action in (QueryAction.create, QueryAction.unset):
+            raise UnroutableQuery(
+                f"{query._action.name} queries must be run on each shard directly"
+            )
+        if any(column.name == self.key for column in query._updates):
+            raise BuildError(f"updating shard key {self.key} would move rows")
+
+        shards = self._clause_shards(And(*query._where))
+        hint = "; use scatter()" if query._action == QueryAction.select else ""
+        if shards is None:
+            raise UnroutableQuery(
+                f"{query._action.name} on {query.table._name} has no condition "
+                f"on shard key {self.key}{hint}"
+            )
+        if len(shards) != 1:
+            raise UnroutableQuery(
+                f"{query._action.name} on {query.table._name} spans "
+                f"{len(shards)} shards{hint}"
+            )
+        return [(self.shards[shards.pop()], query)]
+
+    def route(self, query: Query[T]) -> Connection:
+        parts = self.split(query)
+        if len(parts) > 1:
+            raise UnroutableQuery(f"insert spans {len(parts)} shards")
+        return parts[0][0]
+
+    def execute(self, query: Query[T], batch_size: Optional[int] = None) -> Result[T]:
+        parts = self.split(query)
+        if len(parts) == 1:
+            shard, part = parts[0]
+            return Result(part, shard, batch_size=batch_size)
+        LOG.debug("splitting %s across %d shards", query._action.name, len(parts))
+        return ShardedResult(query, self, parts, batch_size=batch_size)
+
+    def scatter(
+        self,
+        query: Query[T],
+        batch_size: Optional[int] = None,
+        collate: Optional[Callable[[str], Any]] = None,
+    ) -> ShardedResult[T]:
+        """
+        Run a select on every shard that may hold matching rows, and merge them.
+
+        Shards are chosen from conditions on the shard key like :meth:`execute`,
+        or every shard when there are none. Rows are merged in the order of the
+        query's :meth:`aql.Query.orderby` columns, which must be selected. String
+        columns are merged by code point, unless ``collate`` transforms them to
+        match the database's collation, eg ``collate=str.casefold`` for MySQL's
+        case-insensitive defaults. See :class:`ShardedResult` for details.
+        """
+        if query._action != QueryAction.select:
+            raise BuildError("scatter() requires a select query")
+        found = self._clause_shards(And(*query._where))
+        indexes = sorted(found) if found is not None else range(len(self.shards))
+        parts = [(self.shards[idx], query) for idx in indexes]
+        LOG.debug("scattering select across %d shards", len(parts))
+        return ShardedResult(query, self, parts, batch_size=batch_size, collate=collate)
+
+    query = execute
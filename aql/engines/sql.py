@@ -1,36 +1,64 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+import json
+import logging
+from collections import Counter
 from datetime import date, datetime
+from enum import Enum
 from itertools import chain
-from typing import Any, List
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from uuid import UUID
 
-from attr import astuple
+from attr import astuple, dataclass, evolve
 
-from ..column import Column
-from ..errors import UnsafeQuery
+from ..cache import LRUCache
+from ..column import Column, ColumnType
+from ..errors import BuildError, UnsafeQuery
 from ..query import PreparedQuery, Query
 from ..types import (
     And,
     Blob,
     Clause,
     Comparison,
+    InStrategy,
     Join,
     Operator,
     Or,
+    Param,
+    QueryAction,
+    RowComparison,
     Select,
     SqlParams,
     TableJoin,
     Text,
 )
+from .adapters import compact_adapter, Encoder
 from .base import Engine, q, T
 
+LOG = logging.getLogger(__name__)
+Shape = Tuple[Hashable, List[Any]]
+
+
+@dataclass
+class CachedShape:
+    """
+    Cached SQL text for a query shape, and the IN strategies planned for it.
+
+    Entries made by :meth:`SqlEngine.plan` for shapes that are always split have
+    no SQL text, and entries made by :meth:`SqlEngine.prepare` have no strategies
+    until the shape is first planned.
+    """
+
+    sql: Optional[str]
+    limits: Optional[Tuple[int, int]] = None
+    strategies: Tuple[InStrategy, ...] = ()
+    target: Optional[int] = None
+
 
 class SqlEngine(Engine, name="sql"):
     """Generic SQL engine for generating standardized queries."""
 
-    PLACEHOLDER = "?"
-
     OPS = {
         Operator.eq: "=",
         Operator.ne: "!=",
@@ -55,9 +83,458 @@ class SqlEngine(Engine, name="sql"):
         datetime: "DATETIME",
     }
 
+    COMPACT_TYPES = {
+        bool: "TINYINT",
+        datetime: "BIGINT",
+        UUID: "BINARY(16)",
+        Enum: "SMALLINT",
+    }
+
+    CACHE_SIZE = 256
+    CACHED_ACTIONS = (
+        QueryAction.insert,
+        QueryAction.select,
+        QueryAction.update,
+        QueryAction.delete,
+    )
+
+    IN_INLINE_LIMIT = 100
+    IN_CHUNK_LIMIT = 1000
+    JSON_TYPES = (int, float, str)
+
+    MAX_PARAMETERS = 999
+    MAX_PACKET: Optional[int] = None
+    PACKET_OVERHEAD = 1024
+
+    def __init__(self, cache_size: Optional[int] = None) -> None:
+        super().__init__()
+        self.cache: LRUCache[CachedShape] = LRUCache(
+            self.CACHE_SIZE if cache_size is None else cache_size
+        )
+        self.in_inline_limit = self.IN_INLINE_LIMIT
+        self.in_chunk_limit = self.IN_CHUNK_LIMIT
+        self.in_strategies: "Counter[InStrategy]" = Counter()
+        self.max_parameters = self.MAX_PARAMETERS
+        self.max_packet = self.MAX_PACKET
+        self._encoders: Dict[Any, Optional[Encoder]] = {}
+
+    def column_type(self, ctype: ColumnType) -> str:
+        """SQL type for a parsed column type, or raise BuildError if unsupported."""
+        root = ctype.root
+        if ctype.compact:
+            if isinstance(root, type) and issubclass(root, Enum):
+                root = Enum
+            if root in self.COMPACT_TYPES:
+                return self.COMPACT_TYPES[root]
+        elif root in self.TYPES:
+            return self.TYPES[root]
+        raise BuildError(f"Unsupported column type {ctype.root}")
+
+    def encoder(self, column: Column) -> Optional[Encoder]:
+        """Encoder for values stored in or compared with a compact column, if any."""
+        if column.ctype is None:
+            return None
+        try:
+            return self._encoders[column.ctype]
+        except KeyError:
+            pass
+        ctype = ColumnType.parse(column.ctype)
+        fn = compact_adapter(ctype.root).encode if ctype.compact else None
+        self._encoders[column.ctype] = fn
+        return fn
+
+    def encode_value(self, column: Column, value: Any) -> Any:
+        """Convert a value to the column's compact encoding, if it has one."""
+        fn = self.encoder(column)
+        if fn is None or value is None or isinstance(value, Column):
+            return value
+        if isinstance(value, Param):
+            return evolve(value, encode=fn)
+        return fn(value)
+
+    def comparison_value(self, comp: Comparison) -> Any:
+        """Value of a comparison, with compact encoding applied."""
+        if self.encoder(comp.column) is None:
+            return comp.value
+        if comp.operator == Operator.in_ and not isinstance(comp.value, Param):
+            return [self.encode_value(comp.column, value) for value in comp.value]
+        return self.encode_value(comp.column, comp.value)
+
+    def insert_rows(self, query: Query[T]) -> List[Tuple[Any, ...]]:
+        """Values of each inserted row, with compact encodings applied."""
+        rows = [astuple(row) for row in query._rows]
+        encoders = [
+            (idx, column)
+            for idx, column in enumerate(query._columns)
+            if self.encoder(column) is not None
+        ]
+        if not encoders:
+            return rows
+        encoded: List[Tuple[Any, ...]] = []
+        for row in rows:
+            values = list(row)
+            for idx, column in encoders:
+                values[idx] = self.encode_value(column, values[idx])
+            encoded.append(tuple(values))
+        return encoded
+
+    def prepare(self, query: Query[T]) -> PreparedQuery[T]:
+        """
+        Generate SQL and parameters, reusing SQL text for previously seen shapes.
+
+        Queries that differ only in parameter values share a fingerprint, so only
+        the parameter list needs to be extracted when the SQL is already cached.
+        Set ``engine.cache.maxsize = 0`` to disable caching for this engine.
+        """
+        if not self.cache.maxsize or query._action not in self.CACHED_ACTIONS:
+            return super().prepare(query)
+
+        key, parameters = self.fingerprint(query)
+        entry = self.cache.get(key)
+        if entry is None or entry.sql is None:
+            prepared = super().prepare(query)
+            if entry is None:
+                self.cache.put(key, CachedShape(prepared.sql))
+            else:
+                entry.sql = prepared.sql
+            return prepared
+
+        return PreparedQuery(query.table, entry.sql, parameters, many=query._many)
+
+    def fingerprint(self, query: Query[T]) -> Shape:
+        """
+        Return a hashable structural key for the query, and its parameters.
+
+        The key captures everything that affects the rendered SQL text, but none of
+        the parameter values. Parameters are returned in the same order that the
+        rendering methods would produce them.
+
+        Frozen queries can't change, so their key and parameters are stored on the
+        query the first time, and later calls only copy the parameter list.
+        """
+        memo = query._shape
+        if memo is not None and memo[0] is self:
+            if memo[1] == (self.in_inline_limit, self.in_chunk_limit):
+                return memo[2], list(memo[3])
+
+        key, parameters = self.shape(query)
+        if query._frozen:
+            limits = (self.in_inline_limit, self.in_chunk_limit)
+            query._shape = (self, limits, key, list(parameters))
+        return key, parameters
+
+    def shape(self, query: Query[T]) -> Shape:
+        """Build the structural key and parameters for :meth:`fingerprint`."""
+        parameters: List[Any] = []
+        action = query._action
+        table = query.table._name
+
+        if action == QueryAction.insert:
+            rows = self.insert_rows(query)
+            columns = tuple([column.name for column in query._columns])
+            if query._many:
+                width = len(rows[0]) if rows else len(columns)
+                return (action, table, columns, width), rows
+            parameters.extend(chain.from_iterable(rows))
+            return (action, table, columns, tuple([len(r) for r in rows])), parameters
+
+        if action == QueryAction.select:
+            joins = tuple([self.join_shape(join, parameters) for join in query._joins])
+            where = tuple([self.clause_shape(c, parameters) for c in query._where])
+            having: Tuple[Hashable, ...] = ()
+            if query._groupby:
+                having = tuple(
+                    [self.clause_shape(c, parameters) for c in query._having]
+                )
+            if query._limit:
+                parameters.append(query._limit)
+            if query._offset:
+                parameters.append(query._offset)
+            key = (
+                action,
+                table,
+                query._selector,
+                tuple([(c.table_name, c.name) for c in query._columns]),
+                joins,
+                where,
+                tuple([(c.table_name, c.name) for c in query._groupby]),
+                having,
+                tuple([(c.table_name, c.name, o.value) for c, o in query._order]),
+                bool(query._limit),
+                bool(query._offset),
+            )
+            return key, parameters
+
+        updates: Tuple[Hashable, ...] = ()
+        if action == QueryAction.update:
+            updates = tuple([(c.table_name, c.name) for c in query._updates])
+            parameters.extend(
+                self.encode_value(c, v) for c, v in query._updates.items()
+            )
+        where = tuple([self.clause_shape(c, parameters) for c in query._where])
+        if query._limit:
+            parameters.append(query._limit)
+        return (
+            action,
+            table,
+            updates,
+            where,
+            bool(query._limit),
+            query._everything,
+        ), parameters
+
+    def plan(self, query: Query[T]) -> List[PreparedQuery[T]]:
+        """
+        Generate statements for the query, splitting medium-sized IN lists.
+
+        When a where clause requires every matched row to satisfy a chunked IN
+        comparison, each row matches exactly one chunk of the (de-duplicated) value
+        list, so the query can run as several smaller statements whose results are
+        simply concatenated. Chunks are padded to the same length, so every chunk
+        shares one cached SQL string.
+
+        Multi-row inserts are split by :meth:`plan_insert`.
+        """
+        if query._action == QueryAction.insert and not query._many:
+            return self.plan_insert(query)
+
+        if not self.cache.maxsize or query._action not in self.CACHED_ACTIONS:
+            strategies, target = self.plan_in(query)
+            self.in_strategies.update(strategies)
+            if target is None:
+                return [self.prepare(query)]
+        else:
+            # strategies are stored with the cached shape, so repeated shapes don't
+            # walk the where clause unless a comparison needs to be split
+            key, parameters = self.fingerprint(query)
+            limits = (self.in_inline_limit, self.in_chunk_limit)
+            entry = self.cache.get(key)
+            if entry is None:
+                entry = CachedShape(None)
+                self.cache.put(key, entry)
+            if entry.limits != limits:
+                entry.strategies, entry.target = self.plan_in(query)
+                entry.limits = limits
+            for strategy in entry.strategies:
+                self.in_strategies[strategy] += 1
+
+            target = entry.target
+            if target is None:
+                if entry.sql is None:
+                    prepared = super().prepare(query)
+                    entry.sql = prepared.sql
+                    return [prepared]
+                sql = entry.sql
+                return [PreparedQuery(query.table, sql, parameters, many=query._many)]
+
+        comps = chain.from_iterable(self.in_comparisons(c) for c in query._where)
+        return self.split_in(query, list(comps)[target])
+
+    def plan_in(self, query: Query[T]) -> Tuple[Tuple[InStrategy, ...], Optional[int]]:
+        """
+        Pick strategies for every literal IN comparison in the where clause.
+
+        Returns the strategies in order, and the index of the first comparison
+        that :meth:`plan` can split into chunks, if any.
+        """
+        strategies: List[InStrategy] = []
+        target: Optional[int] = None
+        splittable = self.splittable(query)
+        for group in query._where:
+            for comp in self.in_comparisons(group):
+                strategy = self.in_strategy(comp)
+                if strategy != InStrategy.inline:
+                    LOG.debug(
+                        "%s strategy for %d values", strategy.name, len(comp.value)
+                    )
+                if strategy == InStrategy.chunked and splittable and target is None:
+                    if any(c is comp for c in self.conjuncts(group)):
+                        target = len(strategies)
+                strategies.append(strategy)
+        return tuple(strategies), target
+
+    def split_in(self, query: Query[T], target: Comparison) -> List[PreparedQuery[T]]:
+        """Prepare one statement per chunk of the target IN comparison's values."""
+        try:
+            values = list(dict.fromkeys(target.value))
+        except TypeError:
+            values = list(target.value)
+        size = self.in_inline_limit
+        plan: List[PreparedQuery[T]] = []
+        for idx in range(0, len(values), size):
+            chunk = values[idx : idx + size]
+            chunk += chunk[-1:] * (size - len(chunk))
+            comp = Comparison(target.column, Operator.in_, chunk)
+            chunked = query._copy()
+            chunked._where = [
+                self.replace_clause(c, target, comp) for c in query._where
+            ]
+            plan.append(self.prepare(chunked))
+        return plan
+
+    def plan_insert(self, query: Query[T]) -> List[PreparedQuery[T]]:
+        """
+        Split a multi-row insert into statements that fit the engine's limits.
+
+        Each chunk stays within ``max_parameters`` bound values and, when set,
+        within ``max_packet`` estimated bytes of encoded statement.
+
+        Chunks are executed one after another, never concurrently, inside a single
+        transaction, so a failing chunk rolls back every chunk before it.
+        """
+        rows = [astuple(row) for row in query._rows]
+        max_packet = self.max_packet - self.PACKET_OVERHEAD if self.max_packet else 0
+        chunks: List[Tuple[int, int]] = []
+        start = count = size = 0
+        for idx, row in enumerate(rows):
+            row_size = 0
+            if max_packet:
+                row_size = (
+                    sum(self.estimate_size(value) for value in row) + len(row) + 3
+                )
+            over_params = count + len(row) > self.max_parameters
+            over_packet = max_packet > 0 and size + row_size > max_packet
+            if idx > start and (over_params or over_packet):
+                chunks.append((start, idx))
+                start, count, size = idx, 0, 0
+            count += len(row)
+            size += row_size
+        chunks.append((start, len(rows)))
+
+        if len(chunks) == 1:
+            return [self.prepare(query)]
+
+        LOG.debug("insert of %d rows split into %d chunks", len(rows), len(chunks))
+        plan: List[PreparedQuery[T]] = []
+        for start, end in chunks:
+            chunk = query._copy()
+            chunk._rows = query._rows[start:end]
+            plan.append(self.prepare(chunk))
+        return plan
+
+    def estimate_size(self, value: Any) -> int:
+        """Upper bound on the encoded size of a value in a statement, in bytes."""
+        if value is None:
+            return 4
+        if isinstance(value, str):
+            return 4 * len(value) + 2
+        if isinstance(value, (bytes, bytearray)):
+            return 2 * len(value) + 10
+        if isinstance(value, (int, float)):
+            return 24
+        return 4 * len(str(value)) + 2
+
+    def splittable(self, query: Query[T]) -> bool:
+        """Whether results of the query can be concatenated across chunks."""
+        if query._action == QueryAction.select:
+            if query._order or query._groupby or query._selector != Select.all:
+                return False
+            return not (query._limit or query._offset)
+        if query._action in (QueryAction.update, QueryAction.delete):
+            return not query._limit
+        return False
+
+    def conjuncts(self, clause: Clause) -> List[Clause]:
+        """Clauses that every matching row must satisfy individually."""
+        if isinstance(clause, (Comparison, RowComparison)):
+            return [clause]
+        if isinstance(clause, And) or len(clause.clauses) == 1:
+            return list(chain.from_iterable(self.conjuncts(c) for c in clause.clauses))
+        return []
+
+    def in_comparisons(self, clause: Clause) -> List[Comparison]:
+        """Find all IN comparisons with literal value lists in the clause."""
+        if isinstance(clause, Comparison):
+            if clause.operator == Operator.in_ and not isinstance(clause.value, Param):
+                return [clause]
+            return []
+        if isinstance(clause, (And, Or)):
+            return list(
+                chain.from_iterable(self.in_comparisons(c) for c in clause.clauses)
+            )
+        return []
+
+    def replace_clause(self, clause: Clause, old: Clause, new: Clause) -> Clause:
+        """Copy of the clause tree with one clause (by identity) replaced."""
+        if clause is old:
+            return new
+        if isinstance(clause, (Comparison, RowComparison)):
+            return clause
+        clauses = [self.replace_clause(c, old, new) for c in clause.clauses]
+        return And(*clauses) if isinstance(clause, And) else Or(*clauses)
+
+    def in_strategy(self, comp: Comparison) -> InStrategy:
+        """
+        Pick a strategy for an IN comparison, based on the number of values.
+
+        Small lists are rendered inline, one placeholder per value. Medium lists
+        are split into chunks by :meth:`plan`. Large lists of JSON-compatible values
+        are passed as a single JSON array parameter, if the engine supports it.
+        """
+        count = len(comp.value)
+        if count <= self.in_inline_limit:
+            return InStrategy.inline
+        if count <= self.in_chunk_limit or self.render_in_json(comp) is None:
+            return InStrategy.chunked
+        if all(type(value) in self.JSON_TYPES for value in comp.value):
+            return InStrategy.json
+        return InStrategy.chunked
+
+    def render_in_json(self, comp: Comparison) -> Optional[str]:
+        """
+        Render a subquery over a single JSON array parameter, for IN comparisons.
+
+        Returns None when the engine or column type doesn't support it.
+        """
+        return None
+
+    def clause_shape(self, clause: Clause, parameters: List[Any]) -> Hashable:
+        """Structural key for a clause, appending its values to parameters."""
+        if isinstance(clause, Comparison):
+            value = self.comparison_value(clause)
+            shape: Hashable
+            if isinstance(value, Param) and value.expand:
+                parameters.append(value)
+                shape = Param
+            elif clause.operator is Operator.in_:
+                large = len(value) > self.in_inline_limit
+                if large and self.in_strategy(clause) == InStrategy.json:
+                    parameters.append(json.dumps(value))
+                    shape = InStrategy.json
+                else:
+                    parameters.extend(value)
+                    shape = len(value)
+            elif isinstance(value, Column):
+                shape = (value.table_name, value.name)
+            else:
+                parameters.append(value)
+                shape = None
+            column = clause.column
+            return (column.table_name, column.name, clause.operator.value, shape)
+        if isinstance(clause, RowComparison):
+            parameters.extend(self.row_comparison_values(clause))
+            columns = tuple([(c.table_name, c.name) for c in clause.columns])
+            return (RowComparison, columns, clause.operator.value)
+        if isinstance(clause, (And, Or)):
+            shapes = tuple([self.clause_shape(c, parameters) for c in clause.clauses])
+            return (type(clause), shapes)
+        raise NotImplementedError(f"unsupported clause {clause}")
+
+    def join_shape(self, join: TableJoin, parameters: List[Any]) -> Hashable:
+        """Structural key for a table join, appending its values to parameters."""
+        on = tuple([self.clause_shape(c, parameters) for c in join.on])
+        using = tuple([column.name for column in join.using])
+        return (join.table._name, join.style, on, using)
+
     def insert(self, query: Query[T]) -> PreparedQuery[T]:
         columns = ", ".join(q(column.name) for column in query._columns)
-        rows = [astuple(row) for row in query._rows]
+        rows = self.insert_rows(query)
+        if query._many:
+            width = len(rows[0]) if rows else len(query._columns)
+            values = f"({','.join(self.PLACEHOLDER for _ in range(width))})"
+            sql = f"INSERT INTO {q(query.table)} ({columns}) VALUES {values}"
+            return PreparedQuery(query.table, sql, rows, many=True)
+
         values = ", ".join(
             f"({','.join(self.PLACEHOLDER for _ in row)})" for row in rows
         )
@@ -68,21 +545,39 @@ class SqlEngine(Engine, name="sql"):
 
     def render_comparison(self, comp: Comparison) -> SqlParams:
         op = self.OPS[comp.operator]
-        if comp.operator in (Operator.in_,):
-            val = f"({','.join(self.PLACEHOLDER for _ in comp.value)})"
-            params = list(comp.value)
-        elif isinstance(comp.value, Column):
-            val = q(comp.value)
+        value = self.comparison_value(comp)
+        if isinstance(value, Param) and value.expand:
+            val = f"({self.PLACEHOLDER})"
+            params = [value]
+        elif comp.operator in (Operator.in_,):
+            if self.in_strategy(comp) == InStrategy.json:
+                val = f"{self.render_in_json(comp)}"
+                return f"{q(comp.column)} {op} {val}", [json.dumps(value)]
+            val = f"({','.join(self.PLACEHOLDER for _ in value)})"
+            params = list(value)
+        elif isinstance(value, Column):
+            val = q(value)
             params = []
         else:
             val = self.PLACEHOLDER
-            params = [comp.value]
+            params = [value]
 
         return f"{q(comp.column)} {op} {val}", params
 
+    def row_comparison_values(self, comp: RowComparison) -> List[Any]:
+        return [self.encode_value(c, v) for c, v in zip(comp.columns, comp.values)]
+
+    def render_row_comparison(self, comp: RowComparison) -> SqlParams:
+        op = self.OPS[comp.operator]
+        columns = ", ".join(q(column) for column in comp.columns)
+        values = ", ".join(self.PLACEHOLDER for _ in comp.columns)
+        return f"({columns}) {op} ({values})", self.row_comparison_values(comp)
+
     def render_clause(self, clause: Clause) -> SqlParams:
         if isinstance(clause, Comparison):
             return self.render_comparison(clause)
+        if isinstance(clause, RowComparison):
+            return self.render_row_comparison(clause)
         if isinstance(clause, And):
             clauses, params = zip(*(self.render_clause(c) for c in clause.clauses))
             return f"({' AND '.join(clauses)})", list(chain.from_iterable(params))
@@ -158,7 +653,7 @@ class SqlEngine(Engine, name="sql"):
         columns, params = zip(*list(query._updates.items()))
         updates = [f"{q(col)} = {self.PLACEHOLDER}" for col in columns]
         sql = f"UPDATE {q(query.table)} SET {', '.join(updates)}"
-        parameters = list(params)
+        parameters = [self.encode_value(c, v) for c, v in zip(columns, params)]
 
         if query._where:
             clauses, params = zip(*(self.render_clause(c) for c in query._where))
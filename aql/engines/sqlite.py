@@ -1,13 +1,22 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+import asyncio
 import logging
-from typing import Any, List, TypeVar
+import sqlite3
+import time
+from datetime import date, datetime
+from itertools import cycle
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, TypeVar
+from uuid import UUID
 
 from ..column import NO_DEFAULT, Primary, Unique
 from ..errors import BuildError
 from ..query import PreparedQuery, Query
-from .base import Connection, MissingConnector
+from ..types import Comparison, Location, QueryAction
+from .adapters import Adapter
+from .base import Connection, Engine, MissingConnector
 from .sql import q, SqlEngine
 
 try:
@@ -19,7 +28,22 @@ LOG = logging.getLogger(__name__)
 T = TypeVar("T")
 
 
+def encode_datetime(value: datetime) -> str:
+    return value.isoformat(" ")
+
+
 class SqliteEngine(SqlEngine, name="sqlite"):
+    MAX_PARAMETERS = 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999
+    ADAPTERS = {
+        bool: Adapter(decode=bool),
+        date: Adapter(date.isoformat, date.fromisoformat),
+        datetime: Adapter(encode_datetime, datetime.fromisoformat),
+    }
+    COMPACT_TYPES = {**SqlEngine.COMPACT_TYPES, UUID: "BLOB"}
+
+    def render_in_json(self, comp: Comparison) -> Optional[str]:
+        return f"(SELECT `value` FROM json_each({self.PLACEHOLDER}))"
+
     def create(self, query: Query[T]) -> PreparedQuery[T]:
         column_defs: List[str] = []
         column_types = query.table._column_types
@@ -27,9 +51,7 @@ class SqliteEngine(SqlEngine, name="sqlite"):
             ctype = column_types.get(column, None)
             if not ctype:
                 raise BuildError(f"No column type found for {column.name}")
-            if ctype.root not in self.TYPES:
-                raise BuildError(f"Unsupported column type {ctype.root}")
-            parts = [q(column.name), self.TYPES[ctype.root]]
+            parts = [q(column.name), self.column_type(ctype)]
 
             if ctype.constraint == Primary:
                 parts.append("PRIMARY KEY")
@@ -64,13 +86,132 @@ class SqliteEngine(SqlEngine, name="sqlite"):
 
 
 class SqliteConnection(Connection, name="sqlite", engine=SqliteEngine):
+    """
+    Connection to a SQLite database.
+
+    With ``readers=N``, the database is switched to WAL mode, and N additional
+    read-only connections are opened. Select queries are spread across the readers
+    round-robin, so reads run on separate threads and never queue behind writes.
+    All other queries, and any query while a transaction is open, use the single
+    writer connection.
+
+    With a :attr:`~Connection.result_cache` and ``cache_window=seconds``, cached
+    results are also validated against ``PRAGMA data_version``, so writes committed
+    by other processes drop every cached entry before it can be served. One check
+    covers all cache lookups within the window, and concurrent lookups share a
+    check already in progress. A window of zero checks before every lookup.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        location: Location,
+        *args: Any,
+        readers: int = 0,
+        cache_window: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(engine, location, *args, **kwargs)
+        self.readers = readers
+        self.cache_window = cache_window
+        self.cache_checks = 0
+        self._data_version: Optional[int] = None
+        self._version_checked = 0.0
+        self._version_check: Optional["asyncio.Future[None]"] = None
+        self._readers: List[SqliteConnection] = []
+        self._next_reader: Iterator[SqliteConnection] = iter(())
+
     async def connect(self) -> None:
         """Initiate the connection, and close when exited."""
         if not self.location.database:
             raise ValueError(f"invalid db location {self.location.database}")
+        if self.readers and self.location.database == ":memory:":
+            raise ValueError("readers require a database file, not :memory:")
+
         self._conn = await aiosqlite.connect(
             self.location.database, *self._args, **self._kwargs
         )
+        await self.discover_limits()
+
+        if self.readers:
+            await self._conn.execute("PRAGMA journal_mode=WAL")
+            await self._conn.commit()
+            location = Location("sqlite", database=self._reader_uri())
+            kwargs = {**self._kwargs, "uri": True}
+            for _ in range(self.readers):
+                reader = SqliteConnection(self.engine, location, *self._args, **kwargs)
+                await reader.connect()
+                self._readers.append(reader)
+            self._next_reader = cycle(self._readers)
+
+    def _reader_uri(self) -> str:
+        database = str(self.location.database)
+        if self._kwargs.get("uri") and database.startswith("file:"):
+            sep = "&" if "?" in database else "?"
+            return f"{database}{sep}mode=ro"
+        return f"{Path(database).resolve().as_uri()}?mode=ro"
+
+    async def close(self) -> None:
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        await super().close()
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, len(self._readers))
+
+    def route(self, query: Query[T]) -> Connection:
+        if self._readers and query._action == QueryAction.select:
+            if not self.in_transaction:
+                return next(self._next_reader)
+        return self
+
+    async def validate_cache(self) -> None:
+        if self.cache_window is None or self.result_cache is None:
+            return
+        if self._version_check is None:
+            if time.monotonic() - self._version_checked < self.cache_window:
+                if self._data_version is not None:
+                    return
+            self._version_check = asyncio.ensure_future(self._check_version())
+        await asyncio.shield(self._version_check)
+
+    async def _check_version(self) -> None:
+        """
+        Drop all cached results if another connection committed since the last
+        check. The first check can't know what changed before it, so it drops
+        them too, in case the shared cache was filled by other connections.
+        """
+        try:
+            async with self._conn.execute("PRAGMA data_version") as cursor:
+                row = await cursor.fetchone()
+            self.cache_checks += 1
+            version = row[0]
+            if version != self._data_version and self.result_cache is not None:
+                LOG.debug("data_version changed to %d, clearing cache", version)
+                self.result_cache.clear()
+            self._data_version = version
+            self._version_checked = time.monotonic()
+        finally:
+            self._version_check = None
+
+    async def discover_limits(self) -> None:
+        limit = getattr(sqlite3, "SQLITE_LIMIT_VARIABLE_NUMBER", None)
+        if limit is None or not isinstance(self.engine, SqlEngine):
+            return  # pragma:nocover
+        try:
+            # aiosqlite doesn't expose getlimit(), so reach into its internals
+            conn = self._conn._conn
+            max_parameters = await self._conn._execute(conn.getlimit, limit)
+        except AttributeError:
+            LOG.debug("can't read sqlite limits, assuming defaults")
+            max_parameters = self.engine.MAX_PARAMETERS
+        self.engine.max_parameters = max_parameters
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
 
     @property
     def autocommit(self) -> bool:
@@ -82,3 +223,4 @@ class SqliteConnection(Connection, name="sqlite", engine=SqliteEngine):
 
     async def begin(self) -> None:
         await self._conn.execute("BEGIN TRANSACTION")
+        self._transaction = True
@@ -0,0 +1,138 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import suppress
+from typing import (
+    Any,
+    AsyncIterable,
+    Deque,
+    Iterable,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    TypeVar,
+    Union,
+)
+
+from attr import dataclass, Factory
+
+from ..table import Table
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .base import Connection
+
+LOG = logging.getLogger(__name__)
+T = TypeVar("T")
+
+RECENT_LATENCIES = 1024
+
+
+@dataclass
+class StreamStats:
+    """
+    Throughput and latency of a streaming insert.
+    """
+
+    rows: int = 0
+    batches: int = 0
+    commits: int = 0
+    elapsed: float = 0.0
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+    latencies: Deque[float] = Factory(lambda: deque(maxlen=RECENT_LATENCIES))
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.batches if self.batches else 0.0
+
+
+async def insert_stream(
+    connection: "Connection",
+    table: Table[T],
+    source: Union[AsyncIterable[T], Iterable[T]],
+    batch_size: int = 1000,
+    max_inflight: int = 2,
+    commit_every: Optional[int] = None,
+    many: bool = False,
+) -> StreamStats:
+    """
+    Insert rows from any iterable or async iterable, one batch at a time.
+
+    A background task reads from the source into a queue holding at most
+    ``max_inflight`` batches; when the database falls behind, the reader waits,
+    so memory use is bounded by batch size rather than source size.
+    If ``commit_every`` is given, the connection commits after that many batches,
+    and once more at the end.
+    """
+    if batch_size < 1 or max_inflight < 1:
+        raise ValueError("batch_size and max_inflight must be positive")
+
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(max_inflight)
+    done = object()
+
+    async def produce() -> None:
+        batch: List[T] = []
+        try:
+            if isinstance(source, AsyncIterable):
+                async for row in source:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        await queue.put(batch)
+                        batch = []
+            else:
+                for row in source:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        await queue.put(batch)
+                        batch = []
+            if batch:
+                await queue.put(batch)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+
+    stats = StreamStats()
+    start = time.perf_counter()
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is done:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+
+            before = time.perf_counter()
+            query = table.insert().values(*batch)
+            await connection.execute(query.many() if many else query)
+            latency = time.perf_counter() - before
+
+            stats.rows += len(batch)
+            stats.batches += 1
+            stats.latencies.append(latency)
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            LOG.debug("inserted batch of %d rows in %.4fs", len(batch), latency)
+
+            if commit_every and stats.batches % commit_every == 0:
+                await connection.commit()
+                stats.commits += 1
+
+        if commit_every and stats.batches % commit_every:
+            await connection.commit()
+            stats.commits += 1
+    finally:
+        producer.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
+        stats.elapsed = time.perf_counter() - start
+
+    return stats
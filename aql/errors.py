@@ -30,9 +30,21 @@ class QueryError(AqlError):
     pass
 
 
+class ConnectionBusy(QueryError):
+    pass
+
+
+class UnroutableQuery(QueryError):
+    pass
+
+
 class UnsafeQuery(AqlError):
     pass
 
 
 class NoConnection(AqlError):
     pass
+
+
+class PoolClosed(AqlError):
+    pass
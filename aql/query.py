@@ -18,7 +18,7 @@ from typing import (
 
 from attr import make_class
 
-from .column import Column
+from .column import Column, Primary, Unique
 from .errors import BuildError
 from .types import (
     And,
@@ -30,6 +30,7 @@ from .types import (
     Or,
     Order,
     QueryAction,
+    RowComparison,
     Select,
     TableJoin,
 )
@@ -47,6 +48,8 @@ def start(action: QueryAction) -> Callable:
         def wrapped(self, *args, **kwargs):
             if self._action != QueryAction.unset:
                 raise BuildError(f"query already started with {self._action.name}")
+            if self._frozen:
+                self = self._copy()
             self._action = action
             return fn(self, *args, **kwargs)
 
@@ -55,8 +58,12 @@ def start(action: QueryAction) -> Callable:
     return wrapper
 
 
-def only(*actions: QueryAction) -> Callable:
-    """Ensure the current query has been started with one of the given actions."""
+def only(*actions: QueryAction, builder: bool = True) -> Callable:
+    """
+    Ensure the current query has been started with one of the given actions.
+
+    Builder methods on frozen queries operate on, and return, a shallow copy.
+    """
     if not actions:
         actions = tuple(QueryAction)
 
@@ -66,6 +73,8 @@ def only(*actions: QueryAction) -> Callable:
                 raise BuildError("query not yet started")
             elif self._action not in actions:
                 raise BuildError(f"query {self._action} not supported with this method")
+            if builder and self._frozen:
+                self = self._copy()
             return fn(self, *args, **kwargs)
 
         return wrapped
@@ -90,6 +99,44 @@ class Query(Generic[T]):
         self._limit: Optional[int] = None
         self._offset: Optional[int] = None
         self._everything: bool = False
+        self._many: bool = False
+        self._frozen: bool = False
+        self._shape: Any = None
+
+    def _copy(self) -> "Query[T]":
+        """
+        Shallow copy of this query, sharing all containers with the original.
+
+        Builder methods replace containers rather than mutating them, so copies
+        stay independent while sharing anything that doesn't change.
+        """
+        query = object.__new__(self.__class__)
+        query.__dict__.update(self.__dict__)
+        query._shape = None
+        return query
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self) -> "Query[T]":
+        """
+        Return an immutable copy of this query.
+
+        Every builder method on a frozen query returns a new frozen query, leaving
+        the original untouched, so a common base query can be stored as a constant
+        and safely extended from concurrent tasks::
+
+            BASE = Orders.select().where(Orders.status == "open").freeze()
+            query = BASE.where(Orders.tenant == tenant).limit(10)
+
+        Engines remember the fingerprint of a frozen query the first time they
+        prepare it, so executing the same frozen query again skips walking it.
+        Don't modify value lists passed to a frozen query after preparing it.
+        """
+        query = self._copy()
+        query._frozen = True
+        return query
 
     @start(QueryAction.create)
     def create(self, if_not_exists: bool = False) -> "Query[T]":
@@ -130,12 +177,18 @@ class Query(Generic[T]):
 
     @only(QueryAction.insert)
     def values(self, *rows) -> "Query[T]":
-        self._rows.extend(rows)
+        self._rows = [*self._rows, *rows]
+        return self
+
+    @only(QueryAction.insert)
+    def many(self) -> "Query[T]":
+        """Insert rows with one single-row statement via the driver's executemany."""
+        self._many = True
         return self
 
     @only(QueryAction.select)
     def join(self, table: "Table", style: Join = Join.inner) -> "Query[T]":
-        self._joins.append(TableJoin(table, style))
+        self._joins = [*self._joins, TableJoin(table, style)]
         return self
 
     @only(QueryAction.select)
@@ -143,7 +196,8 @@ class Query(Generic[T]):
         join = self._joins[-1]
         if join.using:
             raise BuildError(f"join already specified USING ({join})")
-        join.on.extend(on_)
+        join = TableJoin(join.table, join.style, [*join.on, *on_], join.using)
+        self._joins = [*self._joins[:-1], join]
         return self
 
     @only(QueryAction.select)
@@ -151,7 +205,8 @@ class Query(Generic[T]):
         join = self._joins[-1]
         if join.on:
             raise BuildError(f"join already specified ON ({join})")
-        join.using.extend(columns)
+        join = TableJoin(join.table, join.style, join.on, [*join.using, *columns])
+        self._joins = [*self._joins[:-1], join]
         return self
 
     @only(QueryAction.select)
@@ -169,20 +224,23 @@ class Query(Generic[T]):
             raise BuildError("having must be preceded by group by")
         if not clauses:
             raise BuildError("no criteria specified for having clause")
-        self._having.append(And(*clauses) if grouping == Boolean.and_ else Or(*clauses))
+        clause: Clause = And(*clauses) if grouping == Boolean.and_ else Or(*clauses)
+        self._having = [*self._having, clause]
         return self
 
     @only(QueryAction.select, QueryAction.update, QueryAction.delete)
     def where(self, *clauses: Clause, grouping=Boolean.and_) -> "Query[T]":
         if not clauses:
             raise BuildError("no criteria specified for where clause")
-        self._where.append(And(*clauses) if grouping == Boolean.and_ else Or(*clauses))
+        clause: Clause = And(*clauses) if grouping == Boolean.and_ else Or(*clauses)
+        self._where = [*self._where, clause]
         return self
 
     @only(QueryAction.select)
     def orderby(self, column: Column, *args: Union[Column, Order, str]) -> "Query[T]":
         remaining: List[Union[Column, Order, str]] = [column]
         remaining += list(args)
+        orders = list(self._order)
         while remaining:
             col = remaining[0]
             if not isinstance(col, Column):
@@ -197,7 +255,8 @@ class Query(Generic[T]):
             else:
                 order = Order.asc
                 remaining = remaining[1:]
-            self._order.append((col, order))
+            orders.append((col, order))
+        self._order = orders
         return self
 
     @only()
@@ -211,25 +270,123 @@ class Query(Generic[T]):
         self._offset = n
         return self
 
+    @only(QueryAction.select)
+    def paginate(self, page_size: int, after: Any = None) -> "Query[T]":
+        """
+        Limit results to one page, starting after the given row from the last page.
+
+        Rather than skipping rows with an offset, pages are found by comparing the
+        ordered columns with their values from the ``after`` row, so every page
+        costs the same to fetch. The table's primary key is added to the ordering
+        to break ties, and queries without a deterministic order are rejected.
+        """
+        if page_size < 1:
+            raise BuildError("page size must be positive")
+        if self._offset:
+            raise BuildError("paginate() can't be combined with an offset")
+
+        order = self._seek_order()
+        selected = {column.name for column in self._columns}
+        for column, _ in order:
+            if column.name not in selected:
+                raise BuildError(f"paginate() requires selecting {column.name}")
+
+        self._order = order
+        self._limit = page_size
+        if after is not None:
+            self._where = [*self._where, self._seek_clause(order, after)]
+        return self
+
+    def _seek_order(self) -> List[Tuple[Column, Order]]:
+        """Ordering for keyset pagination, ending in a unique key."""
+        if not self._order:
+            raise BuildError("paginate() requires orderby() for a deterministic order")
+
+        column_types = self.table._column_types
+        primary: List[str] = []
+        unique = set()
+        for column, ctype in column_types.items():
+            if ctype.nullable and any(column is c for c, _ in self._order):
+                raise BuildError(f"paginate() can't order by nullable {column.name}")
+            if ctype.constraint is Primary:
+                primary.append(column.name)
+            elif ctype.constraint is Unique and not ctype.nullable:
+                unique.add(column.name)
+        for index in self.table._indexes:
+            if isinstance(index, Primary):
+                primary = list(index._columns)
+            elif isinstance(index, Unique) and len(index._columns) == 1:
+                unique.update(index._columns)
+
+        ordered = [column.name for column, _ in self._order]
+        if unique.intersection(ordered):
+            return list(self._order)
+        if not primary:
+            raise BuildError(
+                f"paginate() requires a primary key on {self.table._name}, "
+                "or ordering by a unique column"
+            )
+
+        direction = self._order[-1][1]
+        order = list(self._order)
+        for name in primary:
+            if name not in ordered:
+                order.append((getattr(self.table, name), direction))
+        return order
+
+    @staticmethod
+    def _seek_clause(order: List[Tuple[Column, Order]], after: Any) -> Clause:
+        """Clause matching rows that sort after the given row."""
+        values = []
+        for column, _ in order:
+            if isinstance(after, dict):
+                values.append(after[column.name])
+            else:
+                values.append(getattr(after, column.name))
+
+        directions = {direction for _, direction in order}
+        if len(directions) == 1:
+            op = Operator.gt if Order.asc in directions else Operator.lt
+            return RowComparison([column for column, _ in order], op, values)
+
+        clauses: List[Clause] = []
+        for idx, (column, direction) in enumerate(order):
+            op = Operator.gt if direction == Order.asc else Operator.lt
+            equal = [
+                Comparison(c, Operator.eq, v) for (c, _), v in zip(order, values[:idx])
+            ]
+            clauses.append(And(*equal, Comparison(column, op, values[idx])))
+        return Or(*clauses)
+
     @only(QueryAction.update, QueryAction.delete)
     def everything(self) -> "Query[T]":
         self._everything = True
         return self
 
-    @only(QueryAction.select)
+    @only(QueryAction.select, builder=False)
     def factory(self) -> Type:
         if self._columns == self.table._columns and self.table._source:
             return self.table._source
-        return make_class(
-            "Row", [col.name for col in self._columns], slots=True, frozen=True
-        )
+        names = tuple(col.name for col in self._columns)
+        row = self.table._row_classes.get(names)
+        if row is None:
+            row = make_class("Row", list(names), slots=True, frozen=True)
+            self.table._row_classes[names] = row
+        return row
 
 
 class PreparedQuery(Generic[T]):
-    def __init__(self, table: "Table[T]", sql: str, parameters: Sequence[Any]):
+    def __init__(
+        self,
+        table: "Table[T]",
+        sql: str,
+        parameters: Sequence[Any],
+        many: bool = False,
+    ):
         self.table = table
         self.sql = sql
         self.parameters = parameters
+        self.many = many
 
     def __iter__(self):
         """
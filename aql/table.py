@@ -12,6 +12,7 @@ from typing import (
     Optional,
     overload,
     Set,
+    Tuple,
     Type,
     TypeVar,
     Union,
@@ -42,6 +43,7 @@ class Table(Generic[T]):
         self._column_types: Dict[Column, ColumnType] = {}
         self._indexes: List[Index] = []
         self._source: Optional[Type[T]] = source
+        self._row_classes: Dict[Tuple[str, ...], Type] = {}
 
         for con in cons:
             if isinstance(con, Column):
@@ -1,6 +1,7 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+from .cache import CacheTest
 from .column import ColumnTest
 from .connector import ConnectorTest
 from .engines import *  # noqa: F403
@@ -0,0 +1,85 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from aql.cache import CacheInfo, LRUCache, ResultCache, ResultCacheInfo
+
+
+class CacheTest(TestCase):
+    def test_lru(self):
+        cache: LRUCache[int] = LRUCache(2)
+
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.info(), CacheInfo(1, 1, 1, 2, 2))
+
+        self.assertEqual(cache.pop("c"), 3)
+        self.assertIsNone(cache.pop("c"))
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.info().hits, 1)
+
+    def test_lru_disabled(self):
+        cache: LRUCache[int] = LRUCache(0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.info(), CacheInfo(0, 1, 0, 0, 0))
+
+        cache.maxsize = -5
+        self.assertEqual(cache.maxsize, 0)
+
+    def test_result_cache(self):
+        cache = ResultCache(maxsize=2, ttl=10)
+        a = cache.key("SELECT a", [1])
+        self.assertEqual(a, ("SELECT a", (1,)))
+        self.assertIsNone(cache.key("SELECT a", [[1, 2]]))
+
+        self.assertIsNone(cache.get(a))
+        rows = cache.put(a, [[1, "x"], [2, "y"]], ["foo", "foo"])
+        self.assertEqual(rows, ((1, "x"), (2, "y")))
+        self.assertIs(cache.get(a), rows)
+
+        b = cache.key("SELECT b", [])
+        c = cache.key("SELECT c", [])
+        cache.put(b, [], ["foo", "bar"])
+        cache.put(c, [(3,)], ["baz"])
+        self.assertIsNone(cache.get(a))
+        self.assertEqual(cache.info().evictions, 1)
+
+        cache.invalidate("bar", "missing")
+        self.assertIsNone(cache.get(b))
+        self.assertEqual(cache.get(c), ((3,),))
+
+        with patch("aql.cache.time.monotonic", return_value=1e12):
+            self.assertIsNone(cache.get(c))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.info(), ResultCacheInfo(2, 4, 1, 1, 1, 0, 2))
+        self.assertAlmostEqual(cache.info().hit_ratio, 1 / 3)
+
+        # rows read before an invalidation aren't stored
+        generation = cache.generation(["foo", "bar"])
+        self.assertEqual(generation, cache.generation(["bar", "foo", "bar"]))
+        cache.invalidate("foo")
+        cache.put(a, [[1]], ["foo", "bar"], generation)
+        self.assertEqual(len(cache), 0)
+        generation = cache.generation(["foo"])
+        cache.clear()
+        cache.put(a, [[1]], ["foo"], generation)
+        self.assertEqual(len(cache), 0)
+        cache.put(a, [[1]], ["foo"], cache.generation(["foo"]))
+        self.assertEqual(len(cache), 1)
+
+        disabled = ResultCache(0)
+        self.assertEqual(disabled.put(a, [[1]], ["foo"]), ((1,),))
+        self.assertIsNone(disabled.get(a))
+        self.assertEqual(ResultCacheInfo(0, 0, 0, 0, 0, 0, 0).hit_ratio, 0.0)
@@ -1,14 +1,34 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+from datetime import datetime
+from enum import Enum, IntEnum
 from typing import List, Optional, Union
 from unittest import TestCase
-
-from aql.column import AutoIncrement, Column, ColumnType, Index, Primary, Unique
+from uuid import UUID
+
+from aql.column import (
+    AutoIncrement,
+    Column,
+    ColumnType,
+    Compact,
+    Index,
+    Primary,
+    Unique,
+)
 from aql.errors import InvalidColumnType
 from aql.types import Comparison, Operator
 
 
+class Color(IntEnum):
+    red = 1
+    blue = 2
+
+
+class Mood(Enum):
+    happy = "happy"
+
+
 class ColumnTest(TestCase):
     def test_constraints(self):
         t = AutoIncrement[int]
@@ -67,6 +87,24 @@ class ColumnTest(TestCase):
             ColumnType(float, nullable=True, constraint=Index),
         )
 
+        self.assertEqual(
+            ColumnType.parse(Optional[Compact[datetime]]),
+            ColumnType(datetime, nullable=True, compact=True),
+        )
+        self.assertEqual(
+            ColumnType.parse(Index[Compact[UUID]]),
+            ColumnType(UUID, constraint=Index, compact=True),
+        )
+        self.assertEqual(
+            ColumnType.parse(Compact[Color]), ColumnType(Color, compact=True)
+        )
+
+        with self.assertRaises(InvalidColumnType):
+            ColumnType.parse(Compact[str])
+
+        with self.assertRaises(InvalidColumnType):
+            ColumnType.parse(Compact[Mood])
+
         with self.assertRaises(InvalidColumnType):
             ColumnType.parse(Primary[Index[int]])
 
@@ -1,9 +1,17 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+from .adapters import AdapterTest
 from .base import EngineTest
-from .mysql import MysqlEngineTest
+from .columns import ColumnBuilderTest
+from .flight import SingleFlightTest
+from .gather import GatherTest
+from .mysql import MysqlConnectionTest, MysqlEngineTest
+from .pool import PoolTest
+from .replica import ReplicaTest
+from .shard import ShardFunctionTest, ShardTest
 from .sql import SqlEngineTest
 from .sqlite import SqliteEngineTest
+from .stream import StreamTest
 
 from .integration import IntegrationTest  # isort:skip
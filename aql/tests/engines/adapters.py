@@ -0,0 +1,62 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+from decimal import Decimal
+from enum import IntEnum
+from typing import Optional
+from unittest import TestCase
+
+from aql.column import Column
+from aql.engines.adapters import Adapter, AdapterRegistry
+
+
+class Color(IntEnum):
+    red = 1
+    blue = 2
+
+
+class AdapterTest(TestCase):
+    def test_encode(self):
+        registry = AdapterRegistry({Decimal: Adapter(str, Decimal)})
+        params = [1, "a", None]
+        self.assertIs(registry.encode(params), params)
+        self.assertEqual(registry.encode([Decimal("1.5"), 2]), ["1.5", 2])
+        self.assertEqual(
+            registry.encode_many([(Decimal("1"),), (Decimal("2"),)]), [["1"], ["2"]]
+        )
+        self.assertEqual(registry.stats.encoded, 3)
+
+        empty = AdapterRegistry()
+        self.assertIs(empty.encode(params), params)
+
+    def test_decode(self):
+        registry = AdapterRegistry({Decimal: Adapter(str, Decimal)})
+        columns = [Column("a", int), Column("b", Optional[Decimal])]
+        decoders = registry.decoders(columns)
+        self.assertEqual(decoders, [None, Decimal])
+        self.assertIs(registry.decoders(columns), decoders)
+        self.assertIsNone(registry.decoders([Column("a", int), Column("c")]))
+
+        rows = registry.decode([(1, "1.5"), (2, None)], decoders)
+        self.assertEqual(rows, [(1, Decimal("1.5")), (2, None)])
+        self.assertEqual(registry.decode([], decoders), [])
+        self.assertEqual(registry.stats.decoded, 2)
+        self.assertGreater(registry.stats.decode_time, 0)
+
+    def test_register(self):
+        registry = AdapterRegistry()
+        self.assertNotIn(Color, registry)
+        self.assertIsNone(registry.decoders([Column("c", Color)]))
+
+        registry.register(IntEnum, encode=int)
+        registry.register(Color, decode=Color)
+        self.assertIn(Color, registry)
+        self.assertEqual(registry.decoders([Column("c", Color)]), [Color])
+        self.assertEqual(registry.encode([Color.red]), [Color.red])
+
+        registry.register(Color, encode=int, decode=Color)
+        self.assertEqual(registry.encode([Color.red]), [1])
+
+        registry.unregister(Color)
+        self.assertIsNone(registry.decoders([Column("c", Color)]))
+        self.assertIsNotNone(registry.lookup(Color))
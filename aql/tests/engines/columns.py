@@ -0,0 +1,60 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+from array import array
+from typing import Optional
+from unittest import skipUnless, TestCase
+
+from aql.column import Column
+from aql.engines.columns import ColumnBuilder, numpy, numpy_available
+
+
+class ColumnBuilderTest(TestCase):
+    def build(self, column, *batches, use_numpy=False):
+        builder = ColumnBuilder(column)
+        for batch in batches:
+            builder.extend(batch)
+        return builder.finish(use_numpy)
+
+    def test_finish(self):
+        data = self.build(Column("a", Optional[int]), [1, None], [3])
+        self.assertEqual(data.values, array("q", [1, 0, 3]))
+        self.assertEqual(data.mask, array("b", [1, 0, 1]))
+
+        # NULLs in a later batch add a mask for earlier rows
+        data = self.build(Column("b", str), ["x"], [None, "z"])
+        self.assertEqual(data.values, ["x", None, "z"])
+        self.assertEqual(data.mask, array("b", [1, 0, 1]))
+
+    @skipUnless(numpy_available(), "numpy not installed")
+    def test_finish_numpy(self):
+        columns = [
+            (Column("a", int), [1, 2], [None], "int64", [1, 2, 0]),
+            (
+                Column("b", Optional[float]),
+                [0.5, None],
+                [2.5],
+                "float64",
+                [0.5, 0, 2.5],
+            ),
+            (Column("c", bool), [True, None], [False], "bool", [True, False, False]),
+        ]
+        for column, first, second, dtype, values in columns:
+            with self.subTest(column=column.name):
+                data = self.build(column, first, second, use_numpy=True)
+                self.assertIsInstance(data.values, numpy.ndarray)
+                self.assertEqual(data.values.dtype, numpy.dtype(dtype))
+                self.assertEqual(data.values.tolist(), values)
+                self.assertEqual(data.mask.dtype, numpy.dtype("bool"))
+                self.assertEqual(
+                    data.mask.tolist(), [value is not None for value in first + second]
+                )
+
+        # text columns stay as lists, with a numpy mask only when nullable
+        data = self.build(Column("d", str), ["x", "y"], ["z"], use_numpy=True)
+        self.assertEqual(data.values, ["x", "y", "z"])
+        self.assertIsNone(data.mask)
+        data = self.build(Column("e", Optional[str]), ["x", None], use_numpy=True)
+        self.assertEqual(data.values, ["x", None])
+        self.assertEqual(data.mask.dtype, numpy.dtype("bool"))
+        self.assertEqual(data.mask.tolist(), [True, False])
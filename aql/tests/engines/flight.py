@@ -0,0 +1,82 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+
+from aiounittest import AsyncTestCase
+
+from aql.engines.flight import SingleFlight, SingleFlightInfo
+
+
+class SingleFlightTest(AsyncTestCase):
+    async def test_coalesce(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return ((value,),)
+
+        results = await asyncio.gather(
+            *(flight.run(key, lambda key=key: fetch(key)) for key in "aaaba")
+        )
+        self.assertEqual(calls, ["a", "b"])
+        self.assertEqual(results, [(("a",),)] * 3 + [(("b",),), (("a",),)])
+        self.assertIs(results[0], results[1])
+        self.assertEqual(flight.info(), SingleFlightInfo(5, 3, 0))
+
+        # finished fetches aren't reused
+        self.assertEqual(await flight.run("a", lambda: fetch("c")), (("c",),))
+        self.assertEqual(flight.coalesced, 3)
+
+    async def test_errors(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("nope")
+
+        results = await asyncio.gather(
+            flight.run("a", fail), flight.run("a", fail), return_exceptions=True
+        )
+        self.assertEqual([str(r) for r in results], ["nope", "nope"])
+        self.assertEqual(len(flight), 0)
+
+        # when the first caller is cancelled, a waiter runs the fetch itself
+        async def slow():
+            await asyncio.sleep(0.02)
+            return ((1,),)
+
+        first = asyncio.ensure_future(flight.run("b", slow))
+        second = asyncio.ensure_future(flight.run("b", slow))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        self.assertEqual(await second, ((1,),))
+        self.assertTrue(first.cancelled())
+        self.assertEqual(flight.info(), SingleFlightInfo(4, 1, 0))
+
+    async def test_invalidate(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch(value):
+            await release.wait()
+            return ((value,),)
+
+        first = asyncio.ensure_future(flight.run("a", lambda: fetch(1), ["foo"]))
+        await asyncio.sleep(0)
+        flight.invalidate("bar")
+        self.assertEqual(len(flight), 1)
+
+        # callers after an invalidation run their own fetch
+        flight.invalidate("foo")
+        self.assertEqual(len(flight), 0)
+        second = asyncio.ensure_future(flight.run("a", lambda: fetch(2), ["foo"]))
+        await asyncio.sleep(0)
+        self.assertEqual(len(flight), 1)
+        release.set()
+        self.assertEqual(await first, ((1,),))
+        self.assertEqual(await second, ((2,),))
+        self.assertEqual(flight.info(), SingleFlightInfo(2, 0, 0))
+        self.assertEqual(flight._tables, {})
@@ -0,0 +1,86 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from aiounittest import AsyncTestCase
+
+import aql
+from aql.engines.gather import gather, GatherResults
+
+
+@aql.table
+class Item:
+    id: int
+    delay: float
+
+
+class FakeConnection:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.cancelled = 0
+
+    async def _execute(self, query):
+        (comp,) = query._where[0].clauses
+        delay = comp.value
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(abs(delay))
+            if delay < 0:
+                raise ValueError(delay)
+            return [delay]
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+
+    def execute(self, query):
+        return self._execute(query)
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+
+def query(delay):
+    return Item.select().where(Item.delay == delay)
+
+
+class GatherTest(AsyncTestCase):
+    async def test_order_and_timings(self):
+        conn = FakeConnection()
+        delays = [0.05, 0.01, 0.01, 0.0]
+        results = await gather(conn.acquire, [query(d) for d in delays], 2)
+
+        self.assertIsInstance(results, GatherResults)
+        self.assertEqual(results, [[d] for d in delays])
+        self.assertEqual(conn.max_running, 2)
+        self.assertEqual(results.critical_path, 0)
+        for delay, timing in zip(delays, results.timings):
+            self.assertGreaterEqual(timing.elapsed, delay)
+        self.assertGreater(results.timings[2].wait, 0)
+
+        with self.assertRaises(ValueError):
+            await gather(conn.acquire, [], 0)
+        self.assertEqual(await gather(conn.acquire, [], 1), [])
+
+    async def test_errors(self):
+        conn = FakeConnection()
+        queries = [query(-0.01), query(0.05), query(0.05)]
+
+        with self.assertRaisesRegex(ValueError, "-0.01"):
+            await gather(conn.acquire, queries, 2)
+        self.assertEqual(conn.cancelled, 0)
+
+        results = await gather(conn.acquire, queries, 2, return_exceptions=True)
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(results[1:], [[0.05], [0.05]])
+
+        with self.assertRaisesRegex(ValueError, "-0.01"):
+            await gather(conn.acquire, queries, 2, cancel_on_error=True)
+        self.assertGreaterEqual(conn.cancelled, 1)
+        self.assertEqual(conn.running, 0)
@@ -1,11 +1,23 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
-from sqlite3 import OperationalError
+import asyncio
+from array import array
+from datetime import date, datetime
+from enum import IntEnum
+from pathlib import Path
+from sqlite3 import IntegrityError, OperationalError
+from tempfile import TemporaryDirectory
+from typing import Optional
+from unittest.mock import patch
+from uuid import UUID
 
 from aiounittest import AsyncTestCase
 
 import aql
+from aql.cache import ResultCache
+from aql.engines.base import Result
+from aql.engines.flight import SingleFlight, SingleFlightInfo
 
 
 @aql.table
@@ -14,6 +26,46 @@ class Foo:
     name: str
 
 
+@aql.table
+class Bar:
+    id: aql.column.Primary[int]
+    value: str
+
+
+@aql.table
+class Metric:
+    id: int
+    name: str
+    value: Optional[float]
+
+
+@aql.table
+class Score:
+    metric_id: int
+    score: float
+
+
+@aql.table
+class Event:
+    id: int
+    day: date
+    at: Optional[datetime]
+    done: bool
+
+
+class Level(IntEnum):
+    low = 1
+    high = 2
+
+
+@aql.table
+class Sample:
+    id: aql.column.Compact[UUID]
+    at: aql.column.Index[aql.column.Compact[datetime]]
+    level: aql.column.Compact[Level]
+    ok: Optional[aql.column.Compact[bool]]
+
+
 class IntegrationTest(AsyncTestCase):
     async def test_end_to_end_sqlite(self):
         async with aql.connect("sqlite://:memory:") as db:
@@ -44,6 +96,568 @@ class IntegrationTest(AsyncTestCase):
             )
             self.assertEqual(rows, [a])
 
+    async def test_prepared_statement_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Foo.create())
+            rows = [Foo(1, "hello"), Foo(2, "world"), Foo(3, "buzz")]
+            await db.execute(Foo.insert().values(*rows))
+
+            stmt = db.prepare(Foo.select().where(Foo.id == aql.Param("id")))
+            self.assertIsInstance(stmt, aql.Statement)
+            self.assertEqual(await stmt.execute(id=2), [rows[1]])
+            self.assertEqual([row async for row in stmt.execute(id=3)], [rows[2]])
+
+            with self.assertRaisesRegex(aql.QueryError, "missing .'id'."):
+                stmt.bind()
+            with self.assertRaisesRegex(aql.QueryError, "unknown .'foo'."):
+                stmt.bind(id=1, foo=2)
+
+            stmt = db.prepare(
+                Foo.select()
+                .where(Foo.id.in_(aql.Param("ids")), Foo.name != aql.Param("name"))
+                .orderby(Foo.id)
+                .limit(aql.Param("limit"))
+            )
+            self.assertEqual(
+                await stmt.execute(ids=[1, 2, 3], name="world", limit=5),
+                [rows[0], rows[2]],
+            )
+            self.assertEqual(
+                await stmt.execute(ids=[2], name="", limit=5),
+                [rows[1]],
+            )
+            self.assertEqual(
+                stmt.bind(ids=(1, 2), name="", limit=1).parameters, [1, 2, "", 1]
+            )
+
+            stmt = db.prepare(Foo.delete().where(Foo.name == aql.Param("name")))
+            result = stmt.execute(name="hello")
+            await result
+            self.assertEqual(result.row_count, 1)
+            self.assertEqual(await db.execute(Foo.select()), rows[1:])
+
+            # placeholders executed without binding never reach the driver
+            query = Foo.update(name=aql.Param("name")).where(Foo.id == aql.Param("id"))
+            with self.assertRaisesRegex(aql.QueryError, "unbound .*'id', 'name'"):
+                await db.execute(query)
+            with self.assertRaisesRegex(aql.QueryError, "unbound .*'ids'"):
+                await db.execute(Foo.select().where(Foo.id.in_(aql.Param("ids"))))
+            self.assertEqual(await db.execute(Foo.select()), rows[1:])
+
+    async def test_large_in_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Foo.create())
+            rows = [Foo(i, f"row {i}") for i in range(300)]
+            await db.execute(Foo.insert().values(*rows))
+
+            ids = list(range(0, 50000, 2))
+            result = await db.execute(Foo.select().where(Foo.id.in_(ids)))
+            self.assertEqual(result, rows[::2])
+
+            ids = list(range(100, 600))
+            result = await db.execute(Foo.select().where(Foo.id.in_(ids)))
+            self.assertEqual(result, rows[100:])
+
+            query = Foo.select().where(Foo.id.in_(ids))
+            self.assertEqual([row async for row in db.execute(query)], rows[100:])
+
+            result = db.execute(Foo.delete().where(Foo.id.in_(ids)))
+            await result
+            self.assertEqual(result.row_count, 200)
+
+            strategies = db.engine.in_strategies
+            self.assertEqual(strategies[aql.InStrategy.json], 1)
+            self.assertEqual(strategies[aql.InStrategy.chunked], 3)
+
+    async def test_discover_limits_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            self.assertGreaterEqual(db.engine.max_parameters, 999)
+            db.engine.max_parameters = 10
+
+            # without the aiosqlite internals, fall back to the engine default
+            with patch.object(db, "_conn", object()):
+                await db.discover_limits()
+            self.assertEqual(db.engine.max_parameters, db.engine.MAX_PARAMETERS)
+
+    async def test_chunked_insert_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            self.assertGreaterEqual(db.engine.max_parameters, 999)
+            db.engine.max_parameters = 10
+            await db.execute(Bar.create())
+
+            rows = [Bar(i, f"row {i}") for i in range(25)]
+            result = db.execute(Bar.insert().values(*rows))
+            await result
+            self.assertEqual(result.row_count, 25)
+            self.assertEqual(await db.execute(Bar.select()), rows)
+            await db.commit()
+
+    async def test_chunked_insert_rollback_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            db.engine.max_parameters = 10
+            await db.execute(Bar.create())
+            await db.execute(Bar.insert().values(Bar(0, "old")))
+            await db.commit()
+
+            # a failure in the second of three chunks rolls back the first
+            rows = [Bar(i, "new") for i in range(100, 105)] + [Bar(0, "dup")]
+            rows += [Bar(i, "new") for i in range(105, 114)]
+            result = db.execute(Bar.insert().values(*rows))
+            with self.assertRaises(IntegrityError):
+                await result
+            self.assertEqual(len(result._pending), 1)
+            self.assertFalse(db.in_transaction)
+            self.assertEqual(await db.execute(Bar.select()), [Bar(0, "old")])
+
+            # chunks join a transaction that is already open, and roll back with it
+            await db.begin()
+            await db.execute(
+                Bar.insert().values(*(Bar(i, "new") for i in range(1, 13)))
+            )
+            self.assertTrue(db.in_transaction)
+            self.assertEqual(len(await db.execute(Bar.select())), 13)
+            await db.rollback()
+            self.assertEqual(await db.execute(Bar.select()), [Bar(0, "old")])
+
+    async def test_execute_many_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Bar.create())
+
+            rows = [Bar(i, f"row {i}") for i in range(50)]
+            result = db.execute(Bar.insert().values(*rows).many())
+            await result
+            self.assertEqual(result.row_count, 50)
+            self.assertEqual(result.prepared.parameters[0], (0, "row 0"))
+
+            template = Bar.insert()
+            result = db.execute_many(template, (Bar(i, "more") for i in range(50, 60)))
+            await result
+            self.assertEqual(result.row_count, 10)
+            self.assertEqual(template._rows, [])
+
+            template = Bar.delete().where(Bar.id == aql.Param("id"))
+            result = db.execute_many(template, [{"id": i} for i in range(0, 60, 2)])
+            await result
+            self.assertEqual(result.row_count, 30)
+            self.assertEqual(len(await db.execute(Bar.select())), 30)
+
+            with self.assertRaises(aql.BuildError):
+                db.execute_many(
+                    Bar.delete().where(Bar.id.in_(aql.Param("ids"))), [{"ids": [1]}]
+                )
+
+    async def test_batched_fetch_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Bar.create())
+            await db.execute(Bar.insert().values(*(Bar(i, "x") for i in range(25))))
+
+            result = db.execute(Bar.select().orderby(Bar.id), batch_size=10)
+            self.assertEqual(result.batch_size, 10)
+            ids = [row.id async for row in result]
+            self.assertEqual(ids, list(range(25)))
+
+            result = db.execute(Bar.select().orderby(Bar.id))
+            self.assertEqual(result.batch_size, aql.Result.BATCH_SIZE)
+            sizes = [len(batch) async for batch in result.batches(10)]
+            self.assertEqual(sizes, [10, 10, 5])
+
+            result = db.execute(Bar.select().orderby(Bar.id), batch_size=4)
+            first = await result.__anext__()
+            self.assertEqual(first.id, 0)
+            rest = await result
+            self.assertEqual([row.id for row in rest], list(range(1, 25)))
+
+            result = db.execute(Bar.select().orderby(Bar.id), batch_size=4)
+            await result.__anext__()
+            batches = [batch async for batch in result.batches(10)]
+            self.assertEqual([len(batch) for batch in batches], [3, 10, 10, 1])
+
+    async def test_prefetch_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Bar.create())
+            await db.execute(Bar.insert().values(*(Bar(i, "x") for i in range(25))))
+
+            result = db.execute(Bar.select().orderby(Bar.id))
+            ids = [row.id async for row in result.prefetch(batches=2, size=4)]
+            self.assertEqual(ids, list(range(25)))
+
+            result = db.execute(Bar.select().orderby(Bar.id))
+            rows = result.prefetch(size=4)
+            self.assertEqual((await rows.__anext__()).id, 0)
+            await rows.aclose()
+            self.assertIsNone(db._stream)
+            self.assertEqual(len(await db.execute(Bar.select())), 25)
+
+            result = db.execute(Foo.select())
+            with self.assertRaises(OperationalError):
+                async for row in result.prefetch():
+                    pass
+
+            with self.assertRaises(ValueError):
+                async for row in result.prefetch(batches=0):
+                    pass
+
+    async def test_row_formats_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Bar.create())
+            await db.execute(Bar.insert().values(Bar(1, "a"), Bar(2, "b")))
+
+            query = Bar.select().orderby(Bar.id)
+            self.assertEqual(await db.execute(query).tuples(), [(1, "a"), (2, "b")])
+            self.assertEqual(
+                await db.execute(query).dicts(),
+                [{"id": 1, "value": "a"}, {"id": 2, "value": "b"}],
+            )
+            self.assertEqual(await db.execute(query).scalars(), [1, 2])
+
+            query = Bar.select(Bar.value).orderby(Bar.id)
+            self.assertEqual([v async for v in db.execute(query).scalars()], ["a", "b"])
+            rows = await db.execute(query)
+            self.assertIs(type(rows[0]), query.factory())
+
+    async def test_columns_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Metric.create())
+            await db.execute(
+                Metric.insert().values(
+                    *(Metric(i, f"m{i}", None if i % 3 else i / 2) for i in range(7))
+                )
+            )
+
+            result = db.execute(Metric.select().orderby(Metric.id))
+            columns = await result.columns(size=2, use_numpy=False)
+            self.assertEqual(list(columns), ["id", "name", "value"])
+            self.assertEqual(columns["id"].values, array("q", range(7)))
+            self.assertIsNone(columns["id"].mask)
+            self.assertEqual(columns["name"].values, [f"m{i}" for i in range(7)])
+            self.assertEqual(
+                columns["value"].values, array("d", [0, 0, 0, 1.5, 0, 0, 3.0])
+            )
+            self.assertEqual(columns["value"].mask, array("b", [1, 0, 0, 1, 0, 0, 1]))
+            self.assertEqual(len(columns["value"]), 7)
+
+            # outer joins can return NULL for non-optional columns
+            await db.execute(Score.create())
+            await db.execute(
+                Score.insert().values(*(Score(i, i * 2.0) for i in range(3)))
+            )
+            query = (
+                Metric.select(Metric.id, Score.score)
+                .join(Score, aql.Join.left)
+                .on(Metric.id == Score.metric_id)
+                .orderby(Metric.id)
+            )
+            columns = await db.execute(query).columns(size=2, use_numpy=False)
+            self.assertEqual(
+                columns["score"].values, array("d", [0, 2.0, 4.0, 0, 0, 0, 0])
+            )
+            self.assertEqual(columns["score"].mask, array("b", [1, 1, 1, 0, 0, 0, 0]))
+            self.assertIsNone(columns["id"].mask)
+
+            result = db.execute(Metric.select(Metric.name).where(Metric.id > 10))
+            columns = await result.columns(use_numpy=False)
+            self.assertEqual(columns["name"].values, [])
+
+            result = db.execute(Metric.select())
+            await result.__anext__()
+            with self.assertRaises(aql.QueryError):
+                await result.columns()
+
+            with self.assertRaises(aql.QueryError):
+                await db.execute(Metric.delete().where(Metric.id == 1)).columns()
+
+    async def test_adapters_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Event.create())
+            events = [
+                Event(1, date(2024, 1, 2), datetime(2024, 1, 2, 3, 4, 5, 6), True),
+                Event(2, date(2024, 2, 3), None, False),
+            ]
+            await db.execute(Event.insert().values(*events))
+
+            rows = await db.execute(Event.select().orderby(Event.id))
+            self.assertEqual(rows, events)
+            stats = db.engine.adapters.stats
+            self.assertEqual(stats.encoded, 3)
+            self.assertEqual(stats.decoded, 6)
+
+            query = Event.select().where(Event.at > datetime(2024, 1, 1))
+            self.assertEqual(await db.execute(query), events[:1])
+
+            db.engine.adapters.register(bool, decode=lambda value: "yes" * value)
+            rows = await db.execute(Event.select(Event.done).orderby(Event.id))
+            self.assertEqual([row.done for row in rows], ["yes", ""])
+
+    async def test_compact_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Sample.create())
+            samples = [
+                Sample(UUID(int=i), datetime(2024, 1, 1, i), Level(i % 2 + 1), None)
+                for i in range(5)
+            ]
+            await db.execute(Sample.insert().values(*samples))
+
+            rows = await db.execute(Sample.select().orderby(Sample.at))
+            self.assertEqual(rows, samples)
+
+            raw = await db.execute(Sample.select(Sample.at).orderby(Sample.at)).tuples()
+            self.assertEqual(raw[1], (datetime(2024, 1, 1, 1),))
+            self.assertIsInstance(rows[0].level, Level)
+
+            query = Sample.select().where(
+                Sample.at >= datetime(2024, 1, 1, 3), Sample.level == Level.low
+            )
+            self.assertEqual(await db.execute(query), samples[4:])
+
+            stmt = db.prepare(Sample.select().where(Sample.id.in_(aql.Param("ids"))))
+            rows = await stmt.execute(ids=[UUID(int=1), UUID(int=2)])
+            self.assertEqual(sorted(row.id for row in rows), [UUID(int=1), UUID(int=2)])
+
+    async def test_paginate_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Bar.create())
+            rows = [Bar(i, f"v{i % 4}") for i in range(23)]
+            await db.execute(Bar.insert().values(*rows))
+
+            expected = sorted(rows, key=lambda row: (row.value, row.id))
+            pages = [
+                page async for page in db.paginate(Bar.select().orderby(Bar.value), 5)
+            ]
+            self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+            self.assertEqual([row for page in pages for row in page], expected)
+
+            query = Bar.select().orderby(Bar.value, "desc", Bar.id, "asc")
+            expected = sorted(rows, key=lambda row: (-int(row.value[1:]), row.id))
+            pages = [page async for page in db.paginate(query, 4)]
+            self.assertEqual([row for page in pages for row in page], expected)
+            self.assertEqual(query._limit, None)
+
+            query = Bar.select().where(Bar.id >= 20).orderby(Bar.id)
+            pages = [page async for page in db.paginate(query, 3)]
+            self.assertEqual(pages, [rows[20:23]])
+
+    async def test_gather_sqlite(self):
+        with TemporaryDirectory() as td:
+            location = f"sqlite:///{Path(td) / 'gather.db'}"
+            async with aql.connect(location) as db:
+                await db.execute(Bar.create())
+                await db.execute(Bar.insert().values(*(Bar(i, "x") for i in range(9))))
+                await db.commit()
+                results = await db.gather(
+                    *(Bar.select().where(Bar.id == i) for i in range(3))
+                )
+                self.assertEqual(results, [[Bar(i, "x")] for i in range(3)])
+
+            async with aql.pool(location, max_size=3) as pool:
+                queries = [Bar.select().where(Bar.id > i) for i in range(6)]
+                results = await pool.gather(*queries)
+                self.assertEqual([len(rows) for rows in results], [8, 7, 6, 5, 4, 3])
+                self.assertEqual(len(results.timings), 6)
+                self.assertLessEqual(pool.size, 3)
+
+            async with aql.connect(location, readers=2) as db:
+                self.assertEqual(db.concurrency, 2)
+                results = await db.gather(Bar.select(), Bar.select().where(Bar.id < 2))
+                self.assertEqual([len(rows) for rows in results], [9, 2])
+
+    async def test_result_cache_sqlite(self):
+        with TemporaryDirectory() as td:
+            location = f"sqlite://{Path(td) / 'cache.db'}"
+            cache = ResultCache(maxsize=8, ttl=None)
+            async with aql.pool(location, max_size=2, result_cache=cache) as pool:
+                async with pool.acquire() as db:
+                    self.assertIs(db.result_cache, cache)
+                    await db.execute(Bar.create())
+                    await db.execute(Bar.insert().values(Bar(1, "a"), Bar(2, "b")))
+                    await db.commit()
+
+                    query = Bar.select().where(Bar.id == 1)
+                    first = await db.execute(query)
+                    second = await db.execute(query)
+                    self.assertEqual(first, [Bar(1, "a")])
+                    self.assertEqual(second, first)
+                    self.assertIsNot(second[0], first[0])
+                    self.assertEqual(await db.execute(query).tuples(), [(1, "a")])
+                    self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+                    # reads inside a transaction bypass the cache
+                    await db.execute(Bar.insert().values(Bar(3, "c")))
+                    self.assertEqual(len(cache), 0)
+                    self.assertEqual(len(await db.execute(Bar.select())), 3)
+                    self.assertEqual(cache.misses, 1)
+                    await db.commit()
+
+                    self.assertEqual(len(await db.execute(Bar.select())), 3)
+                    self.assertEqual(len(cache), 1)
+
+                    # writes through another pooled connection invalidate too
+                    async with pool.acquire() as other:
+                        self.assertIsNot(other, db)
+                        await other.execute(Bar.delete().where(Bar.id == 3))
+                        await other.commit()
+                    self.assertEqual(len(cache), 0)
+                    self.assertEqual(len(await db.execute(Bar.select())), 2)
+                    self.assertAlmostEqual(cache.info().hit_ratio, 2 / 5)
+
+                    # a write committed while a select runs keeps its rows out
+                    fetch_all = Result._fetch_all
+                    interleaved = []
+
+                    async def write_during(result):
+                        rows = await fetch_all(result)
+                        if not interleaved:
+                            interleaved.append(result)
+                            async with pool.acquire() as other:
+                                await other.execute(Bar.insert().values(Bar(4, "d")))
+                                await other.commit()
+                        return rows
+
+                    cache.clear()
+                    with patch.object(Result, "_fetch_all", write_during):
+                        self.assertEqual(len(await db.execute(Bar.select())), 2)
+                    self.assertEqual(len(cache), 0)
+                    self.assertEqual(len(await db.execute(Bar.select())), 3)
+
+    async def test_result_cache_data_version(self):
+        with TemporaryDirectory() as td:
+            location = f"sqlite://{Path(td) / 'cache.db'}"
+            cache = ResultCache(ttl=None)
+            async with aql.connect(location) as other, aql.pool(
+                location, max_size=1, result_cache=cache, cache_window=60
+            ) as pool:
+                await other.execute(Bar.create())
+                await other.execute(Bar.insert().values(Bar(1, "a")))
+                await other.commit()
+
+                async with pool.acquire() as db:
+                    query = Bar.select()
+                    self.assertEqual(await db.execute(query), [Bar(1, "a")])
+                    self.assertEqual(await db.execute(query), [Bar(1, "a")])
+                    self.assertEqual((cache.hits, db.cache_checks), (1, 1))
+
+                    # commits from elsewhere go unseen until the window passes
+                    await other.execute(Bar.insert().values(Bar(2, "b")))
+                    await other.commit()
+                    self.assertEqual(len(await db.execute(query)), 1)
+                    self.assertEqual(db.cache_checks, 1)
+
+                    db.cache_window = 0
+                    self.assertEqual(len(await db.execute(query)), 2)
+                    self.assertEqual(db.cache_checks, 2)
+                    self.assertEqual(cache.hits, 2)
+
+                    # our own commits don't change the data version
+                    await db.execute(Bar.insert().values(Bar(3, "c")))
+                    await db.commit()
+                    self.assertEqual(len(await db.execute(query)), 3)
+                    self.assertEqual(len(await db.execute(query)), 3)
+                    self.assertEqual(cache.hits, 3)
+
+                    # concurrent lookups share one check
+                    results = await asyncio.gather(
+                        *(db.execute(query) for _ in range(5))
+                    )
+                    self.assertEqual([len(rows) for rows in results], [3] * 5)
+                    self.assertEqual(db.cache_checks, 5)
+
+    async def test_single_flight_sqlite(self):
+        with TemporaryDirectory() as td:
+            location = f"sqlite://{Path(td) / 'flight.db'}"
+            flight = SingleFlight()
+            async with aql.pool(location, max_size=3, single_flight=flight) as pool:
+                async with pool.acquire() as db:
+                    self.assertIs(db.single_flight, flight)
+                    await db.execute(Bar.create())
+                    await db.execute(Bar.insert().values(Bar(1, "a"), Bar(2, "b")))
+
+                    # reads inside a transaction are never shared
+                    await asyncio.gather(
+                        db.execute(Bar.select()), db.execute(Bar.select())
+                    )
+                    self.assertEqual(flight.calls, 0)
+                    await db.commit()
+
+                query = Bar.select().where(Bar.id > 0)
+                results = await pool.gather(
+                    *([query] * 3), Bar.select().where(Bar.id > 1)
+                )
+                self.assertEqual(
+                    results, [[Bar(1, "a"), Bar(2, "b")]] * 3 + [[Bar(2, "b")]]
+                )
+                self.assertIsNot(results[0][0], results[1][0])
+                self.assertEqual(flight.info(), SingleFlightInfo(4, 2, 0))
+
+                async with pool.acquire() as db:
+                    tuples, dicts = await asyncio.gather(
+                        db.execute(query).tuples(), db.execute(query).dicts()
+                    )
+                    self.assertEqual(tuples, [(1, "a"), (2, "b")])
+                    self.assertEqual(dicts[0], {"id": 1, "value": "a"})
+                    self.assertEqual(flight.coalesced, 3)
+
+                # selects after a write don't join selects started before it
+                fetch_all = Result._fetch_all
+                started = asyncio.Event()
+
+                async def slow_fetch(result):
+                    if result.query is query:
+                        started.set()
+                        await asyncio.sleep(0.02)
+                    return await fetch_all(result)
+
+                with patch.object(Result, "_fetch_all", slow_fetch):
+                    async with pool.acquire() as db:
+                        before = asyncio.ensure_future(db.execute(query))
+                        await started.wait()
+                        async with pool.acquire() as other:
+                            await other.execute(Bar.insert().values(Bar(3, "c")))
+                            await other.commit()
+                            after = await other.execute(query)
+                        self.assertEqual(len(after), 3)
+                        await before
+                self.assertEqual(flight.coalesced, 3)
+
+    async def test_sqlite_readers(self):
+        with self.assertRaisesRegex(ValueError, "readers require"):
+            await aql.connect("sqlite://:memory:", readers=2).connect()
+
+        with TemporaryDirectory() as td:
+            path = Path(td) / "test.db"
+            async with aql.connect(f"sqlite://{path}", readers=2) as db:
+                await db.execute(Foo.create())
+                await db.commit()
+
+                select = Foo.select()
+                readers = {db.route(select), db.route(select), db.route(select)}
+                self.assertEqual(len(readers), 2)
+                self.assertNotIn(db, readers)
+                self.assertIs(db.route(Foo.insert()), db)
+
+                for reader in readers:
+                    with self.assertRaisesRegex(OperationalError, "readonly"):
+                        await reader.execute(Foo.insert().values(Foo(9, "no")))
+
+                rows = [Foo(1, "hello"), Foo(2, "world")]
+                await db.execute(Foo.insert().values(*rows))
+
+                # uncommitted writes are only visible on the writer
+                self.assertIs(db.route(select), db)
+                self.assertEqual(await db.execute(select), rows)
+                await db.commit()
+
+                self.assertIsNot(db.route(select), db)
+                self.assertEqual(await db.execute(select), rows)
+                self.assertEqual([row async for row in db.execute(select)], rows)
+
+                await db.begin()
+                self.assertIs(db.route(select), db)
+                await db.rollback()
+
+                stmt = db.prepare(Foo.select().where(Foo.id == aql.Param("id")))
+                self.assertEqual(await stmt.execute(id=2), rows[1:])
+
+            self.assertEqual(db._readers, [])
+
     async def test_end_to_end_mysql(self):
         try:
             async with aql.connect(
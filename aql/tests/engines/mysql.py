@@ -1,15 +1,23 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+import asyncio
 from datetime import date
 from typing import Optional
 from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock
 
+import aiomysql
+from aiounittest import AsyncTestCase
+
+from aql.cache import ResultCache
 from aql.column import AutoIncrement, Column, Index, Primary, Unique
-from aql.engines.mysql import MysqlEngine
-from aql.errors import BuildError
+from aql.engines.base import Result
+from aql.engines.flight import SingleFlight
+from aql.engines.mysql import MysqlConnection, MysqlEngine
+from aql.errors import BuildError, ConnectionBusy
 from aql.table import Table, table
-from aql.types import Text
+from aql.types import InStrategy, Text
 
 
 class MysqlEngineTest(TestCase):
@@ -112,3 +120,240 @@ class MysqlEngineTest(TestCase):
 
         with self.assertRaises(BuildError):
             engine.prepare(Foo.create())
+
+    def test_in_json(self):
+        engine = MysqlEngine()
+
+        Foo = Table("foo", [Column("a", int), Column("b")])
+        values = list(range(1001))
+
+        comp = Foo.a.in_(values)
+        self.assertEqual(engine.in_strategy(comp), InStrategy.json)
+        self.assertEqual(
+            engine.render_comparison(comp),
+            (
+                "`a` IN (SELECT `value` FROM JSON_TABLE(%s, '$[*]' "
+                "COLUMNS (`value` BIGINT PATH '$')) AS `_in`)",
+                [str(values)],
+            ),
+        )
+
+        # column without type can't use JSON_TABLE
+        self.assertEqual(engine.in_strategy(Foo.b.in_(values)), InStrategy.chunked)
+
+
+class MysqlConnectionTest(AsyncTestCase):
+    async def test_stream(self):
+        Foo = Table("foo", [Column("a", int)])
+        conn = MysqlConnection(MysqlEngine(), None)
+        conn._conn = MagicMock()
+        conn._conn.cursor = AsyncMock(
+            side_effect=lambda *args: MagicMock(
+                spec=aiomysql.Cursor,
+                fetchmany=AsyncMock(side_effect=[[(1,), (2,)], []]),
+                fetchall=AsyncMock(return_value=[(3,)]),
+            )
+        )
+
+        # awaiting a result uses a buffered cursor
+        rows = await Result(Foo.select(), conn)
+        self.assertEqual([row.a for row in rows], [3])
+        conn._conn.cursor.assert_awaited_with()
+        self.assertIsNone(conn._stream)
+
+        # iterating streams rows, and the connection is busy until exhausted
+        result = Result(Foo.select(), conn)
+        self.assertEqual((await result.__anext__()).a, 1)
+        conn._conn.cursor.assert_awaited_with(aiomysql.SSCursor)
+        self.assertIs(conn._stream, result._cursor)
+        with self.assertRaises(ConnectionBusy):
+            await conn.cursor()
+        self.assertEqual([row.a async for row in result], [2])
+        self.assertIsNone(conn._stream)
+        result._cursor._cursor.close.assert_awaited_once()
+
+        # closing early releases the connection
+        result = Result(Foo.select(), conn)
+        await result.__anext__()
+        await result.close()
+        await result.close()
+        self.assertIsNone(conn._stream)
+        self.assertEqual([row.a async for row in result], [2])
+        self.assertEqual(await result, [])
+
+        # fetching a single row doesn't leave the connection streaming
+        result = Result(Foo.select(), conn)
+        self.assertEqual((await result.row()).a, 1)
+        conn._conn.cursor.assert_awaited_with()
+        self.assertIsNone(conn._stream)
+        await conn.cursor()
+
+        # exiting a result's context releases the connection
+        async with Result(Foo.select(), conn) as result:
+            async for row in result:
+                self.assertIs(conn._stream, result._cursor)
+                break
+        self.assertIsNone(conn._stream)
+
+    async def test_prefetch_early_exit(self):
+        Foo = Table("foo", [Column("a", int)])
+        conn = MysqlConnection(MysqlEngine(), None)
+        conn._conn = MagicMock()
+        fetches = []
+
+        async def fetchmany(size):
+            fetches.append("start")
+            await asyncio.sleep(0.02)
+            fetches.append("end")
+            return [(n,) for n in range(size)]
+
+        conn._conn.cursor = AsyncMock(
+            side_effect=lambda *args: MagicMock(
+                spec=aiomysql.SSCursor, fetchmany=AsyncMock(side_effect=fetchmany)
+            )
+        )
+
+        # breaking out early lets the read in progress finish, then closes
+        result = Result(Foo.select(), conn)
+        rows = result.prefetch(batches=1, size=2)
+        async for row in rows:
+            await asyncio.sleep(0.005)
+            break
+        await rows.aclose()
+        self.assertEqual(fetches[-1], "end")
+        self.assertEqual(fetches.count("start"), fetches.count("end"))
+        self.assertIsNone(conn._stream)
+        result._cursor._cursor.close.assert_awaited_once()
+        conn._conn.close.assert_not_called()
+
+        # and the connection can be reused straight away
+        rows = Result(Foo.select(), conn).prefetch(size=1)
+        self.assertEqual((await rows.__anext__()).a, 0)
+        await rows.aclose()
+        self.assertIsNone(conn._stream)
+
+        # cancelling the caller while it waits for the read recovers the connection
+        result = Result(Foo.select(), conn)
+        rows = result.prefetch(batches=1, size=2)
+        await rows.__anext__()  # the reader is now fetching the next batch
+        closing = asyncio.ensure_future(rows.aclose())
+        await asyncio.sleep(0)
+        closing.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await closing
+        self.assertEqual(fetches[-1], "start")
+        conn._conn.close.assert_called_once()
+        self.assertIsNone(conn._stream)
+        result._cursor._cursor.close.assert_not_awaited()
+
+    def connection(self):
+        conn = MysqlConnection(MysqlEngine(), None)
+        conn._conn = MagicMock(
+            begin=AsyncMock(), commit=AsyncMock(), rollback=AsyncMock()
+        )
+        # with autocommit off, any read leaves a transaction open
+        conn._conn.get_transaction_status.return_value = True
+        conn._conn.cursor = AsyncMock(
+            side_effect=lambda *args: MagicMock(
+                spec=aiomysql.Cursor, fetchall=AsyncMock(return_value=[(1,)])
+            )
+        )
+        return conn
+
+    async def test_result_cache(self):
+        Foo = Table("foo", [Column("a", int)])
+        conn = self.connection()
+        conn.result_cache = ResultCache()
+        cursors = conn._conn.cursor
+        query = Foo.select().where(Foo.a == 1)
+
+        # implicit transactions opened by reads don't bypass the cache
+        self.assertEqual([row.a for row in await Result(query, conn)], [1])
+        self.assertTrue(conn.in_transaction)
+        self.assertEqual([row.a for row in await Result(query, conn)], [1])
+        self.assertEqual(cursors.await_count, 1)
+        self.assertEqual(conn.result_cache.info().hits, 1)
+
+        # reads after begin() do, until the transaction ends
+        await conn.begin()
+        await Result(query, conn)
+        self.assertEqual(cursors.await_count, 2)
+        await conn.commit()
+        await Result(query, conn)
+        self.assertEqual(cursors.await_count, 2)
+
+        # and so do reads after uncommitted writes
+        await Result(Foo.delete().where(Foo.a == 2), conn)
+        await Result(query, conn)
+        await Result(query, conn)
+        self.assertEqual(cursors.await_count, 5)
+        await conn.rollback()
+        await Result(query, conn)
+        await Result(query, conn)
+        self.assertEqual(cursors.await_count, 6)
+
+    async def test_single_flight(self):
+        Foo = Table("foo", [Column("a", int)])
+        conn = self.connection()
+        conn.single_flight = SingleFlight()
+        cursors = conn._conn.cursor
+
+        async def fetchall():
+            await asyncio.sleep(0.01)
+            return [(1,)]
+
+        conn._conn.cursor.side_effect = lambda *args: MagicMock(
+            spec=aiomysql.Cursor, fetchall=AsyncMock(side_effect=fetchall)
+        )
+        query = Foo.select().where(Foo.a == 1)
+
+        # identical selects share one read, despite the implicit transaction
+        await Result(query, conn)
+        self.assertTrue(conn.in_transaction)
+        results = await asyncio.gather(*(Result(query, conn) for _ in range(3)))
+        self.assertEqual([[row.a for row in rows] for rows in results], [[1]] * 3)
+        self.assertEqual(cursors.await_count, 2)
+        self.assertEqual(conn.single_flight.info().coalesced, 2)
+
+        # but not inside a transaction started with begin()
+        await conn.begin()
+        await asyncio.gather(*(Result(query, conn) for _ in range(3)))
+        self.assertEqual(cursors.await_count, 5)
+        await conn.commit()
+
+    async def test_replica_lag(self):
+        conn = MysqlConnection(MysqlEngine(), None)
+        conn._conn = MagicMock()
+        cursor = conn._conn.cursor.return_value.__aenter__.return_value
+        cursor.fetchone = AsyncMock(
+            side_effect=[
+                None,
+                {"Seconds_Behind_Source": 3},
+                {"Seconds_Behind_Source": None},
+            ]
+        )
+
+        self.assertIsNone(await conn.replica_lag())
+        conn._conn.cursor.assert_called_with(aiomysql.DictCursor)
+        cursor.execute.assert_awaited_with("SHOW REPLICA STATUS")
+        self.assertEqual(await conn.replica_lag(), 3.0)
+        self.assertEqual(await conn.replica_lag(), float("inf"))
+        self.assertFalse(conn._legacy_status)
+
+    async def test_replica_lag_legacy(self):
+        conn = MysqlConnection(MysqlEngine(), None)
+        conn._conn = MagicMock()
+        cursor = conn._conn.cursor.return_value.__aenter__.return_value
+        error = aiomysql.ProgrammingError(1064, "You have an error in your SQL")
+        cursor.execute = AsyncMock(side_effect=[error, None, None])
+        cursor.fetchone = AsyncMock(
+            side_effect=[{"Seconds_Behind_Master": 3}, {"Seconds_Behind_Master": None}]
+        )
+
+        # servers without SHOW REPLICA STATUS fall back, and only try it once
+        self.assertEqual(await conn.replica_lag(), 3.0)
+        self.assertEqual(await conn.replica_lag(), float("inf"))
+        self.assertEqual(
+            [call.args for call in cursor.execute.await_args_list],
+            [("SHOW REPLICA STATUS",), ("SHOW SLAVE STATUS",), ("SHOW SLAVE STATUS",)],
+        )
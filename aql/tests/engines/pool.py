@@ -0,0 +1,142 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+from unittest.mock import patch
+
+from aiounittest import AsyncTestCase
+
+import aql
+from aql.engines.pool import Pool, PoolStats
+from aql.errors import PoolClosed
+
+
+@aql.table
+class Item:
+    id: int
+    name: str
+
+
+class PoolTest(AsyncTestCase):
+    async def test_acquire_release(self):
+        async with aql.pool("sqlite://:memory:", min_size=1, max_size=2) as pool:
+            self.assertIsInstance(pool, Pool)
+            self.assertEqual((pool.size, pool.idle), (1, 1))
+
+            async with pool.acquire() as db:
+                self.assertIsInstance(db, aql.engines.SqliteConnection)
+                self.assertIs(db.engine, pool.engine)
+                await db.execute(Item.create())
+                await db.execute(Item.insert().values(Item(1, "a")))
+                self.assertTrue(db.in_transaction)
+                first = db
+
+            # uncommitted work is rolled back on release
+            self.assertFalse(first.in_transaction)
+
+            async with pool.acquire() as db:
+                self.assertIs(db, first)
+                self.assertEqual(await db.execute(Item.select()), [])
+
+            self.assertEqual(pool.stats.acquired, 2)
+            self.assertEqual(pool.stats.created, 1)
+            self.assertEqual(pool.stats.waits, 0)
+
+        self.assertEqual((pool.size, pool.idle), (0, 0))
+        with self.assertRaises(PoolClosed):
+            async with pool.acquire():
+                pass
+
+    async def test_wait(self):
+        pool = aql.pool("sqlite://:memory:", min_size=0, max_size=2)
+        order = []
+
+        async def work(n):
+            async with pool.acquire() as db:
+                order.append(n)
+                await asyncio.sleep(0.01)
+                self.assertTrue(await db.ping())
+
+        await asyncio.gather(*(work(n) for n in range(5)))
+        self.assertEqual(sorted(order), [0, 1, 2, 3, 4])
+        self.assertEqual(order[:2], [0, 1])
+        self.assertEqual(pool.stats.created, 2)
+        self.assertEqual(pool.stats.acquired, 5)
+        self.assertEqual(pool.stats.waits, 3)
+        self.assertGreater(pool.stats.max_wait, 0)
+        self.assertGreaterEqual(pool.stats.wait_time, pool.stats.max_wait)
+
+        # cancelled waiters don't leak
+        async with pool.acquire(), pool.acquire():
+            task = asyncio.ensure_future(pool.checkout())
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(len(pool._waiters), 0)
+
+        await pool.close()
+
+    async def test_expiry(self):
+        pool = aql.pool(
+            "sqlite://:memory:",
+            min_size=1,
+            max_size=3,
+            idle_timeout=10,
+            max_lifetime=60,
+        )
+        await pool.open()
+
+        with patch("aql.engines.pool.time.monotonic") as monotonic:
+            monotonic.return_value = 1e9
+            async with pool.acquire() as a, pool.acquire() as b:
+                pass
+            self.assertEqual(pool.stats.closed, 1)  # the initial idle connection
+            self.assertEqual((pool.size, pool.idle), (2, 2))
+
+            monotonic.return_value += 20
+            async with pool.acquire() as d:
+                # idle beyond timeout, but the last is kept for min_size
+                self.assertIs(d, b)
+            # idle beyond timeout, closed down to min_size
+            self.assertEqual((pool.size, pool.idle), (1, 1))
+
+            monotonic.return_value += 100
+            async with pool.acquire() as c:
+                self.assertIsNot(c, a)
+                self.assertIsNot(c, b)
+            self.assertEqual(pool.stats.created, 4)
+
+        await pool.close()
+
+    async def test_double_release(self):
+        async with aql.pool("sqlite://:memory:", max_size=2) as pool:
+            db = await pool.checkout()
+            await pool.release(db)
+            with patch("aql.engines.pool.LOG") as log:
+                await pool.release(db)
+            log.warning.assert_called_once()
+            self.assertEqual((pool.size, pool.idle), (1, 1))
+
+            # connections already discarded are ignored too
+            db = await pool.checkout()
+            await pool._discard(db)
+            with patch("aql.engines.pool.LOG"):
+                await pool.release(db)
+            self.assertEqual((pool.size, pool.idle), (0, 0))
+
+    async def test_health_check(self):
+        async with aql.pool("sqlite://:memory:", max_size=1) as pool:
+            async with pool.acquire() as a:
+                pass
+            with patch.object(a, "ping", return_value=False), patch(
+                "aql.engines.pool.LOG"
+            ):
+                async with pool.acquire() as b:
+                    self.assertIsNot(a, b)
+            self.assertEqual(pool.stats.failed_checks, 1)
+            self.assertEqual(pool.stats, PoolStats(2, 2, 1, 1, 0, 0.0, 0.0))
+
+    async def test_invalid(self):
+        with self.assertRaises(ValueError):
+            aql.pool("sqlite://:memory:", min_size=2, max_size=1)
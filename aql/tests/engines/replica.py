@@ -0,0 +1,244 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import AsyncMock, MagicMock, patch, PropertyMock
+
+from aiounittest import AsyncTestCase
+
+import aql
+from aql.engines.base import Cursor
+from aql.engines.replica import Balance, ReplicaResult
+
+
+@aql.table
+class User:
+    id: int
+    name: str
+
+
+class ReplicaTest(AsyncTestCase):
+    def setUp(self):
+        self.td = TemporaryDirectory()
+        self.location = f"sqlite://{Path(self.td.name) / 'replica.db'}"
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def replicated(self, **kwargs):
+        kwargs.setdefault("check_interval", None)
+        return aql.replicated(self.location, [self.location] * 2, **kwargs)
+
+    async def test_routing(self):
+        async with self.replicated() as db:
+            first, second = (replica.connection for replica in db.replicas)
+            await db.execute(User.create())
+            await db.execute(User.insert().values(User(1, "a"), User(2, "b")))
+            self.assertTrue(db.in_transaction)
+            self.assertIs(db.route(User.select()), db.primary)
+            await db.commit()
+
+            self.assertEqual(
+                [db.route(User.select()) for _ in range(3)], [first, second, first]
+            )
+            self.assertIs(db.route(User.delete().everything()), db.primary)
+
+            result = db.execute(User.select().where(User.id == 2))
+            self.assertIsInstance(result, ReplicaResult)
+            self.assertEqual(await result, [User(2, "b")])
+            self.assertIs(result._cursor.connection, second)
+            self.assertEqual(db.replicas[1].outstanding, 0)
+            self.assertEqual(db.stats.replica_reads, 4)
+            self.assertEqual(db.stats.primary_reads, 1)
+
+    async def test_read_your_writes(self):
+        async with self.replicated(read_your_writes=0.05) as db:
+            await db.execute(User.create())
+            await db.commit()
+            self.assertTrue(db.pinned)
+            self.assertIs(db.route(User.select()), db.primary)
+            self.assertEqual(db.stats.pinned_reads, 1)
+
+            await asyncio.sleep(0.06)
+            self.assertFalse(db.pinned)
+            self.assertIsNot(db.route(User.select()), db.primary)
+
+            stmt = db.prepare(User.delete().where(User.id == aql.Param("id")))
+            self.assertIsNot(db.route(User.select()), db.primary)
+            await stmt.execute(id=1)
+            self.assertIs(db.route(User.select()), db.primary)
+
+    async def test_least_outstanding(self):
+        async with self.replicated(balance=Balance.least_outstanding) as db:
+            db.replicas[0].outstanding = 2
+            self.assertIs(db.choose(), db.replicas[1])
+            self.assertIs(db.choose(), db.replicas[1])
+            db.replicas[1].outstanding = 3
+            self.assertIs(db.choose(), db.replicas[0])
+
+    async def test_health_checks(self):
+        async with self.replicated(max_lag=1.0) as db:
+            await db.execute(User.create())
+            await db.commit()
+            first, second = db.replicas
+
+            with patch.object(
+                first.connection, "replica_lag", AsyncMock(return_value=5.0)
+            ):
+                await db.check()
+            self.assertFalse(first.healthy)
+            self.assertEqual(first.lag, 5.0)
+            self.assertTrue(second.healthy)
+            self.assertEqual(db.stats.failed_checks, 1)
+            self.assertEqual(
+                [db.route(User.select()) for _ in range(2)], [second.connection] * 2
+            )
+
+            # a failing replica is reconnected, and stays out of rotation until then
+            lagging = AsyncMock(return_value=float("inf"))
+            with patch.object(first.connection, "replica_lag", lagging), patch.object(
+                second.connection, "ping", AsyncMock(return_value=False)
+            ), patch.object(
+                second.connection, "connect", AsyncMock(side_effect=OSError)
+            ):
+                await db.check()
+            self.assertFalse(first.healthy)
+            self.assertFalse(second.healthy)
+            self.assertIs(db.route(User.select()), db.primary)
+            self.assertEqual(db.stats.fallback_reads, 1)
+
+            await db.check()
+            self.assertTrue(first.healthy)
+            self.assertTrue(second.healthy)
+            self.assertEqual(await db.execute(User.select()), [])
+
+    async def test_check_busy(self):
+        async with self.replicated() as db:
+            first, second = db.replicas
+            routed = []
+
+            async def ping():
+                routed.append(db.route(User.select()))
+                return True
+
+            # replicas being checked don't receive reads
+            with patch.object(first.connection, "ping", ping):
+                await db.check()
+            self.assertEqual(routed, [second.connection])
+            self.assertFalse(first.checking)
+            self.assertIs(db.choose(), first)
+
+    async def test_implicit_transaction(self):
+        async with self.replicated() as db:
+            primary = type(db.primary)
+            with patch.object(
+                primary, "in_transaction", PropertyMock(return_value=True)
+            ):
+                # reads opening an implicit transaction don't pin later reads
+                self.assertIsNot(db.route(User.select()), db.primary)
+                await db.begin()
+                self.assertIs(db.route(User.select()), db.primary)
+                await db.rollback()
+                self.assertIsNot(db.route(User.select()), db.primary)
+
+    async def test_check_loop(self):
+        async with self.replicated(check_interval=0.01) as db:
+            await asyncio.sleep(0.05)
+            self.assertGreaterEqual(db.stats.checks, 2)
+        self.assertIsNone(db._checker)
+
+    async def test_hedge(self):
+        async with self.replicated(hedge_after=0.02) as db:
+            await db.execute(User.create())
+            await db.execute(User.insert().values(User(1, "a")))
+            await db.commit()
+            first, second = db.replicas
+            self.assertTrue(db.hedging)
+
+            slow_cursor = first.connection.cursor
+
+            async def slow(*args, **kwargs):
+                await asyncio.sleep(0.5)
+                return await slow_cursor(*args, **kwargs)
+
+            # the slow replica is hedged, and the second replica wins
+            with patch.object(first.connection, "cursor", slow):
+                result = db.execute(User.select())
+                self.assertEqual(await result, [User(1, "a")])
+            self.assertIs(result._cursor.connection, second.connection)
+            self.assertEqual((db.stats.hedges, db.stats.hedges_won), (1, 1))
+            self.assertEqual(first.outstanding, 0)
+
+            # fast replies never hedge
+            self.assertEqual(await db.execute(User.select()).hedge(1.0), [User(1, "a")])
+            self.assertEqual(db.stats.hedges, 1)
+
+            # errors are raised once both replicas fail
+            failing = AsyncMock(side_effect=OSError("down"))
+            with patch.object(first.connection, "cursor", failing), patch.object(
+                second.connection, "cursor", failing
+            ):
+                with self.assertRaisesRegex(OSError, "down"):
+                    await db.execute(User.select())
+
+    async def test_hedge_recover(self):
+        async with self.replicated(hedge_after=0.02) as db:
+            await db.execute(User.create())
+            await db.execute(User.insert().values(User(1, "a")))
+            await db.commit()
+            first, second = db.replicas
+
+            async def stall(*args):
+                await asyncio.sleep(1)
+
+            # like MySQL, the losing replica closes its connection when cancelled
+            async def interrupted():
+                await first.connection.close()
+                return False
+
+            stalled = MagicMock(spec=Cursor, execute=AsyncMock(side_effect=stall))
+            stalled.connection = first.connection
+            cursors = [stalled]
+            cursor = first.connection.cursor
+
+            async def stalling(*args, **kwargs):
+                if cursors:
+                    return cursors.pop()
+                return await cursor(*args, **kwargs)
+
+            with patch.object(first.connection, "cursor", stalling), patch.object(
+                first.connection, "interrupted", interrupted
+            ):
+                self.assertEqual(await db.execute(User.select()), [User(1, "a")])
+            self.assertEqual((db.stats.hedges, db.stats.hedges_won), (1, 1))
+            self.assertFalse(first.healthy)
+            self.assertIs(db.route(User.select()), second.connection)
+
+            # without periodic checks, the replica is reconnected straight away
+            self.assertIsNone(db._checker)
+            await asyncio.gather(*db._revivals)
+            self.assertTrue(first.healthy)
+            self.assertFalse(first.checking)
+            self.assertEqual(db.stats.checks, 1)
+            db._next = 0
+            result = db.execute(User.select()).hedge(1.0)
+            self.assertEqual(await result, [User(1, "a")])
+            self.assertIs(result._cursor.connection, first.connection)
+
+    async def test_hedge_delay(self):
+        async with self.replicated() as db:
+            self.assertFalse(db.hedging)
+            self.assertIsNone(db.hedge_delay())
+            with self.assertRaisesRegex(ValueError, "requires a delay"):
+                db.execute(User.select()).hedge()
+
+        with self.assertRaisesRegex(ValueError, "between 0 and 100"):
+            self.replicated(hedge_percentile=100)
+
+        db = self.replicated(hedge_after=0.5, hedge_percentile=90)
+        db.latencies.extend(n / 100 for n in range(19))
+        self.assertEqual(db.hedge_delay(), 0.5)
+        db.latencies.append(0.19)
+        self.assertEqual(db.hedge_delay(), 0.18)
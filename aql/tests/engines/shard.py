@@ -0,0 +1,211 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+from typing import Optional
+from unittest import TestCase
+from unittest.mock import AsyncMock, patch
+from uuid import UUID
+
+from aiounittest import AsyncTestCase
+
+import aql
+from aql.engines.shard import hash_shard, merge_key, RangeShards, ShardedResult
+from aql.errors import BuildError, UnroutableQuery
+
+
+@aql.table
+class Order:
+    tenant_id: int
+    id: int
+    total: float
+
+
+@aql.table
+class Customer:
+    id: int
+    name: Optional[str]
+
+
+class ShardFunctionTest(TestCase):
+    def test_hash_shard(self):
+        for value in (1, "tenant", b"tenant", UUID(int=7)):
+            idx = hash_shard(value, 4)
+            self.assertIn(idx, range(4))
+            self.assertEqual(idx, hash_shard(value, 4))
+        self.assertEqual(hash_shard(UUID(int=7), 3), hash_shard(UUID(int=7).bytes, 3))
+        self.assertEqual(len({hash_shard(n, 4) for n in range(100)}), 4)
+
+    def test_range_shards(self):
+        shard = RangeShards([100, 200])
+        self.assertEqual(
+            [shard(v, 3) for v in (0, 99, 100, 199, 200, 10**9)], [0, 0, 1, 1, 2, 2]
+        )
+        with self.assertRaisesRegex(ValueError, "2 range bounds for 4 shards"):
+            shard(5, 4)
+        with self.assertRaisesRegex(ValueError, "sorted"):
+            RangeShards([200, 100])
+
+    def test_merge_key(self):
+        query = Customer.select().orderby(Customer.name, Customer.id, "desc")
+        rows = [(1, "b"), (2, "B"), (3, None), (4, "a"), (5, "b")]
+        key = merge_key(query)
+        self.assertEqual([row[0] for row in sorted(rows, key=key)], [3, 2, 4, 5, 1])
+        key = merge_key(query, collate=str.casefold)
+        self.assertEqual([row[0] for row in sorted(rows, key=key)], [3, 4, 5, 2, 1])
+        self.assertIsNone(merge_key(Customer.select()))
+
+
+class ShardTest(AsyncTestCase):
+    def sharded(self, count=3):
+        return aql.sharded(
+            ["sqlite://:memory:"] * count, Order.tenant_id, RangeShards([10, 20])
+        )
+
+    async def create(self, db):
+        for shard in db.shards:
+            await shard.execute(Order.create())
+
+    def test_locations(self):
+        with self.assertRaisesRegex(ValueError, "at least one"):
+            aql.sharded([], "tenant_id")
+        with self.assertRaisesRegex(ValueError, "same engine"):
+            aql.sharded(["sqlite://:memory:", "mysql://foo"], "tenant_id")
+
+        db = aql.sharded(["sqlite://:memory:"] * 2, "tenant_id")
+        self.assertEqual(db.key, "tenant_id")
+        self.assertEqual(len(db.shards), 2)
+        self.assertTrue(all(shard.engine is db.engine for shard in db.shards))
+
+    async def test_insert_split(self):
+        async with self.sharded() as db:
+            await self.create(db)
+            rows = [Order(t, i, 1.5) for i, t in enumerate([1, 12, 25, 3, 14])]
+            result = db.execute(Order.insert().values(*rows))
+            self.assertEqual(await result, [])
+            self.assertEqual(result.row_count, 5)
+
+            per_shard = [await shard.execute(Order.select()) for shard in db.shards]
+            self.assertEqual(
+                per_shard, [[rows[0], rows[3]], [rows[1], rows[4]], [rows[2]]]
+            )
+
+            # single shard inserts skip the fan out
+            result = db.execute(Order.insert().values(Order(5, 9, 0.0)))
+            self.assertNotIsInstance(result, ShardedResult)
+            await result
+            self.assertEqual(len(await db.shards[0].execute(Order.select())), 3)
+
+            await db.execute_many(Order.insert(), [Order(2, 10, 0), Order(22, 11, 0)])
+            self.assertEqual(len(await db.shards[2].execute(Order.select())), 2)
+
+    async def test_route(self):
+        async with self.sharded() as db:
+            await self.create(db)
+            await db.execute(
+                Order.insert().values(*(Order(t, t, t * 1.0) for t in range(30)))
+            )
+
+            rows = await db.execute(Order.select().where(Order.tenant_id == 12))
+            self.assertEqual(rows, [Order(12, 12, 12.0)])
+
+            query = Order.select().where(
+                Order.tenant_id.in_([21, 22]), Order.total > 21.5
+            )
+            self.assertIs(db.route(query), db.shards[2])
+            self.assertEqual(await db.execute(query), [Order(22, 22, 22.0)])
+
+            query = Order.select().where(
+                Order.tenant_id == 1, Order.tenant_id == 2, grouping=aql.Boolean.or_
+            )
+            self.assertEqual(len(await db.execute(query)), 2)
+
+            query = Order.update(total=0).where(Order.tenant_id == 15)
+            self.assertIs(db.route(query), db.shards[1])
+
+            await db.execute(Order.delete().where(Order.tenant_id == 16))
+            rows = await db.shards[1].execute(Order.select().where(Order.id >= 15))
+            self.assertEqual([row.id for row in rows], [15, 17, 18, 19])
+
+    async def test_unroutable(self):
+        async with self.sharded() as db:
+            for query in (
+                Order.select(),
+                Order.select().where(Order.total > 1),
+                Order.select().where(Order.tenant_id > 1),
+                Order.select().where(Order.tenant_id.in_([1, 11])),
+                Order.select().where(
+                    Order.tenant_id == 1, Order.id == 2, grouping=aql.Boolean.or_
+                ),
+                Order.delete().everything(),
+                Order.create(),
+            ):
+                with self.subTest(query=query), self.assertRaises(UnroutableQuery):
+                    db.execute(query)
+
+            with self.assertRaisesRegex(UnroutableQuery, "without tenant_id"):
+                db.execute(Order.insert(Order.id).values(Order(1, 2, 3)))
+            with self.assertRaisesRegex(BuildError, "would move rows"):
+                db.execute(Order.update(tenant_id=2).where(Order.tenant_id == 1))
+            with self.assertRaises(UnroutableQuery):
+                await db.cursor()
+
+    async def test_scatter(self):
+        async with self.sharded() as db:
+            await self.create(db)
+            rows = [Order(t, t % 7, float(t % 4)) for t in range(30)]
+            await db.execute(Order.insert().values(*rows))
+
+            with self.assertRaisesRegex(UnroutableQuery, "use scatter"):
+                db.execute(Order.select())
+
+            query = Order.select().orderby(Order.total, "desc", Order.id)
+            expected = sorted(rows, key=lambda r: (-r.total, r.id))
+            result = db.scatter(query, batch_size=4)
+            self.assertIsInstance(result, ShardedResult)
+            self.assertEqual(
+                [(r.total, r.id) for r in await result],
+                [(r.total, r.id) for r in expected],
+            )
+
+            # limits and offsets apply to the merged rows
+            result = db.scatter(query.limit(5, offset=3), batch_size=2)
+            self.assertEqual([part.query._limit for part in result.results], [8, 8, 8])
+            self.assertEqual(
+                [part.query._offset for part in result.results], [None] * 3
+            )
+            page = await result
+            self.assertEqual(
+                [(r.total, r.id) for r in page],
+                [(r.total, r.id) for r in expected[3:8]],
+            )
+
+            # only shards matching the key are queried
+            query = Order.select().where(Order.tenant_id.in_([1, 25])).orderby(Order.id)
+            result = db.scatter(query)
+            self.assertEqual(len(result.results), 2)
+            self.assertEqual(await result.tuples(), [(1, 1, 1.0), (25, 4, 1.0)])
+
+            # without an order, shards are read in turn
+            batches = [batch async for batch in db.scatter(Order.select()).batches(7)]
+            self.assertEqual([len(b) for b in batches], [7, 7, 7, 7, 2])
+            self.assertEqual([r for b in batches for r in b], rows)
+
+            result = db.scatter(Order.select().orderby(Order.id).limit(3))
+            self.assertEqual(await result.fetch(2), [rows[0], rows[7]])
+            await result.close()
+
+            # a failing shard doesn't leave the others streaming
+            result = db.scatter(Order.select().orderby(Order.id))
+            failing = AsyncMock(side_effect=OSError("down"))
+            with patch.object(db.shards[2], "cursor", failing):
+                with self.assertRaisesRegex(OSError, "down"):
+                    await result
+            self.assertTrue(all(part._closed for part in result.results[:2]))
+            self.assertTrue(all(shard._stream is None for shard in db.shards))
+
+            with self.assertRaisesRegex(BuildError, "requires selecting total"):
+                db.scatter(Order.select(Order.id).orderby(Order.total))
+            with self.assertRaisesRegex(BuildError, "grouped or distinct"):
+                db.scatter(Order.select().distinct())
+            with self.assertRaisesRegex(BuildError, "requires a select"):
+                db.scatter(Order.delete().everything())
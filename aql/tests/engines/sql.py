@@ -1,13 +1,28 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+from datetime import datetime, timezone
+from enum import IntEnum
 from unittest import TestCase
+from unittest.mock import patch
+from uuid import UUID
 
+from aql.column import Compact
 from aql.engines.sql import SqlEngine
 from aql.errors import BuildError, UnsafeQuery
 from aql.query import PreparedQuery
 from aql.table import table
-from aql.types import And, Join, Or, Order, TableJoin
+from aql.types import (
+    And,
+    InStrategy,
+    Join,
+    Operator,
+    Or,
+    Order,
+    Param,
+    RowComparison,
+    TableJoin,
+)
 
 
 @table
@@ -24,6 +39,19 @@ class Note:
     content: str
 
 
+class Status(IntEnum):
+    new = 1
+    done = 2
+
+
+@table
+class Task:
+    id: Compact[UUID]
+    created: Compact[datetime]
+    status: Compact[Status]
+    due: datetime
+
+
 class SqlEngineTest(TestCase):
     maxDiff = 1500
 
@@ -426,3 +454,294 @@ class SqlEngineTest(TestCase):
         query = Contact.delete()
         with self.assertRaises(UnsafeQuery):
             engine.prepare(query)
+
+    def test_prepare_cache(self):
+        engine = SqlEngine()
+        uncached = SqlEngine(cache_size=0)
+
+        def queries(n):
+            return [
+                Contact.insert().values(Contact(n, "Jack", "Janitor")),
+                Contact.select()
+                .where(Contact.contact_id > n, Contact.name.in_(["a", str(n)]))
+                .orderby(Contact.name)
+                .limit(n, n),
+                Contact.select(Contact.name, Note.content)
+                .join(Note, Join.left)
+                .on(Note.contact_id == Contact.contact_id, Note.note_id < n)
+                .where(Or(Contact.name == "Jill", Contact.contact_id == n))
+                .groupby(Contact.title)
+                .having(Contact.contact_id < n),
+                Contact.update(Contact.title == "Engineer").where(
+                    Contact.contact_id == n
+                ),
+                Contact.delete().where(Contact.contact_id < n).limit(n),
+            ]
+
+        for n in (1, 2, 3):
+            for query, expected in zip(queries(n), queries(n)):
+                pquery = engine.prepare(query)
+                self.assertEqual(tuple(pquery), tuple(uncached.prepare(expected)))
+
+        info = engine.cache.info()
+        self.assertEqual(info.misses, 5)
+        self.assertEqual(info.hits, 10)
+        self.assertEqual(info.size, 5)
+        self.assertEqual(uncached.cache.info().size, 0)
+
+        # different shapes get different entries
+        engine.prepare(Contact.select().where(Contact.name.in_(["a", "b", "c"])))
+        engine.prepare(Contact.select().where(Contact.name == Note.content))
+        engine.prepare(Contact.select().limit(0))
+        self.assertEqual(engine.cache.info().misses, 8)
+
+        engine.cache.maxsize = 2
+        self.assertEqual(engine.cache.info().evictions, 6)
+        self.assertEqual(len(engine.cache), 2)
+
+        with self.assertRaises(UnsafeQuery):
+            engine.prepare(Contact.delete())
+
+    def test_prepare_frozen(self):
+        engine = SqlEngine()
+        other = SqlEngine()
+        base = (
+            Contact.select()
+            .where(Contact.contact_id > 5, Contact.name.in_(["a", "b"]))
+            .freeze()
+        )
+        expected = engine.prepare(base)
+        self.assertIsNotNone(base._shape)
+
+        # later calls reuse the stored fingerprint, with a fresh parameter list
+        with patch.object(engine, "shape", side_effect=AssertionError):
+            pquery = engine.prepare(base)
+            self.assertEqual(tuple(pquery), tuple(expected))
+            pquery.parameters.append("x")
+            self.assertEqual(engine.prepare(base).parameters, [5, "a", "b"])
+        self.assertEqual(engine.cache.info().hits, 2)
+
+        # other engines, changed limits, and extended queries walk it again
+        self.assertEqual(tuple(other.prepare(base)), tuple(expected))
+        engine.in_inline_limit = 1
+        self.assertEqual(engine.prepare(base).parameters, [5, "a", "b"])
+        self.assertIs(base._shape[0], engine)
+        limited = base.limit(3)
+        self.assertIsNone(limited._shape)
+        self.assertEqual(engine.prepare(limited).parameters, [5, "a", "b", 3])
+
+        # mutable queries aren't memoized
+        query = Contact.select().where(Contact.contact_id > 5)
+        engine.prepare(query)
+        self.assertIsNone(query._shape)
+
+    def test_render_param(self):
+        engine = SqlEngine()
+
+        query = (
+            Contact.select()
+            .where(
+                Contact.name == Param("name"),
+                Contact.contact_id.in_(Param("ids")),
+            )
+            .limit(Param("n"))
+        )
+        pquery = engine.prepare(query)
+
+        sql = (
+            "SELECT ALL `Contact`.`contact_id`, `Contact`.`name`, `Contact`.`title` "
+            "FROM `Contact` "
+            "WHERE (`Contact`.`name` = ? AND `Contact`.`contact_id` IN (?)) "
+            "LIMIT ?"
+        )
+        parameters = [Param("name"), Param("ids", expand=True), Param("n")]
+
+        self.assertEqual(pquery.sql, sql)
+        self.assertEqual(pquery.parameters, parameters)
+        self.assertEqual(tuple(engine.prepare(query)), (sql, parameters))
+        self.assertEqual(engine.cache.info().hits, 1)
+
+        query = Contact.update(title=Param("title")).where(
+            Contact.contact_id == Param("id")
+        )
+        pquery = engine.prepare(query)
+
+        sql = (
+            "UPDATE `Contact` SET `Contact`.`title` = ? "
+            "WHERE (`Contact`.`contact_id` = ?)"
+        )
+        self.assertEqual(pquery.sql, sql)
+        self.assertEqual(pquery.parameters, [Param("title"), Param("id")])
+
+    def test_in_strategy(self):
+        engine = SqlEngine()
+        engine.in_inline_limit = 3
+        engine.in_chunk_limit = 6
+
+        small = Contact.contact_id.in_([1, 2, 3])
+        medium = Contact.contact_id.in_([1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(engine.in_strategy(small), InStrategy.inline)
+        self.assertEqual(engine.in_strategy(medium), InStrategy.chunked)
+        # generic engine has no JSON support
+        self.assertEqual(engine.in_strategy(medium), InStrategy.chunked)
+
+        query = Contact.select().where(Contact.name == "a", medium)
+        plan = engine.plan(query)
+        sql = (
+            "SELECT ALL `Contact`.`contact_id`, `Contact`.`name`, `Contact`.`title` "
+            "FROM `Contact` "
+            "WHERE (`Contact`.`name` = ? AND `Contact`.`contact_id` IN (?,?,?))"
+        )
+        self.assertEqual(
+            [tuple(p) for p in plan],
+            [
+                (sql, ["a", 1, 2, 3]),
+                (sql, ["a", 4, 5, 6]),
+                (sql, ["a", 7, 7, 7]),
+            ],
+        )
+        self.assertEqual(engine.in_strategies[InStrategy.chunked], 1)
+        self.assertEqual(engine.cache.info().hits, 2)
+
+        # duplicates removed before chunking
+        query = Contact.delete().where(Contact.contact_id.in_([1, 1, 2, 2, 3, 3, 1]))
+        self.assertEqual(len(engine.plan(query)), 1)
+
+        # not safe to split
+        for query in (
+            Contact.select().where(medium).orderby(Contact.name),
+            Contact.select().where(medium).limit(5),
+            Contact.select().where(medium).distinct(),
+            Contact.select().where(medium, Contact.name == "a", grouping=Or),
+            Contact.update(title="a").where(medium).limit(1),
+        ):
+            self.assertEqual(len(engine.plan(query)), 1)
+
+        self.assertEqual(len(engine.plan(Contact.update(title="a").where(medium))), 3)
+        self.assertEqual(len(engine.plan(Contact.select().where(Or(medium)))), 3)
+        self.assertEqual(engine.in_strategies[InStrategy.chunked], 9)
+
+        # strategies are cached with the shape, and only split plans walk again
+        engine.in_strategies.clear()
+        query = Contact.select().where(Contact.name.in_(["a", "b"]))
+        engine.plan(query)
+        with patch.object(engine, "plan_in", side_effect=AssertionError):
+            plan = engine.plan(Contact.select().where(Contact.name.in_(["c", "d"])))
+            self.assertEqual(plan[0].parameters, ["c", "d"])
+            query = Contact.select().where(Contact.name == "a", medium)
+            self.assertEqual(len(engine.plan(query)), 3)
+        self.assertEqual(engine.in_strategies[InStrategy.inline], 2)
+        self.assertEqual(engine.in_strategies[InStrategy.chunked], 1)
+
+        # changed limits plan the shape again
+        engine.in_inline_limit = 10
+        self.assertEqual(len(engine.plan(query)), 1)
+        self.assertEqual(engine.in_strategies[InStrategy.inline], 3)
+
+    def test_plan_insert(self):
+        engine = SqlEngine()
+        rows = [Contact(i, "Jack", "Janitor") for i in range(10)]
+        query = Contact.insert().values(*rows)
+
+        self.assertEqual(len(engine.plan(query)), 1)
+
+        engine.max_parameters = 9
+        plan = engine.plan(query)
+        self.assertEqual(len(plan), 4)
+        self.assertEqual([len(p.parameters) for p in plan], [9, 9, 9, 3])
+        self.assertEqual(plan[0].sql, plan[1].sql)
+        self.assertEqual(
+            plan[3].sql,
+            "INSERT INTO `Contact` (`contact_id`, `name`, `title`) VALUES (?,?,?)",
+        )
+        self.assertEqual(
+            [p for pquery in plan for p in pquery.parameters],
+            engine.prepare(query).parameters,
+        )
+
+        engine.max_parameters = 999
+        engine.max_packet = engine.PACKET_OVERHEAD + 200
+        sizes = [engine.estimate_size(value) for value in (1, "Jack", "Janitor")]
+        self.assertEqual(sizes, [24, 18, 30])
+        plan = engine.plan(query)
+        self.assertEqual([len(p.parameters) // 3 for p in plan], [2, 2, 2, 2, 2])
+
+        # single oversized rows still go through, one per statement
+        engine.max_packet = engine.PACKET_OVERHEAD + 10
+        self.assertEqual(len(engine.plan(query)), 10)
+
+        for value, size in (
+            (None, 4),
+            (b"abc", 16),
+            (1.5, 24),
+            (Contact, 4 * len(str(Contact)) + 2),
+        ):
+            self.assertEqual(engine.estimate_size(value), size)
+
+    def test_insert_many(self):
+        engine = SqlEngine()
+        engine.max_parameters = 3
+
+        rows = [Contact(1, "Jack", "Janitor"), Contact(2, "Jill", "Owner")]
+        query = Contact.insert().values(*rows).many()
+        sql = "INSERT INTO `Contact` (`contact_id`, `name`, `title`) VALUES (?,?,?)"
+
+        for _ in range(2):
+            plan = engine.plan(query)
+            self.assertEqual(len(plan), 1)
+            self.assertTrue(plan[0].many)
+            self.assertEqual(plan[0].sql, sql)
+            self.assertEqual(
+                plan[0].parameters, [(1, "Jack", "Janitor"), (2, "Jill", "Owner")]
+            )
+
+        self.assertEqual(engine.cache.info().hits, 1)
+        self.assertEqual(engine.prepare(Contact.insert().many()).sql, sql)
+
+    def test_compact(self):
+        engine = SqlEngine()
+        uid = UUID(int=7)
+        created = datetime(2024, 1, 1, 0, 0, 1)
+        due = datetime(2024, 2, 1)
+
+        self.assertEqual(
+            [engine.column_type(Task._column_types[c]) for c in Task._columns],
+            ["BINARY(16)", "BIGINT", "SMALLINT", "DATETIME"],
+        )
+
+        pquery = engine.prepare(
+            Task.insert().values(Task(uid, created, Status.done, due))
+        )
+        self.assertEqual(pquery.parameters, [uid.bytes, 1704067201000000, 2, due])
+
+        query = Task.select().where(
+            Task.created > created.replace(tzinfo=timezone.utc),
+            Task.id.in_([uid]),
+            Task.status == Param("status"),
+            Task.due < due,
+        )
+        for _ in range(2):  # uncached, then cached
+            pquery = engine.prepare(query)
+            self.assertEqual(pquery.parameters[:2], [1704067201000000, uid.bytes])
+            self.assertEqual(pquery.parameters[2].encode(Status.new), 1)
+            self.assertEqual(pquery.parameters[3], due)
+
+        pquery = engine.prepare(
+            Task.update(Task.status == Status.new).where(Task.created == created)
+        )
+        self.assertEqual(pquery.parameters, [1, 1704067201000000])
+
+    def test_row_comparison(self):
+        engine = SqlEngine()
+        query = Contact.select().where(
+            RowComparison([Contact.name, Contact.contact_id], Operator.gt, ["Jack", 1])
+        )
+        for _ in range(2):  # uncached, then cached
+            pquery = engine.prepare(query)
+            self.assertEqual(
+                pquery.sql,
+                "SELECT ALL `Contact`.`contact_id`, `Contact`.`name`, "
+                "`Contact`.`title` FROM `Contact` WHERE "
+                "((`Contact`.`name`, `Contact`.`contact_id`) > (?, ?))",
+            )
+            self.assertEqual(pquery.parameters, ["Jack", 1])
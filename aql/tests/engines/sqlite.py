@@ -9,7 +9,7 @@ from aql.column import AutoIncrement, Column, Index, Primary, Unique
 from aql.engines.sqlite import SqliteEngine
 from aql.errors import BuildError
 from aql.table import Table, table
-from aql.types import Text
+from aql.types import InStrategy, Text
 
 
 class SqliteEngineTest(TestCase):
@@ -109,3 +109,31 @@ class SqliteEngineTest(TestCase):
 
         with self.assertRaises(BuildError):
             engine.prepare(Foo.create())
+
+    def test_in_json(self):
+        engine = SqliteEngine()
+        engine.in_chunk_limit = 200
+
+        @table
+        class Foo:
+            id: int
+
+        values = list(range(201))
+        query = Foo.select().where(Foo.id.in_(values))
+        self.assertEqual(
+            engine.in_strategy(query._where[0].clauses[0]), InStrategy.json
+        )
+
+        sql = (
+            "SELECT ALL `Foo`.`id` FROM `Foo` "
+            "WHERE (`Foo`.`id` IN (SELECT `value` FROM json_each(?)))"
+        )
+        for _ in range(2):
+            pquery = engine.prepare(query)
+            self.assertEqual(pquery.sql, sql)
+            self.assertEqual(pquery.parameters, [str(values)])
+
+        query = Foo.select().where(Foo.id.in_([object()] * 201))
+        self.assertEqual(
+            engine.in_strategy(query._where[0].clauses[0]), InStrategy.chunked
+        )
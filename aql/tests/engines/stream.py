@@ -0,0 +1,99 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+import asyncio
+
+from aiounittest import AsyncTestCase
+
+import aql
+from aql.engines.stream import insert_stream, StreamStats
+
+
+@aql.table
+class Item:
+    id: int
+    name: str
+
+
+class FakeConnection:
+    def __init__(self):
+        self.inserted = 0
+        self.commits = 0
+        self.queries = []
+
+    async def _execute(self, query):
+        await asyncio.sleep(0.001)
+        self.queries.append(query)
+        self.inserted += len(query._rows)
+
+    def execute(self, query):
+        return self._execute(query)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class StreamTest(AsyncTestCase):
+    async def test_insert_stream_async(self):
+        conn = FakeConnection()
+        ahead = []
+
+        async def source():
+            for i in range(1050):
+                ahead.append(i - conn.inserted)
+                yield Item(i, "x")
+
+        stats = await insert_stream(
+            conn, Item, source(), batch_size=100, max_inflight=2, commit_every=4
+        )
+
+        self.assertIsInstance(stats, StreamStats)
+        self.assertEqual(stats.rows, 1050)
+        self.assertEqual(stats.batches, 11)
+        self.assertEqual(stats.commits, 3)
+        self.assertEqual(conn.commits, 3)
+        self.assertEqual(conn.inserted, 1050)
+        self.assertEqual(len(stats.latencies), 11)
+        self.assertGreater(stats.rows_per_second, 0)
+        self.assertGreaterEqual(stats.max_latency, stats.mean_latency)
+        self.assertFalse(any(q._many for q in conn.queries))
+
+        # queue + batch being written + batch being read
+        self.assertLessEqual(max(ahead), (2 + 2) * 100)
+
+    async def test_insert_stream_sync(self):
+        conn = FakeConnection()
+        stats = await insert_stream(
+            conn, Item, (Item(i, "x") for i in range(10)), batch_size=3, many=True
+        )
+        self.assertEqual(stats.rows, 10)
+        self.assertEqual(stats.batches, 4)
+        self.assertEqual(stats.commits, 0)
+        self.assertTrue(all(q._many for q in conn.queries))
+
+        self.assertEqual(StreamStats().rows_per_second, 0.0)
+        self.assertEqual(StreamStats().mean_latency, 0.0)
+
+    async def test_insert_stream_errors(self):
+        conn = FakeConnection()
+
+        async def source():
+            yield Item(1, "x")
+            raise RuntimeError("source failed")
+
+        with self.assertRaisesRegex(RuntimeError, "source failed"):
+            await insert_stream(conn, Item, source(), batch_size=1)
+        self.assertEqual(conn.inserted, 1)
+
+        with self.assertRaises(ValueError):
+            await insert_stream(conn, Item, [], batch_size=0)
+
+    async def test_insert_stream_sqlite(self):
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Item.create())
+            stats = await db.insert_stream(
+                Item, (Item(i, "x") for i in range(25)), batch_size=10, commit_every=1
+            )
+            self.assertEqual(stats.rows, 25)
+            self.assertEqual(stats.commits, 3)
+            self.assertEqual(len(await db.execute(Item.select())), 25)
@@ -1,13 +1,24 @@
 # Copyright 2022 Amethyst Reese
 # Licensed under the MIT license
 
+from typing import Optional
 from unittest import TestCase
 
-from aql.column import Column
+from aql.column import Column, Primary, Unique
 from aql.errors import BuildError
 from aql.query import PreparedQuery, Query
 from aql.table import Table, table
-from aql.types import Join, QueryAction, Select, TableJoin
+from aql.types import (
+    And,
+    Join,
+    Operator,
+    Or,
+    Order,
+    QueryAction,
+    RowComparison,
+    Select,
+    TableJoin,
+)
 
 one: Table = Table("foo", [Column("a"), Column("b")])
 two: Table = Table("bar", [Column("e"), Column("f")])
@@ -42,6 +53,8 @@ class QueryTest(TestCase):
         self.assertEqual(query._action, QueryAction.insert)
         self.assertEqual(query._columns, [one.b])
         self.assertEqual(query._rows, [(1,), (3,), (2,), (4,)])
+        self.assertFalse(query._many)
+        self.assertTrue(query.many()._many)
 
     def test_select(self):
         query = Query(one).select(one.a).where(one.b > 5, two.f < 10).limit(7)
@@ -182,6 +195,8 @@ class QueryTest(TestCase):
         self.assertEqual(factory(1).a, 1)
         with self.assertRaises(AttributeError):
             factory(1).b
+        self.assertIs(Query(Foo).select(Foo.a).factory(), factory)
+        self.assertIsNot(Query(Foo).select(Foo.b).factory(), factory)
 
         query = Query(one).select()
         factory = query.factory()
@@ -189,6 +204,53 @@ class QueryTest(TestCase):
         self.assertEqual(factory(1, 2).a, 1)
         self.assertEqual(factory(1, 2).b, 2)
 
+    def test_freeze(self):
+        base = Query(one).select().where(one.a > 5)
+        self.assertFalse(base.frozen)
+        self.assertIs(base.limit(5), base)
+
+        base = base.freeze()
+        self.assertTrue(base.frozen)
+
+        derived = base.where(one.b == 1).orderby(one.a).limit(3)
+        self.assertIsNot(derived, base)
+        self.assertTrue(derived.frozen)
+        self.assertEqual(len(base._where), 1)
+        self.assertEqual(len(derived._where), 2)
+        self.assertIs(derived._where[0], base._where[0])
+        self.assertEqual(base._order, [])
+        self.assertEqual(base._limit, 5)
+        self.assertEqual(derived._limit, 3)
+        self.assertIs(derived._columns, base._columns)
+
+        joined = base.join(two).on(one.a == two.e)
+        again = joined.on(one.b == two.f)
+        self.assertEqual(base._joins, [])
+        self.assertEqual(joined._joins, [TableJoin(two, Join.inner, [one.a == two.e])])
+        self.assertEqual(len(again._joins[0].on), 2)
+
+        grouped = base.groupby(one.b)
+        having = grouped.having(one.a < 3)
+        self.assertEqual(grouped._having, [])
+        self.assertEqual(len(having._having), 1)
+
+        fresh = Query(one).freeze()
+        insert = fresh.insert()
+        self.assertEqual(fresh._action, QueryAction.unset)
+        self.assertEqual(insert._action, QueryAction.insert)
+        rows = insert.values((1, 2))
+        more = rows.values((3, 4))
+        self.assertEqual(rows._rows, [(1, 2)])
+        self.assertEqual(more._rows, [(1, 2), (3, 4)])
+        self.assertEqual(insert._rows, [])
+
+        # freezing a mutable query isn't affected by later changes to it
+        mutable = Query(one).insert().values((1, 2))
+        frozen = mutable.freeze()
+        self.assertIs(mutable.values((3, 4)), mutable)
+        self.assertEqual(mutable._rows, [(1, 2), (3, 4)])
+        self.assertEqual(frozen._rows, [(1, 2)])
+
     def test_prepared_query_iter(self):
         sql = "SELECT * FROM `foo` WHERE a=?"
         parameters = (1,)
@@ -199,3 +261,62 @@ class QueryTest(TestCase):
         self.assertEqual(query.parameters, parameters)
         self.assertEqual(tuple(query), (sql, parameters))
         self.assertEqual((*query, 6), (sql, parameters, 6))
+
+    def test_paginate(self):
+        @table
+        class Item:
+            id: Primary[int]
+            name: str
+            code: Unique[str]
+            note: Optional[str]
+
+        query = Item.select().orderby(Item.name).paginate(10)
+        self.assertEqual(query._limit, 10)
+        self.assertEqual(query._where, [])
+        self.assertEqual(
+            [(c.name, o) for c, o in query._order],
+            [("name", Order.asc), ("id", Order.asc)],
+        )
+
+        row = Item(3, "c", "x", None)
+        query = Item.select().orderby(Item.name, "desc").paginate(10, after=row)
+        (seek,) = query._where
+        self.assertIsInstance(seek, RowComparison)
+        self.assertEqual([c.name for c in seek.columns], ["name", "id"])
+        self.assertEqual(seek.operator, Operator.lt)
+        self.assertEqual(seek.values, ["c", 3])
+
+        query = Item.select().orderby(Item.name, Item.id, "desc")
+        query.paginate(5, after={"name": "c", "id": 3})
+        (seek,) = query._where
+        self.assertIsInstance(seek, Or)
+        first, second = seek.clauses
+        self.assertIsInstance(first, And)
+        self.assertEqual(first.clauses[0].operator, Operator.gt)
+        self.assertEqual(
+            [(c.column.name, c.operator, c.value) for c in second.clauses],
+            [("name", Operator.eq, "c"), ("id", Operator.lt, 3)],
+        )
+
+        # unique columns are already deterministic
+        query = Item.select().orderby(Item.code).paginate(10)
+        self.assertEqual([c.name for c, _ in query._order], ["code"])
+
+        # frozen queries are copied
+        base = Item.select().orderby(Item.name).freeze()
+        page = base.paginate(10, after=row)
+        self.assertIsNot(page, base)
+        self.assertEqual(base._where, [])
+
+        with self.assertRaisesRegex(BuildError, "orderby"):
+            Item.select().paginate(10)
+        with self.assertRaisesRegex(BuildError, "nullable"):
+            Item.select().orderby(Item.note).paginate(10)
+        with self.assertRaisesRegex(BuildError, "offset"):
+            Item.select().orderby(Item.id).offset(5).paginate(10)
+        with self.assertRaisesRegex(BuildError, "selecting id"):
+            Item.select(Item.name).orderby(Item.name).paginate(10)
+        with self.assertRaisesRegex(BuildError, "positive"):
+            Item.select().orderby(Item.id).paginate(0)
+        with self.assertRaisesRegex(BuildError, "primary key"):
+            Query(one).select().orderby(one.a).paginate(10)
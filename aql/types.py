@@ -4,17 +4,19 @@
 from enum import auto, Enum, IntEnum
 from typing import (
     Any,
+    Callable,
     Generic,
     List,
     NewType,
     Optional,
+    Sequence,
     Tuple,
     TYPE_CHECKING,
     TypeVar,
     Union,
 )
 
-from attr import dataclass, Factory
+from attr import dataclass, Factory, field
 
 if TYPE_CHECKING:  # pragma: no cover
     from .column import Column
@@ -65,6 +67,14 @@ class Operator(Enum):
     ilike = auto()
 
 
+class InStrategy(Enum):
+    """How the engine renders and executes a large ``Column.in_()`` comparison."""
+
+    inline = "inline"
+    chunked = "chunked"
+    json = "json"
+
+
 class Boolean(Enum):
     and_ = "and"
     or_ = "or"
@@ -86,6 +96,23 @@ class Order(Enum):
     desc = "desc"
 
 
+@dataclass(frozen=True)
+class Param:
+    """
+    Named placeholder for a value that is bound when a statement is executed.
+
+    When used with ``Column.in_()``, the bound value must be a sequence, and the
+    placeholder expands to match its length.
+
+    Engines set ``encode`` when the placeholder is compared with a column that has
+    a compact encoding, so bound values are stored the same way as the column.
+    """
+
+    name: str
+    expand: bool = False
+    encode: Optional[Callable[[Any], Any]] = field(default=None, eq=False, repr=False)
+
+
 @dataclass
 class Comparison:
     column: "Column"
@@ -93,7 +120,19 @@ class Comparison:
     value: Any
 
 
-Clause = Union[Comparison, "And", "Or"]
+@dataclass
+class RowComparison:
+    """
+    Comparison of several columns against several values, in order, like
+    ``(a, b) > (1, 2)``.
+    """
+
+    columns: Sequence["Column"]
+    operator: Operator
+    values: Sequence[Any]
+
+
+Clause = Union[Comparison, RowComparison, "And", "Or"]
 
 
 class And:
@@ -0,0 +1,6 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Microbenchmarks for aql, run from the repo root with `python -m bench.<name>`.
+"""
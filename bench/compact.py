@@ -0,0 +1,77 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Compare ISO string and compact integer storage of indexed datetime columns, on
+file-backed SQLite: database size, and time to run range queries.
+
+Usage: python -m bench.compact [rows]
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+
+import aql
+from aql.column import Compact
+
+
+@aql.table
+class TextLog:
+    id: int
+    at: datetime
+    message: str
+
+
+@aql.table
+class CompactLog:
+    id: int
+    at: Compact[datetime]
+    message: str
+
+
+async def run(path: Path, table: Any, count: int, rounds: int = 20) -> None:
+    start = datetime(2024, 1, 1)
+    window = timedelta(seconds=max(1, count // 20))
+    async with aql.connect(f"sqlite:///{path}") as db:
+        await db.execute(table.create())
+        cursor = await db.cursor()
+        await cursor.execute(f"CREATE INDEX `idx_at` ON `{table._name}` (`at`)")
+        await cursor.close()
+        rows = [table(i, start + timedelta(seconds=i), "ok") for i in range(count)]
+        await db.execute_many(table.insert(), rows)
+        await db.commit()
+
+        queries = [
+            table.select(table.id).where(table.at >= low, table.at < low + window)
+            for low in (
+                start + timedelta(seconds=(n * 7919) % count) for n in range(rounds)
+            )
+        ]
+        best = float("inf")
+        for _ in range(5):
+            matched = 0
+            before = time.perf_counter()
+            for query in queries:
+                matched += len(await db.execute(query).scalars())
+            best = min(best, time.perf_counter() - before)
+
+    size = path.stat().st_size
+    print(
+        f"{table._name:>10}: {size / 1024:10,.0f} KiB, "
+        f"{best / rounds * 1e6:8.1f} us/range query ({matched} rows)"
+    )
+
+
+async def main(count: int) -> None:
+    with TemporaryDirectory() as td:
+        for table in (TextLog, CompactLog):
+            await run(Path(td) / f"{table._name}.db", table, count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000))
@@ -0,0 +1,112 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Measure the per-query cost of the full Result execution path: building a query,
+planning and preparing it, and fetching and converting rows.
+
+The "stub driver" cases swap the SQLite connection for an in-process driver that
+returns canned rows without a worker thread, so only the library's own overhead
+is measured. Run against an older checkout with the same command to compare;
+checkouts without frozen queries run the reused query in the "frozen" cases.
+
+Usage: python -m bench.execute [queries]
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable, List, Sequence
+
+import aql
+
+
+@aql.table
+class Order:
+    id: int
+    tenant: int
+    status: str
+    total: float
+
+
+ROWS = [(i, 7, "new", i * 1.5) for i in range(10)]
+
+
+class StubCursor:
+    rowcount = -1
+    lastrowid = None
+
+    def __init__(self, rows: Sequence[Any]) -> None:
+        self.rows = rows
+
+    async def execute(self, sql: str, parameters: Any = None) -> None:
+        pass
+
+    async def fetchall(self) -> Sequence[Any]:
+        return self.rows
+
+    async def fetchmany(self, size: int) -> Sequence[Any]:
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    async def close(self) -> None:
+        pass
+
+
+class StubDriver:
+    in_transaction = False
+    isolation_level = None
+
+    async def cursor(self) -> StubCursor:
+        return StubCursor(ROWS)
+
+
+def build(tenant: int) -> aql.Query:
+    return (
+        Order.select()
+        .where(Order.tenant == tenant, Order.status.in_(["new", "paid"]))
+        .orderby(Order.id)
+        .limit(50)
+    )
+
+
+async def measure(count: int, fn: Callable[[], Awaitable[Any]]) -> float:
+    best = float("inf")
+    for _ in range(5):
+        before = time.perf_counter()
+        for _ in range(count):
+            await fn()
+        best = min(best, time.perf_counter() - before)
+    return best / count
+
+
+async def main(count: int) -> None:
+    async with aql.connect("sqlite://:memory:") as db:
+        await db.execute(Order.create())
+        await db.execute(Order.insert().values(*(Order(*row) for row in ROWS)))
+        query = build(7)
+        frozen = query.freeze() if hasattr(query, "freeze") else query
+
+        real: List[Any] = [
+            ("sqlite: execute(build())", lambda: db.execute(build(7))),
+            ("sqlite: execute(reused)", lambda: db.execute(query)),
+            ("sqlite: execute(frozen)", lambda: db.execute(frozen)),
+        ]
+        for name, fn in real:
+            print(f"{name:>32}: {await measure(count, fn) * 1e6:8.2f} us/query")
+
+        driver, db._conn = db._conn, StubDriver()
+        try:
+            stubbed: List[Any] = [
+                ("stub driver: execute(build())", lambda: db.execute(build(7))),
+                ("stub driver: execute(reused)", lambda: db.execute(query)),
+                ("stub driver: execute(frozen)", lambda: db.execute(frozen)),
+            ]
+            for name, fn in stubbed:
+                print(f"{name:>32}: {await measure(count, fn) * 1e6:8.2f} us/query")
+        finally:
+            db._conn = driver
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,65 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Compare iterating a select row by row against fetching rows in batches, and
+against reading batches ahead in the background, on in-memory SQLite.
+
+Usage: python -m bench.fetch [rows ...]
+"""
+
+import asyncio
+import sys
+import time
+from typing import List
+
+import aql
+
+
+@aql.table
+class Reading:
+    id: int
+    sensor: str
+    value: float
+
+
+async def run(
+    db: aql.Connection, count: int, batch_size: int, prefetch: bool = False
+) -> float:
+    before = time.perf_counter()
+    seen = 0
+    result = db.execute(Reading.select(), batch_size=batch_size)
+    rows = result.prefetch() if prefetch else result
+    async for _ in rows:
+        seen += 1
+    elapsed = time.perf_counter() - before
+    assert seen == count, f"expected {count} rows, got {seen}"
+    return elapsed
+
+
+async def main(counts: List[int]) -> None:
+    for count in counts:
+        async with aql.connect("sqlite://:memory:") as db:
+            await db.execute(Reading.create())
+            rows = [Reading(i, "temp", i * 0.1) for i in range(count)]
+            await db.execute_many(Reading.insert(), rows)
+            await db.commit()
+
+            for batch_size in (1, aql.Result.BATCH_SIZE, 5000):
+                elapsed = await run(db, count, batch_size)
+                rate = count / elapsed
+                print(
+                    f"{count:>9} rows batch_size={batch_size:<5}: "
+                    f"{elapsed:8.3f}s {rate:12,.0f} rows/s"
+                )
+
+            elapsed = await run(db, count, aql.Result.BATCH_SIZE, prefetch=True)
+            rate = count / elapsed
+            print(
+                f"{count:>9} rows prefetch(2)     : "
+                f"{elapsed:8.3f}s {rate:12,.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(arg) for arg in sys.argv[1:]] or [10000, 100000]))
@@ -0,0 +1,48 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Compare multi-row VALUES inserts against executemany, on in-memory SQLite.
+
+Usage: python -m bench.insert [rows ...]
+"""
+
+import asyncio
+import sys
+import time
+from typing import List
+
+import aql
+
+
+@aql.table
+class Event:
+    id: int
+    kind: str
+    value: float
+
+
+async def run(count: int, many: bool) -> float:
+    rows = [Event(i, "click", i * 0.5) for i in range(count)]
+    async with aql.connect("sqlite://:memory:") as db:
+        await db.execute(Event.create())
+        before = time.perf_counter()
+        if many:
+            await db.execute_many(Event.insert(), rows)
+        else:
+            await db.execute(Event.insert().values(*rows))
+        await db.commit()
+        elapsed = time.perf_counter() - before
+    return elapsed
+
+
+async def main(counts: List[int]) -> None:
+    for count in counts:
+        for name, many in (("multi-row VALUES", False), ("executemany", True)):
+            elapsed = await run(count, many)
+            rate = count / elapsed
+            print(f"{count:>9} rows {name:>17}: {elapsed:8.3f}s {rate:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000]))
@@ -0,0 +1,79 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Compare building and preparing a query per call, preparing a reused frozen query,
+and binding a Statement, for both SQLite (``?`` placeholders) and MySQL (``%s``
+placeholders).
+"""
+
+from timeit import repeat
+from typing import Type
+
+import aql
+from aql.engines.mysql import MysqlEngine
+from aql.engines.sql import SqlEngine
+from aql.engines.sqlite import SqliteEngine
+
+
+@aql.table
+class Order:
+    id: int
+    tenant: int
+    status: str
+    total: float
+
+
+def run(location: str, engine: Type[SqlEngine], number: int) -> None:
+    db = aql.connect(location)
+    cached = engine()
+    uncached = engine(cache_size=0)
+
+    def build(n: int) -> aql.Query:
+        return (
+            Order.select()
+            .where(Order.tenant == n, Order.status.in_(["new", "paid"]))
+            .orderby(Order.id)
+            .limit(50)
+        )
+
+    frozen = build(7).freeze()
+    stmt = db.prepare(
+        Order.select()
+        .where(Order.tenant == aql.Param("tenant"), Order.status.in_(["new", "paid"]))
+        .orderby(Order.id)
+        .limit(50)
+    )
+    expanding = db.prepare(
+        Order.select()
+        .where(
+            Order.tenant == aql.Param("tenant"),
+            Order.status.in_(aql.Param("statuses")),
+        )
+        .orderby(Order.id)
+        .limit(50)
+    )
+
+    cases = {
+        "build + prepare (uncached)": lambda: uncached.prepare(build(7)),
+        "build + prepare (cached)": lambda: cached.prepare(build(7)),
+        "prepare frozen (uncached)": lambda: uncached.prepare(frozen),
+        "prepare frozen (cached)": lambda: cached.prepare(frozen),
+        "statement.bind": lambda: stmt.bind(tenant=7),
+        "statement.bind (expanding)": lambda: expanding.bind(
+            tenant=7, statuses=["new", "paid"]
+        ),
+    }
+    print(engine.__name__)
+    for name, fn in cases.items():
+        best = min(repeat(fn, number=number, repeat=5))
+        print(f"{name:>28}: {best / number * 1e6:8.2f} us/call")
+
+
+def main(number: int = 20000) -> None:
+    run("sqlite://:memory:", SqliteEngine, number)
+    run("mysql://localhost/bench", MysqlEngine, number)
+
+
+if __name__ == "__main__":
+    main()
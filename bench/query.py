@@ -0,0 +1,40 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Compare the per-call cost of building queries from scratch against deriving
+them from a frozen base query.
+"""
+
+from timeit import repeat
+
+import aql
+
+
+@aql.table
+class Order:
+    id: int
+    tenant: int
+    status: str
+    total: float
+
+
+def main(number: int = 50000) -> None:
+    base = Order.select().where(Order.status == "open").freeze()
+
+    cases = {
+        "mutable: full chain": lambda: Order.select()
+        .where(Order.status == "open")
+        .where(Order.tenant == 7)
+        .limit(10),
+        "frozen: derive from base": lambda: base.where(Order.tenant == 7).limit(10),
+        "mutable: single where()": lambda: Order.select().where(Order.tenant == 7),
+        "frozen: single where()": lambda: base.where(Order.tenant == 7),
+    }
+    for name, fn in cases.items():
+        best = min(repeat(fn, number=number, repeat=5))
+        print(f"{name:>26}: {best / number * 1e6:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Copyright 2022 Amethyst Reese
+# Licensed under the MIT license
+
+"""
+Compare rows per second for each result format, on in-memory SQLite, and the
+per-query cost of generating a row class for partial selects.
+
+Usage: python -m bench.rows [rows]
+"""
+
+import asyncio
+import sys
+import time
+from timeit import repeat
+from typing import Any, Callable, Dict
+
+import aql
+
+from attr import make_class
+
+
+@aql.table
+class Visit:
+    id: int
+    path: str
+    duration: float
+
+
+async def main(count: int) -> None:
+    async with aql.connect("sqlite://:memory:") as db:
+        await db.execute(Visit.create())
+        rows = [Visit(i, f"/page/{i % 100}", i * 0.01) for i in range(count)]
+        await db.execute_many(Visit.insert(), rows)
+        await db.commit()
+
+        full = Visit.select()
+        partial = Visit.select(Visit.id, Visit.path)
+        cases: Dict[str, Callable[[], Any]] = {
+            "source objects": lambda: db.execute(full),
+            "partial Row objects": lambda: db.execute(partial),
+            "tuples": lambda: db.execute(full).tuples(),
+            "dicts": lambda: db.execute(full).dicts(),
+            "scalars": lambda: db.execute(full).scalars(),
+        }
+        for name, fn in cases.items():
+            before = time.perf_counter()
+            result = await fn()
+            elapsed = time.perf_counter() - before
+            assert len(result) == count
+            rate = count / elapsed
+            print(f"{name:>24}: {elapsed:8.3f}s {rate:12,.0f} rows/s")
+
+    number = 2000
+    names = ["id", "path"]
+    factory = {
+        "make_class per query": lambda: make_class(
+            "Row", names, slots=True, frozen=True
+        ),
+        "cached Query.factory()": partial.factory,
+    }
+    for name, fn in factory.items():
+        best = min(repeat(fn, number=number, repeat=5))
+        print(f"{name:>24}: {best / number * 1e6:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))